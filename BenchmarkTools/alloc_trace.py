@@ -0,0 +1,90 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TOP_N = 10
+TRACE_FRAMES = 1
+
+
+def _site_stats(snapshot_end, snapshot_start, top_n):
+    stats = snapshot_end.compare_to(snapshot_start, "lineno")
+    sites = []
+    for stat in stats[:top_n]:
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+        })
+    return sites
+
+
+def _filtered_snapshot():
+    snapshot = tracemalloc.take_snapshot()
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+
+
+class AllocationTracer:
+    """Per-phase tracemalloc accounting, written as a sidecar to the benchmark CSV."""
+
+    def __init__(self, enabled=False, top_n=TOP_N):
+        self.enabled = enabled
+        self.top_n = top_n
+        self.phases = []
+        self._open = {}
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+
+    def begin(self, name):
+        """Open a phase; call it before any timed window starts.
+
+        The snapshot is taken first, so the memory it holds for the rest of
+        the phase is part of the baseline and the time it takes is not in
+        the phase.
+        """
+        if not self.enabled or name in self._open:
+            return
+        snapshot = _filtered_snapshot()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        self._open[name] = (snapshot, current, time.time())
+
+    def end(self, name):
+        if not self.enabled or name not in self._open:
+            return
+        end_time = time.time()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot_start, current_start, start_time = self._open.pop(name)
+        snapshot_end = _filtered_snapshot()
+        self.phases.append({
+            "phase": name,
+            "duration_s": end_time - start_time,
+            "peak_bytes": peak - current_start,
+            "net_bytes": current - current_start,
+            "top_sites": _site_stats(snapshot_end, snapshot_start, self.top_n),
+        })
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def save(self, benchmark_path):
+        if not self.enabled or benchmark_path is None:
+            return None
+        for name in list(self._open):
+            self.end(name)
+        sidecar_path = os.path.splitext(benchmark_path)[0] + ".alloc.json"
+        with open(sidecar_path, "w") as f:
+            json.dump({"benchmark": os.path.basename(benchmark_path),
+                       "phases": self.phases}, f, indent=2)
+        return sidecar_path
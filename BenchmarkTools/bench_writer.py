@@ -0,0 +1,159 @@
+import csv
+import os
+import time
+
+SERIES_COLUMNS = ["Time(s)", "CPU (%)", "Memory (MB)"]
+SUMMARY_COLUMNS = ["Connection Time(s)",
+                   "Signed Message Size (bytes)", "Throughput (MB/s)"]
+FORMATS = ["legacy", "csv", "npz", "parquet"]
+FLUSH_EVERY = 50  # samples, i.e. 5 s at the 100 ms sampling interval
+
+
+class BenchmarkWriter:
+    """Sample sink for monitor_resources that flushes to disk during the run.
+
+    "legacy" keeps the old single wide CSV with the per-connection values
+    repeated on every row. The other formats write the time series and the
+    per-connection summary as separate tables.
+    """
+
+    def __init__(self, directory, stem, fmt="legacy", columns=SERIES_COLUMNS,
+                 flush_every=FLUSH_EVERY):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        os.makedirs(directory, exist_ok=True)
+        self.fmt = fmt
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self.base_path = os.path.join(directory, stem)
+        self.rows = []
+        self.count = 0
+        self.started_at = time.time()  # wall clock of the first sample (Time(s) == 0)
+        self._file = None
+        self._csv = None
+        self._parquet = None
+
+        if fmt == "csv":
+            self._file = open(self.base_path + ".csv", "w", newline="")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+        elif fmt == "npz":
+            self._file = open(self.base_path + ".spool", "wb")
+
+    def __len__(self):
+        return self.count
+
+    def append(self, row):
+        self.rows.append(row)
+        self.count += 1
+        if self.fmt != "legacy" and len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.fmt == "legacy" or not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+            self._file.flush()
+        elif self.fmt == "npz":
+            import numpy as np
+            np.asarray(rows, dtype=np.float64).tofile(self._file)
+            self._file.flush()
+        elif self.fmt == "parquet":
+            self._write_parquet(rows)
+
+    def _write_parquet(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({name: [float(r[i]) for r in rows]
+                          for i, name in enumerate(self.columns)})
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(
+                self.base_path + ".parquet", table.schema, compression="zstd")
+        self._parquet.write_table(table)
+
+    def discard(self):
+        """Drop the samples of a connection that never completed, including partial files."""
+        self.rows = []
+        if self._parquet is not None:
+            self._parquet.close()
+        paths = [self.base_path + ".parquet"] if self._parquet is not None else []
+        if self._file is not None:
+            self._file.close()
+            paths.append(self._file.name)
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self, summary):
+        """Write the remaining samples plus the summary row and return the series path."""
+        summary_row = [summary[name] for name in SUMMARY_COLUMNS]
+
+        if self.fmt == "legacy":
+            path = self.base_path + ".csv"
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.columns + SUMMARY_COLUMNS)
+                for row in self.rows:
+                    writer.writerow([*row, *summary_row])
+            self.rows = []
+            return path
+
+        self.flush()
+        if self.fmt == "csv":
+            self._file.close()
+            with open(self.base_path + "_summary.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Samples"] + SUMMARY_COLUMNS)
+                writer.writerow([self.count, *summary_row])
+            return self.base_path + ".csv"
+
+        if self.fmt == "npz":
+            import numpy as np
+            spool_path = self._file.name
+            self._file.close()
+            series = np.fromfile(spool_path, dtype=np.float64).reshape(
+                -1, len(self.columns))
+            np.savez_compressed(
+                self.base_path + ".npz",
+                series=series.astype(np.float32),
+                series_columns=np.array(self.columns),
+                summary=np.array(summary_row, dtype=np.float64),
+                summary_columns=np.array(SUMMARY_COLUMNS))
+            os.remove(spool_path)
+            return self.base_path + ".npz"
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._parquet is not None:
+            self._parquet.close()
+        pq.write_table(pa.table({"Samples": [self.count],
+                                 **{name: [float(v)] for name, v in zip(SUMMARY_COLUMNS, summary_row)}}),
+                       self.base_path + "_summary.parquet")
+        return self.base_path + ".parquet"
+
+
+def load_benchmark(path):
+    """Read any writer output back as (series DataFrame, summary dict)."""
+    import pandas as pd
+    stem, ext = os.path.splitext(path)
+    if ext == ".npz":
+        import numpy as np
+        with np.load(path) as data:
+            series = pd.DataFrame(data["series"], columns=list(
+                data["series_columns"]))
+            summary = dict(zip(data["summary_columns"].tolist(),
+                               data["summary"].tolist()))
+        return series, summary
+    if ext == ".parquet":
+        series = pd.read_parquet(path)
+        summary = pd.read_parquet(
+            stem + "_summary.parquet").iloc[0].to_dict()
+        return series, summary
+    series = pd.read_csv(path)
+    if os.path.exists(stem + "_summary.csv"):
+        return series, pd.read_csv(stem + "_summary.csv").iloc[0].to_dict()
+    summary = {name: series[name].iloc[0] if len(series) else None
+               for name in SUMMARY_COLUMNS if name in series.columns}
+    return series.drop(columns=list(summary)), summary
@@ -0,0 +1,195 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+from csv_loader import detect_schema, read_pinned
+from run_manifest import manifest_path
+
+MIB = 1024 * 1024
+# The Go programs log decimal megabytes per second
+MIB_PER_MB = 1e6 / MIB
+SERIES_COLUMNS = ["t_s", "cpu_pct", "memory_mb", "throughput_mibps"]
+RUN_COLUMNS = ["implementation", "role", "scheme", "family", "transport", "size_bytes",
+               "chunk_bytes", "run_id", "rep", "connection_s", "throughput_mibps",
+               "handshake_ms", "client_s", "mean_cpu_pct", "peak_memory_mb", "samples",
+               "cpu_scope", "memory_scope", "path"]
+# What each implementation's resource samples cover. Python samples its own
+# process with psutil; the Go programs sample the whole host with gopsutil,
+# so their CPU includes the peer on loopback and memory is the host's used RAM.
+SCOPES = {"python": {"cpu_scope": "process", "memory_scope": "process RSS"},
+          "go": {"cpu_scope": "host", "memory_scope": "host used"}}
+# Measured the same way by both stacks once normalised:
+#   connection_s      server, end of the client's handshake to the end of the transfer (Go:
+#                     to its last 100 ms sample, so transfers under 100 ms have no value).
+#                     The Python servers start their own clocks elsewhere (QUIC when the
+#                     connection object is created, before the handshake; ML-DSA TCP after
+#                     the signature is read), so theirs is rebased on the handshake_end_wall
+#                     of the run's client manifest; without one Python QUIC has no value
+#   throughput_mibps  server, size_bytes / connection_s, recomputed here for both
+#   handshake_ms      client, dial to completed TLS handshake
+COMPARABLE = ["connection_s", "throughput_mibps", "handshake_ms"]
+
+
+def family_of(scheme):
+    if not scheme:
+        return None
+    name = scheme.upper()
+    if "DSA" in name or "DILITHIUM" in name:
+        return "ML-DSA"
+    return "RSA" if "RSA" in name else scheme
+
+
+def _manifest(path):
+    sidecar = manifest_path(path)
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar) as f:
+        return json.load(f)
+
+
+def implementation_of(path):
+    """"go" or "python", from the file's columns (.npz files are always Python)."""
+    if path.endswith(".npz"):
+        return "python", None
+    with open(path, newline="") as f:
+        header = [c.strip() for c in f.readline().strip().split(",")]
+    schema = detect_schema(header)
+    if schema in ("go-server", "go-client"):
+        return "go", schema
+    return "python", schema
+
+
+def canonical_series(path):
+    """(implementation, DataFrame with SERIES_COLUMNS) for one results file.
+
+    Go client logs have no series and give an empty frame.
+    """
+    import pandas as pd
+    implementation, schema = implementation_of(path)
+    if schema == "go-client":
+        return implementation, pd.DataFrame(columns=SERIES_COLUMNS)
+    if schema == "go-server":
+        return implementation, _go_series(read_pinned(path, schema))
+    return implementation, _python_series(path)[0]
+
+
+def _go_series(frame):
+    import pandas as pd
+    return pd.DataFrame({
+        "t_s": frame["Elapsed(ms)"] / 1000.0, "cpu_pct": frame["CPU(%)"],
+        "memory_mb": frame["Memory(MB)"],
+        "throughput_mibps": frame["Throughput(MB/s)"] * MIB_PER_MB})
+
+
+def _python_series(path):
+    import pandas as pd
+    from bench_writer import load_benchmark
+    series, summary = load_benchmark(path)
+    return pd.DataFrame({
+        "t_s": series["Time(s)"], "cpu_pct": series["CPU (%)"],
+        "memory_mb": series["Memory (MB)"],
+        "throughput_mibps": np.nan if summary.get("Throughput (MB/s)") is None
+        else float(summary["Throughput (MB/s)"])}), summary
+
+
+def _client_correlation(path, run_id):
+    """Correlation block of the client manifest with this run ID, in the sibling client/."""
+    if not run_id:
+        return {}
+    client_dir = os.path.join(os.path.dirname(os.path.dirname(path)), "client")
+    for sidecar in sorted(glob.glob(os.path.join(client_dir, "*.manifest.json"))):
+        with open(sidecar) as f:
+            correlation = json.load(f).get("correlation", {})
+        if correlation.get("run_id") == run_id:
+            return correlation
+    return {}
+
+
+def _span_ms(timings, phase):
+    if f"{phase}_end_wall" not in timings:
+        return None
+    return (timings[f"{phase}_end_wall"] - timings[f"{phase}_start_wall"]) * 1000
+
+
+def canonical_run(path, role=None, scheme=None, transport=None, size_bytes=None,
+                  chunk_bytes=None, run_id=None, rep=None, cpus=None):
+    """One run of either implementation as a dict keyed by RUN_COLUMNS.
+
+    Arguments override what the file and its manifest say; the harness
+    passes the parameters it ran with, since the Go logs record none. cpus
+    scales the Go host-wide CPU percent to percent of one core, the unit of
+    the Python series; the scope columns still say what was sampled.
+    """
+    implementation, schema = implementation_of(path)
+    manifest = _manifest(path)
+    parameters = manifest.get("parameters", {})
+    run = {column: None for column in RUN_COLUMNS}
+    run.update({"implementation": implementation, "path": path, "rep": rep,
+                "role": role or manifest.get("role"), "scheme": scheme or manifest.get("scheme"),
+                "transport": transport or manifest.get("transport"),
+                "size_bytes": size_bytes or parameters.get("data_size"),
+                "chunk_bytes": chunk_bytes or parameters.get("chunk_size"),
+                "run_id": run_id or manifest.get("run_id"), **SCOPES[implementation]})
+    if schema == "go-client":
+        frame = read_pinned(path, schema)
+        run["role"] = run["role"] or "client"
+        run["samples"] = len(frame)
+        if len(frame):
+            run["handshake_ms"] = float(frame["Handshake(ms)"].mean())
+            # TTC starts before signing and includes the 500 ms sleep before close in
+            # sendSignedData; the Python client times connect to last byte sent
+            run["client_s"] = float(frame["TTC(ms)"].mean()) / 1000.0
+    else:
+        if schema == "go-server":
+            frame = read_pinned(path, schema)
+            series = _go_series(frame)
+        else:
+            series, summary = _python_series(path)
+        run["samples"] = len(series)
+        if len(series):
+            cpu = series["cpu_pct"].to_numpy(dtype=float)
+            if implementation == "go" and cpus:
+                cpu = cpu * cpus
+            run["mean_cpu_pct"] = float(np.nanmean(cpu))
+            run["peak_memory_mb"] = float(np.nanmax(series["memory_mb"].to_numpy(dtype=float)))
+        if schema == "go-server":
+            run["role"] = run["role"] or "server"
+            if len(frame):
+                run["connection_s"] = float(frame["ConnDuration(s)"].max())
+                run["throughput_mibps"] = float(frame["Throughput(MB/s)"].iloc[-1]) * MIB_PER_MB
+        else:
+            if summary.get("Connection Time(s)") is not None:
+                run["connection_s"] = float(summary["Connection Time(s)"])
+            if summary.get("Throughput (MB/s)") is not None:
+                run["throughput_mibps"] = float(summary["Throughput (MB/s)"])
+            if run["size_bytes"] is None and summary.get("Signed Message Size (bytes)"):
+                run["size_bytes"] = int(summary["Signed Message Size (bytes)"])
+            timings = manifest.get("correlation", {})
+            if run["role"] == "client":
+                run["client_s"] = run["connection_s"]
+                run["handshake_ms"] = _span_ms(timings, "handshake")
+            elif run["role"] == "server":
+                client = _client_correlation(path, timings.get("run_id"))
+                if "handshake_end_wall" in client and "server_receive_end_wall" in timings:
+                    # offset_s (server minus client) puts the handshake end on the server
+                    # clock; on loopback both share one clock, and the estimate would only
+                    # add the server's delay in answering the correlation header
+                    offset = (0.0 if manifest.get("endpoint", {}).get("loopback")
+                              else client.get("offset_s", 0.0))
+                    run["connection_s"] = (timings["server_receive_end_wall"]
+                                           - client["handshake_end_wall"] - offset)
+                elif run["transport"] == "quic":
+                    run["connection_s"] = run["throughput_mibps"] = None
+    if run["size_bytes"] and run["connection_s"]:
+        # Both stacks divide by different byte counts and megabytes; use one definition
+        run["throughput_mibps"] = run["size_bytes"] / MIB / run["connection_s"]
+    run["family"] = family_of(run["scheme"])
+    return run
+
+
+def canonical_runs(paths, **info):
+    import pandas as pd
+    return pd.DataFrame([canonical_run(path, **info) for path in paths], columns=RUN_COLUMNS)
+
@@ -0,0 +1,144 @@
+import json
+import socket
+import time
+from contextlib import contextmanager
+
+# Optional header sent by the client before the signed payload:
+#   b"RUNH" | 2-byte big-endian length | JSON body
+# The server answers with the same framing, adding its receive/send clocks, so
+# the client can estimate the clock offset the same way NTP does.
+HEADER_MAGIC = b"RUNH"
+LENGTH_BYTES = 2
+PREFIX_SIZE = len(HEADER_MAGIC) + LENGTH_BYTES
+
+
+def _clocks(prefix):
+    return {f"{prefix}_wall": time.time(), f"{prefix}_mono": time.monotonic()}
+
+
+def encode_message(message):
+    body = json.dumps(message).encode()
+    return HEADER_MAGIC + len(body).to_bytes(LENGTH_BYTES, "big") + body
+
+
+def split_message(buffer):
+    """Split a leading correlation message off buffer.
+
+    Returns (message, rest). message is None when the buffer does not start
+    with a header; rest is None when more bytes are needed to decide.
+    """
+    if len(buffer) < len(HEADER_MAGIC):
+        return None, (None if HEADER_MAGIC.startswith(buffer) else buffer)
+    if not buffer.startswith(HEADER_MAGIC):
+        return None, buffer
+    if len(buffer) < PREFIX_SIZE:
+        return None, None
+    length = int.from_bytes(buffer[len(HEADER_MAGIC):PREFIX_SIZE], "big")
+    if len(buffer) < PREFIX_SIZE + length:
+        return None, None
+    message = json.loads(buffer[PREFIX_SIZE:PREFIX_SIZE + length])
+    return message, buffer[PREFIX_SIZE + length:]
+
+
+def client_hello(run_id):
+    hello = {"run_id": run_id, **_clocks("client_tx")}
+    return hello, encode_message(hello)
+
+
+def server_echo(hello, received):
+    """Build the server reply; received holds the clocks taken when the hello arrived."""
+    echo = {**hello, **received, **_clocks("server_tx")}
+    return echo, encode_message(echo)
+
+
+def client_result(echo, received_wall):
+    t0, t1 = echo["client_tx_wall"], echo["server_rx_wall"]
+    t2, t3 = echo["server_tx_wall"], received_wall
+    return {
+        **echo,
+        "client_rx_wall": t3,
+        # server_clock - client_clock; subtract it from server wall times
+        "offset_s": ((t1 - t0) + (t2 - t3)) / 2,
+        "rtt_s": (t3 - t0) - (t2 - t1),
+    }
+
+
+def _recv_exact(sock, n):
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _read_message(sock):
+    prefix = _recv_exact(sock, len(HEADER_MAGIC))
+    if prefix != HEADER_MAGIC:
+        return None, prefix
+    prefix += _recv_exact(sock, LENGTH_BYTES)
+    length = int.from_bytes(prefix[len(HEADER_MAGIC):], "big")
+    message, _ = split_message(prefix + _recv_exact(sock, length))
+    return message, b""
+
+
+@contextmanager
+def _no_delay(sock):
+    # Nagle + delayed ACK would add tens of ms to one direction of the exchange
+    previous = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        yield
+    finally:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, previous)
+
+
+def tcp_client_handshake(sock, run_id):
+    with _no_delay(sock):
+        _, payload = client_hello(run_id)
+        sock.sendall(payload)
+        echo, _ = _read_message(sock)
+    return client_result(echo, time.time())
+
+
+def tcp_server_handshake(sock):
+    """Answer a client hello if one is sent.
+
+    Returns (correlation, pending) where pending holds payload bytes that were
+    read while checking for the header.
+    """
+    with _no_delay(sock):
+        hello, pending = _read_message(sock)
+        if hello is None:
+            return None, pending
+        echo, payload = server_echo(hello, _clocks("server_rx"))
+        sock.sendall(payload)
+    return echo, b""
+
+
+async def quic_client_handshake(connection, run_id):
+    """Send the hello on a new stream and return (writer, correlation).
+
+    Keep the writer referenced while the stream is in use: asyncio closes a
+    StreamWriter (sending FIN) when it is garbage collected.
+    """
+    reader, writer = await connection.create_stream()
+    _, payload = client_hello(run_id)
+    writer.write(payload)
+    prefix = await reader.readexactly(PREFIX_SIZE)
+    length = int.from_bytes(prefix[len(HEADER_MAGIC):], "big")
+    echo, _ = split_message(prefix + await reader.readexactly(length))
+    return writer, client_result(echo, time.time())
+
+
+def server_received_clocks():
+    return _clocks("server_rx")
+
+
+def tag_timings(correlation, phase, start_wall, end_wall):
+    """Add wall-clock bounds of the send/receive phase to the correlation record."""
+    tagged = dict(correlation or {})
+    tagged[f"{phase}_start_wall"] = start_wall
+    tagged[f"{phase}_end_wall"] = end_wall
+    return tagged
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", None)
+MB = 1024 * 1024
+
+
+def _thread_clocks():
+    """CPU time consumed so far by the calling thread."""
+    clocks = {"cpu_ns": time.thread_time_ns()}
+    if RUSAGE_THREAD is not None:
+        usage = resource.getrusage(RUSAGE_THREAD)
+        clocks["user_s"] = usage.ru_utime
+        clocks["sys_s"] = usage.ru_stime
+    return clocks
+
+
+def _process_clocks():
+    if resource is None:
+        return {"cpu_ns": time.process_time_ns()}
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"cpu_ns": time.process_time_ns(),
+            "user_s": usage.ru_utime, "sys_s": usage.ru_stime}
+
+
+def _delta(start, end):
+    return {key: end[key] - start[key] for key in start}
+
+
+def _worker_name():
+    return f"{os.getpid()}:{threading.current_thread().name}"
+
+
+class CpuAccountant:
+    """Per-connection CPU time, split by phase and by verification worker.
+
+    Phases are measured with thread CPU clocks around the code that handles
+    this connection, so the sampler thread and other connections sharing the
+    event loop are not counted. Re-entering a phase adds to it, which is how
+    the QUIC receive phase spread over many datagram callbacks is summed.
+    Set payload_bytes before saving to get CPU-seconds per MB. A connection
+    whose signature did not verify is marked with reject(): its phases are
+    still reported, but not its per-MB or per-verification cost.
+
+    submit_verify() runs the verification on a pool instead, so the server
+    can go on to the next connection; the connection's report is complete
+    once the returned future is done.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.workers = {}
+        self.verifications = 0
+        self.rejected = False
+        self.payload_bytes = 0
+        self._stack = []
+        self._lock = threading.Lock()  # a pool's verification adds from its own thread
+        self._process_start = _process_clocks()
+        self._wall_start = time.time()
+
+    def _add(self, table, name, delta):
+        with self._lock:
+            entry = table.setdefault(name, {"calls": 0})
+            entry["calls"] += 1
+            for key, value in delta.items():
+                entry[key] = entry.get(key, 0) + value
+
+    @contextmanager
+    def phase(self, name):
+        # Nested phases are subtracted from the enclosing one, so every CPU
+        # nanosecond is counted once (e.g. verify inside a QUIC receive callback).
+        frame = {"start": _thread_clocks(), "children": {}}
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            delta = _delta(frame["start"], _thread_clocks())
+            if self._stack:
+                children = self._stack[-1]["children"]
+                for key, value in delta.items():
+                    children[key] = children.get(key, 0) + value
+            self._add(self.phases, name, {key: value - frame["children"].get(key, 0)
+                                          for key, value in delta.items()})
+
+    def _verified(self, delta):
+        self._add(self.workers, _worker_name(), delta)
+        with self._lock:
+            self.verifications += 1
+
+    def verify(self, fn, *args):
+        """Run a verification inline and account its CPU time."""
+        with self.phase("verify"):
+            start = _thread_clocks()
+            try:
+                return fn(*args)
+            finally:  # one that raises has still cost its CPU time
+                self._verified(_delta(start, _thread_clocks()))
+
+    def submit_verify(self, executor, fn, *args):
+        """Run a verification on executor and return its future; the worker's
+        CPU time is accounted before the future completes."""
+        return executor.submit(self._verify_on_worker, fn, *args)
+
+    def _verify_on_worker(self, fn, *args):
+        start = _thread_clocks()
+        try:
+            return fn(*args)
+        finally:
+            delta = _delta(start, _thread_clocks())
+            self._add(self.phases, "verify", delta)
+            self._verified(delta)
+
+    def reject(self):
+        self.rejected = True
+
+    def report(self):
+        phases = {name: {**entry, "cpu_s": entry["cpu_ns"] / 1e9}
+                  for name, entry in self.phases.items()}
+        workers = {name: {**entry, "cpu_s": entry["cpu_ns"] / 1e9}
+                   for name, entry in self.workers.items()}
+        connection_s = sum(entry["cpu_s"] for name, entry in phases.items()
+                           if name != "key_load")
+        verify_s = phases.get("verify", {}).get("cpu_s", 0.0)
+        process = _delta(self._process_start, _process_clocks())
+        megabytes = 0 if self.rejected else self.payload_bytes / MB
+        return {
+            "phases": phases,
+            "workers": workers,
+            "connection_cpu_s": connection_s,
+            "process_cpu_s": process["cpu_ns"] / 1e9,
+            "wall_s": time.time() - self._wall_start,
+            "payload_bytes": self.payload_bytes,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+            "cpu_s_per_mb": connection_s / megabytes if megabytes else None,
+            "cpu_s_per_verification": (verify_s / self.verifications
+                                       if self.verifications and not self.rejected else None),
+        }
+
+    def save(self, benchmark_path):
+        if benchmark_path is None:
+            return None
+        sidecar_path = os.path.splitext(benchmark_path)[0] + ".cpu.json"
+        with open(sidecar_path, "w") as f:
+            json.dump({"benchmark": os.path.basename(benchmark_path),
+                       **self.report()}, f, indent=2)
+        return sidecar_path
@@ -0,0 +1,283 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from canonical import COMPARABLE, RUN_COLUMNS, canonical_run, family_of
+from orchestrate import (LOOPBACK, REPO_DIR, RUN_TIMEOUT, TRANSPORTS, free_port, run_once, stop,
+                         wait_until_ready)
+from results_store import EXTENSIONS
+from run_manifest import new_run_id
+from sweep import SCHEME_VARIANTS, format_size, parse_size
+
+GO_DIR = os.path.join(REPO_DIR, "Final-Implementation-GO", "Code Files")
+# Scheme -> (source directory, main file, binary name). Each directory holds
+# several package-main files, so only the one that is run gets built.
+GO_PROGRAMS = {"RSA-2048": ("RSA", "main.go", "go-rsa"),
+               "ML-DSA-44": ("MLDSA", "RevisedMain.go", "go-mldsa")}
+# Certificates and ML-DSA keys the Go programs read from (or create in) their cwd
+GO_CREDENTIALS = ["*.pem", "*.key"]
+GO_DONE = "MetricsLogger stopped"
+IMPLEMENTATIONS = ["python", "go"]
+DEFAULT_SIZE = "8MB"
+DEFAULT_CHUNK = "64KB"  # the Go programs' default
+RESULTS_FILE = "cross.json"
+CANONICAL_FILE = "canonical.csv"
+
+
+def _go_version():
+    result = subprocess.run(["go", "env", "GOVERSION"], capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def _go_mod_version(folder):
+    with open(os.path.join(GO_DIR, folder, "go.mod")) as f:
+        for line in f:
+            if line.startswith("go "):
+                return line.split()[1]
+    return "unknown"
+
+
+def build_go(schemes, bin_dir):
+    """Path of the binary for each scheme, building those not in bin_dir with `go build`."""
+    binaries = {}
+    for scheme in schemes:
+        folder, source, name = GO_PROGRAMS[scheme]
+        binary = os.path.join(bin_dir, name)
+        if not os.path.exists(binary):
+            if shutil.which("go") is None:
+                raise RuntimeError(f"{binary} does not exist and the Go toolchain is not on "
+                                   "PATH; install Go or pass --go-bin with prebuilt binaries")
+            os.makedirs(bin_dir, exist_ok=True)
+            print(f"[BUILD] {scheme}: go build -o {binary} {source}")
+            try:
+                subprocess.run(["go", "build", "-o", os.path.abspath(binary), source],
+                               cwd=os.path.join(GO_DIR, folder), check=True)
+            except subprocess.CalledProcessError as e:
+                # A toolchain older than go.mod's go line tries to download a newer one
+                raise RuntimeError(
+                    f"go build failed for {scheme} (exit {e.returncode}). The local Go is "
+                    f"{_go_version()} and {folder}/go.mod needs go {_go_mod_version(folder)}; "
+                    "older toolchains try to download a newer one, which fails offline or "
+                    "with GOTOOLCHAIN=local. Upgrade Go or pass --go-bin with prebuilt "
+                    "binaries") from e
+        binaries[scheme] = os.path.abspath(binary)
+    return binaries
+
+
+def _wait_for_log(path, text, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with open(path, errors="replace") as f:
+            if text in f.read():
+                return True
+        if process.poll() is not None:
+            return False
+        time.sleep(0.1)
+    return False
+
+
+def run_go_once(binary, scheme, transport, rep_dir, size, chunk_size, timeout=RUN_TIMEOUT):
+    """One Go server/client pair on a fresh loopback port, in rep_dir/work.
+
+    Same record shape as orchestrate.run_once. The server never exits on its
+    own; it is stopped once it has logged that its metrics file is closed.
+    """
+    work = os.path.join(rep_dir, "work")
+    os.makedirs(work)
+    folder = os.path.join(GO_DIR, GO_PROGRAMS[scheme][0])
+    for pattern in GO_CREDENTIALS:
+        for path in glob.glob(os.path.join(folder, pattern)):
+            shutil.copy(path, work)
+    port = free_port(transport)
+    common = ["-protocol", transport, "-addr", f"{LOOPBACK}:{port}",
+              "-chunk-size", str(chunk_size), "-size", str(size)]
+    record = {"scheme": scheme, "transport": transport, "port": port, "dir": rep_dir}
+    started = time.time()
+    server_log = os.path.join(rep_dir, "server.log")
+    server_out = open(server_log, "w")
+    server = subprocess.Popen([binary, "-mode", "server", *common, "-metrics"], cwd=work,
+                              stdout=server_out, stderr=subprocess.STDOUT)
+    try:
+        wait_until_ready(server, transport, port)
+        with open(os.path.join(rep_dir, "client.log"), "w") as client_out:
+            client = subprocess.run([binary, "-mode", "client", *common], cwd=work,
+                                    stdout=client_out, stderr=subprocess.STDOUT, timeout=timeout)
+        record["client_exit"] = client.returncode
+        record["server_done"] = _wait_for_log(server_log, GO_DONE, server,
+                                              timeout - (time.time() - started))
+        record["ok"] = record["client_exit"] == 0 and record["server_done"]
+    except (RuntimeError, TimeoutError, subprocess.TimeoutExpired) as e:
+        record["ok"] = False
+        record["error"] = str(e)
+    finally:
+        stop(server)
+        server_out.close()
+    record["wall_s"] = time.time() - started
+    return record
+
+
+def outputs(implementation, rep_dir):
+    """(role, path) of the results files one repetition wrote."""
+    found = []
+    for role in ("server", "client"):
+        if implementation == "go":
+            pattern = os.path.join(rep_dir, "work", "logs", role, "*", "metrics-*.csv")
+        else:
+            pattern = os.path.join(rep_dir, role, "*")
+        found += [(role, path) for path in sorted(glob.glob(pattern))
+                  if path.endswith(EXTENSIONS) and "_summary" not in path]
+    return found
+
+
+def compare(runs, metrics=COMPARABLE):
+    """Median of each comparable metric per scheme, transport, role and implementation.
+
+    Rows carry the Python/Go ratio. For every transport and role the ML-DSA
+    cost over RSA is also worked out per implementation (as a time ratio, so
+    throughput is inverted); the part of Python's extra cost that Go does not
+    show is put down to the Python runtime.
+    """
+    import pandas as pd
+    rows, overhead = [], []
+    keys = ["scheme", "transport", "role"]
+    medians = runs.groupby([*keys, "implementation"])[metrics].median()
+    for (scheme, transport, role), group in runs.groupby(keys):
+        for metric in metrics:
+            value = {impl: medians[metric].get((scheme, transport, role, impl))
+                     for impl in IMPLEMENTATIONS}
+            if all(v is None or pd.isna(v) for v in value.values()):
+                continue
+            ratio = (value["python"] / value["go"]
+                     if value["python"] and value["go"] and not pd.isna(value["go"]) else None)
+            rows.append({"scheme": scheme, "transport": transport, "role": role,
+                         "metric": metric,
+                         **{f"n_{impl}": int((group["implementation"] == impl).sum())
+                            for impl in IMPLEMENTATIONS},
+                         **value, "python/go": ratio})
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table, overhead
+    table["family"] = table["scheme"].map(family_of)
+    for (transport, role, metric), group in table.groupby(["transport", "role", "metric"]):
+        by_family = group.set_index("family")
+        if not {"RSA", "ML-DSA"} <= set(by_family.index):
+            continue
+        cost = {}
+        for impl in IMPLEMENTATIONS:
+            rsa, mldsa = by_family.at["RSA", impl], by_family.at["ML-DSA", impl]
+            if any(v is None or pd.isna(v) or not v for v in (rsa, mldsa)):
+                cost[impl] = None
+            else:
+                cost[impl] = rsa / mldsa if metric == "throughput_mibps" else mldsa / rsa
+        share = None
+        if cost["python"] and cost["go"] and cost["python"] > 1:
+            share = min(1.0, max(0.0, 1 - (cost["go"] - 1) / (cost["python"] - 1)))
+        overhead.append({"transport": transport, "role": role, "metric": metric,
+                         "mldsa_cost_python": cost["python"], "mldsa_cost_go": cost["go"],
+                         "python_runtime_share": share})
+    return table.drop(columns="family"), overhead
+
+
+def _fmt(value, spec="{:.3f}"):
+    return "n/a" if value is None or value != value else spec.format(value)
+
+
+def print_comparison(table, overhead):
+    print(f"\n{'scheme':<10} {'transport':<9} {'role':<7} {'metric':<17} "
+          f"{'python':>10} {'go':>10} {'py/go':>7}")
+    for r in table.to_dict("records"):
+        print(f"{r['scheme']:<10} {r['transport']:<9} {r['role']:<7} {r['metric']:<17} "
+              f"{_fmt(r['python']):>10} {_fmt(r['go']):>10} {_fmt(r['python/go'], '{:.2f}'):>7}")
+    if overhead:
+        print("\nML-DSA cost over RSA (time ratio) and the part of it due to the Python runtime:")
+        for r in overhead:
+            print(f"  {r['transport']:<5} {r['role']:<7} {r['metric']:<17} "
+                  f"python {_fmt(r['mldsa_cost_python'], '{:.2f}x')}  "
+                  f"go {_fmt(r['mldsa_cost_go'], '{:.2f}x')}  "
+                  f"python runtime {_fmt(r['python_runtime_share'], '{:.0%}')}")
+    print("\nCPU and memory are in canonical.csv but not compared: Python samples its own "
+          "process, Go the whole host (see cpu_scope/memory_scope).")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the Python scripts and the Go programs with identical parameters "
+                    "and compare them on one canonical metrics model")
+    parser.add_argument("--schemes", nargs="+", choices=list(GO_PROGRAMS),
+                        default=list(GO_PROGRAMS))
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=TRANSPORTS)
+    parser.add_argument("--impls", nargs="+", choices=IMPLEMENTATIONS, default=IMPLEMENTATIONS)
+    parser.add_argument("--size", default=DEFAULT_SIZE, help="Payload, e.g. 8MB")
+    parser.add_argument("--chunk-size", default=DEFAULT_CHUNK)
+    parser.add_argument("--repetitions", "-n", type=int, default=5)
+    parser.add_argument("--go-bin", default=os.path.join(REPO_DIR, "runs", "go-bin"),
+                        help="Directory of the Go binaries; missing ones are built here")
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"))
+    parser.add_argument("--run-id", help="Name of the run directory (default: cross-<run ID>)")
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT,
+                        help="Seconds allowed per repetition")
+    args = parser.parse_args()
+    size, chunk_size = parse_size(args.size), parse_size(args.chunk_size)
+
+    binaries = {}
+    if "go" in args.impls:
+        try:
+            binaries = build_go(args.schemes, args.go_bin)
+        except (RuntimeError, subprocess.CalledProcessError) as e:
+            parser.error(str(e))
+    run_id = args.run_id or f"cross-{new_run_id()}"
+    run_dir = os.path.join(args.out, run_id)
+    os.makedirs(run_dir)
+    cpus = os.cpu_count()
+    results, runs = [], []
+    for scheme in args.schemes:
+        folder, variant_args = SCHEME_VARIANTS[scheme]
+        for transport in args.transports:
+            cell = f"{scheme}_{transport}"
+            for rep in range(1, args.repetitions + 1):
+                # Alternate which stack goes first so drift does not favour one of them
+                order = args.impls if rep % 2 else args.impls[::-1]
+                for impl in order:
+                    rep_dir = os.path.join(run_dir, cell, impl, f"rep-{rep:02d}")
+                    if impl == "go":
+                        record = run_go_once(binaries[scheme], scheme, transport, rep_dir, size,
+                                             chunk_size, args.timeout)
+                    else:
+                        record = run_once(folder, transport, rep_dir, f"{run_id}-{cell}-{rep:02d}",
+                                          "legacy", True, args.timeout,
+                                          [*variant_args, "--size", str(size),
+                                           "--chunk-size", str(chunk_size)])
+                    record.update({"implementation": impl, "scheme": scheme, "rep": rep,
+                                   "dir": os.path.relpath(record["dir"], run_dir)})
+                    results.append(record)
+                    status = "ok" if record["ok"] else f"FAILED {record.get('error', '')}"
+                    print(f"{cell:<15} {impl:<6} rep-{rep:02d} {record['wall_s']:7.2f}s  {status}")
+                    if record["ok"]:
+                        runs += [canonical_run(path, role, scheme, transport, size, chunk_size,
+                                               record.get("run_id"), rep, cpus)
+                                 for role, path in outputs(impl, rep_dir)]
+
+    import pandas as pd
+    frame = pd.DataFrame(runs, columns=RUN_COLUMNS)
+    frame.to_csv(os.path.join(run_dir, CANONICAL_FILE), index=False)
+    table, overhead = compare(frame)
+    if not table.empty:
+        print_comparison(table, overhead)
+    with open(os.path.join(run_dir, RESULTS_FILE), "w") as f:
+        json.dump({"run_id": run_id, "argv": sys.argv[1:], "size": size,
+                   "chunk_size": chunk_size, "size_label": format_size(size), "cpus": cpus,
+                   "results": results,
+                   "comparison": json.loads(table.to_json(orient="records")),
+                   "overhead": overhead}, f, indent=2)
+    failed = [r for r in results if not r["ok"]]
+    print(f"{len(results) - len(failed)}/{len(results)} repetitions ok -> {run_dir}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Known CSV schemas: column -> dtype. Time axes stay float64; the sampled
+# metrics have at most 3-4 significant digits, so float32 halves the memory
+# and the concat/mean work without losing anything a plot can show.
+SCHEMAS = {
+    "go-server": {"Elapsed(ms)": "float64", "CPU(%)": "float32", "Memory(MB)": "float32",
+                  "Throughput(MB/s)": "float32", "ConnDuration(s)": "float64"},
+    "go-client": {"Handshake(ms)": "float32", "Latency(ms)": "float32", "RTT(ms)": "float32",
+                  "TTC(ms)": "float64"},
+    "python": {"Time(s)": "float64", "CPU (%)": "float32", "Memory (MB)": "float32",
+               "Connection Time(s)": "float64", "Signed Message Size (bytes)": "int64",
+               "Throughput (MB/s)": "float32"},
+}
+# Below this many files the process pool costs more than it saves
+PARALLEL_MIN_FILES = 8
+_POOL = None
+
+
+def detect_schema(header):
+    for name, columns in SCHEMAS.items():
+        if set(columns) <= set(header):
+            return name
+    return None
+
+
+def read_pinned(path, schema=None, nrows=None):
+    """read_csv with usecols and dtypes pinned for the file's schema.
+
+    Unknown schemas fall back to pandas inference.
+    """
+    import pandas as pd
+    if schema is None:
+        with open(path, newline="") as f:
+            header = [c.strip() for c in f.readline().strip().split(",")]
+        schema = detect_schema(header)
+    if schema is None:
+        return pd.read_csv(path, nrows=nrows)
+    columns = SCHEMAS[schema]
+    return pd.read_csv(path, usecols=list(columns), dtype=columns, nrows=nrows,
+                       engine="c", skipinitialspace=True)
+
+
+def _read_one(job):
+    path, schema, nrows = job
+    try:
+        return path, read_pinned(path, schema, nrows), None
+    except Exception as e:  # reported in the summary, one bad file does not stop a plot
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def _pool(workers):
+    global _POOL
+    if _POOL is None or _POOL._max_workers != workers:
+        if _POOL is not None:
+            _POOL.shutdown()
+        _POOL = ProcessPoolExecutor(max_workers=workers)
+        atexit.register(_POOL.shutdown)
+    return _POOL
+
+
+def default_workers():
+    cpus = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    return len(cpus) if cpus else (os.cpu_count() or 1)
+
+
+def load_csvs(files, schema=None, nrows=None, workers=None):
+    """Read files concurrently in a process pool.
+
+    Returns ({path: DataFrame} in the order of files, [(path, error), ...]).
+    The pool is kept for the life of the process, so repeated calls (one per
+    scheme and protocol in the plot scripts) pay its start-up only once.
+    """
+    files = list(files)
+    workers = workers or default_workers()
+    jobs = [(path, schema, nrows) for path in files]
+    if workers > 1 and len(files) >= PARALLEL_MIN_FILES:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        results = list(_pool(workers).map(_read_one, jobs, chunksize=chunksize))
+    else:
+        results = [_read_one(job) for job in jobs]
+    frames = {path: frame for path, frame, _ in results if frame is not None}
+    errors = [(path, error) for path, _, error in results if error is not None]
+    return frames, errors
+
+
+def format_errors(errors, limit=10):
+    """One-block summary of parse failures, for printing after the load phase."""
+    if not errors:
+        return ""
+    lines = [f"{len(errors)} file(s) could not be read:"]
+    lines += [f"  {path}: {error}" for path, error in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"  ... and {len(errors) - limit} more")
+    return "\n".join(lines)
@@ -0,0 +1,405 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import signal
+import ssl
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from orchestrate import (LOOPBACK, REPO_DIR, SCHEMES, SCRIPTS_DIR, TOOLS_DIR, TRANSPORTS,
+                         _spawn, free_port, stop, wait_until_ready)
+from run_manifest import new_run_id, write_manifest
+from sweep import SCHEME_VARIANTS
+from traces import Signer
+
+CONNECTION_COLUMNS = ["Connection", "Start (s)", "Handshake (ms)", "Setup (ms)", "Sign (ms)",
+                      "OK"]
+NONCE_SIZE = 32
+CONNECTIONS = 200
+CONCURRENCY = 16
+# Client-side signing runs in these processes, so one slow signature does not
+# stall the event loop every other connection's handshake runs on
+SIGN_WORKERS = os.cpu_count() or 1
+PERCENTILES = [50, 90, 99]
+_SIGNER = None  # in each sign worker
+
+
+def _variant(scheme_name):
+    folder, _ = SCHEME_VARIANTS[scheme_name]
+    return folder, int(scheme_name.rsplit("-", 1)[1])
+
+
+def _cert_dir(folder):
+    return os.path.join(SCRIPTS_DIR, SCHEMES[folder])
+
+
+def make_client_cert(directory, key_bits=2048):
+    """Fresh self-signed client certificate for mutual TLS.
+
+    The scripts' server.pem expired in 2026 and only works because they never
+    verify it; a server that requires client certificates needs a valid one.
+    """
+    import datetime
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    key = rsa.generate_private_key(public_exponent=65537, key_size=key_bits)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "benchmark-client")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(hours=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    cert_path = os.path.join(directory, "client.crt")
+    key_path = os.path.join(directory, "client.key")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                                  serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+# ----------- Challenge-response ------------
+# After the transport handshake the client asks for a nonce and answers with
+# its public key and a signature over it, the application-level equivalent
+# of a Certificate + CertificateVerify carrying the scheme's key sizes.
+
+
+def _frame(data):
+    return len(data).to_bytes(4, "big") + data
+
+
+async def _read_frame(reader):
+    size = int.from_bytes(await reader.readexactly(4), "big")
+    return await reader.readexactly(size)
+
+
+def _start_signer(folder, variant):
+    global _SIGNER
+    _SIGNER = Signer(folder, variant)
+
+
+def _sign(nonce):
+    """Signature over the nonce and the seconds spent signing, in a sign worker."""
+    started = time.perf_counter()
+    signature = _SIGNER.sign(nonce)
+    return signature, time.perf_counter() - started
+
+
+async def answer_challenge(reader, writer, signer, pool):
+    """Returns (accepted, sign_s); the signature is computed in the sign pool."""
+    writer.write(b"?")
+    nonce = await _read_frame(reader)
+    signature, sign_s = await asyncio.get_running_loop().run_in_executor(pool, _sign, nonce)
+    writer.write(_frame(signer.public) + _frame(signature))
+    verdict = await reader.readexactly(1)
+    return verdict == b"\x01", sign_s
+
+
+async def check_challenge(reader, writer, signer, stats):
+    try:
+        await reader.readexactly(1)
+        nonce = os.urandom(NONCE_SIZE)
+        writer.write(_frame(nonce))
+        public = await _read_frame(reader)
+        signature = await _read_frame(reader)
+        ok = public == signer.public and signer.verify(public, nonce, signature)
+        writer.write(b"\x01" if ok else b"\x00")
+        await writer.drain()
+        stats["challenges_ok" if ok else "challenges_failed"] += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        stats["challenges_failed"] += 1
+    finally:
+        writer.close()
+
+
+# ----------- Server ------------
+
+
+async def serve(folder, variant, transport, port, challenge, stats_path, client_cert=None):
+    from aioquic.asyncio import QuicConnectionProtocol
+    from aioquic.asyncio import serve as quic_serve
+    from aioquic.quic.configuration import QuicConfiguration
+    from aioquic.quic.events import HandshakeCompleted
+
+    signer = Signer(folder, variant) if challenge else None
+    stats = {"handshakes": 0, "challenges_ok": 0, "challenges_failed": 0}
+    certs = _cert_dir(folder)
+    loop = asyncio.get_running_loop()
+    started, cpu_start = time.time(), os.times()
+
+    if transport == "tcp":
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(os.path.join(certs, "server.crt"), os.path.join(certs, "server.key"))
+        if client_cert:
+            context.verify_mode = ssl.CERT_REQUIRED
+            context.load_verify_locations(cafile=client_cert)
+
+        async def handle(reader, writer):
+            stats["handshakes"] += 1  # asyncio calls back only after the TLS handshake
+            if challenge:
+                await check_challenge(reader, writer, signer, stats)
+            else:
+                writer.close()  # the client waits for this close, which also surfaces a
+                # rejected client certificate (TLS 1.3 reports it after the client finishes)
+
+        server = await asyncio.start_server(handle, LOOPBACK, port, ssl=context, backlog=1024)
+        closer = server.close
+    else:
+        class HandshakeProtocol(QuicConnectionProtocol):
+            def quic_event_received(self, event):
+                if isinstance(event, HandshakeCompleted):
+                    stats["handshakes"] += 1
+                super().quic_event_received(event)
+
+        configuration = QuicConfiguration(is_client=False)
+        configuration.load_cert_chain(os.path.join(certs, "server.crt"),
+                                      os.path.join(certs, "server.key"))
+        handler = (lambda r, w: asyncio.ensure_future(check_challenge(r, w, signer, stats))
+                   if challenge else None)
+        server = await quic_serve(LOOPBACK, port, configuration=configuration,
+                                  create_protocol=HandshakeProtocol, stream_handler=handler)
+        closer = server.close
+    print(f"[HANDSHAKE] {transport} server on {LOOPBACK}:{port}", flush=True)
+
+    done = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, done.set)
+    await done.wait()
+    closer()
+    cpu = os.times()
+    stats.update({"wall_s": time.time() - started,
+                  "cpu_s": (cpu.user - cpu_start.user) + (cpu.system - cpu_start.system)})
+    with open(stats_path, "w") as f:
+        json.dump(stats, f, indent=2)
+
+
+# ----------- Client ------------
+
+
+async def connect_once(transport, port, signer, pool, context):
+    """Returns (handshake_s, setup_s, sign_s, ok, close) for one connection.
+
+    close is awaited after the concurrency slot is released: a QUIC close
+    lingers for the draining period, which is not connection setup.
+    """
+    start = time.perf_counter()
+    if transport == "tcp":
+        reader, writer = await asyncio.open_connection(LOOPBACK, port, ssl=context,
+                                                       server_hostname=LOOPBACK)
+        handshake = time.perf_counter() - start
+        sign = None
+        if signer:
+            ok, sign = await answer_challenge(reader, writer, signer, pool)
+        else:
+            ok = await reader.read(1) == b""
+        setup = time.perf_counter() - start
+        writer.close()
+        return handshake, setup, sign, ok, writer.wait_closed()
+
+    from aioquic.asyncio import connect
+    session = connect(LOOPBACK, port, configuration=context)
+    connection = await session.__aenter__()
+    try:
+        handshake = time.perf_counter() - start
+        ok, sign = True, None
+        if signer:
+            reader, writer = await connection.create_stream()
+            ok, sign = await answer_challenge(reader, writer, signer, pool)
+    except BaseException:
+        await session.__aexit__(None, None, None)
+        raise
+    return handshake, time.perf_counter() - start, sign, ok, session.__aexit__(None, None, None)
+
+
+def _client_context(transport, client_cert=None):
+    if transport == "tcp":
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        if client_cert:
+            context.load_cert_chain(*client_cert)
+        return context
+    from aioquic.quic.configuration import QuicConfiguration
+    configuration = QuicConfiguration(is_client=True)
+    configuration.verify_mode = ssl.CERT_NONE
+    return configuration
+
+
+async def run_load(folder, variant, transport, port, connections, concurrency, pool=None,
+                   client_cert=None, timeout=30.0):
+    """Open connections with at most concurrency setting up at once.
+
+    With a sign pool (see sign_pool) each connection answers the challenge.
+    Returns the per-connection rows and the time until the last setup finished.
+    """
+    signer = Signer(folder, variant) if pool else None
+    context = _client_context(transport, client_cert)
+    semaphore = asyncio.Semaphore(concurrency)
+    rows = []
+    t0 = time.perf_counter()
+
+    async def one(index):
+        close = None
+        async with semaphore:
+            started = time.perf_counter() - t0
+            try:
+                handshake, setup, sign, ok, close = await asyncio.wait_for(
+                    connect_once(transport, port, signer, pool, context), timeout)
+            except (OSError, ConnectionError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError) as e:
+                print(f"[HANDSHAKE] connection {index} failed: {e!r}", flush=True)
+                handshake, setup, sign, ok = None, None, None, False
+            rows.append([index, started, *[None if t is None else t * 1000
+                                           for t in (handshake, setup, sign)], ok])
+        if close is not None:
+            try:
+                await close
+            except (OSError, ConnectionError):
+                pass
+
+    await asyncio.gather(*(one(i) for i in range(connections)))
+    done = [r[1] + r[3] / 1000 for r in rows if r[3] is not None]
+    return sorted(rows), max(done) if done else time.perf_counter() - t0
+
+
+def summarise(rows, wall_s, server_stats):
+    ok = [r for r in rows if r[-1]]
+    summary = {"connections": len(rows), "ok": len(ok), "wall_s": wall_s,
+               "handshakes_per_s": len(ok) / wall_s if wall_s else None}
+    for column, key in ((2, "handshake"), (3, "setup"), (4, "sign")):
+        values = np.array([r[column] for r in ok if r[column] is not None], dtype=float)
+        for p in PERCENTILES:
+            summary[f"{key}_p{p}_ms"] = float(np.percentile(values, p)) if len(values) else None
+    if server_stats:
+        summary["server"] = server_stats
+        if server_stats.get("handshakes"):
+            summary["server_cpu_ms_per_handshake"] = (server_stats["cpu_s"] * 1000
+                                                      / server_stats["handshakes"])
+    return summary
+
+
+def sign_pool(folder, variant, workers):
+    """Sign workers with the client key loaded and every process started."""
+    Signer(folder, variant)  # creates missing key files once, before the workers read them
+    pool = ProcessPoolExecutor(workers, initializer=_start_signer, initargs=(folder, variant))
+    list(pool.map(_sign, [bytes(NONCE_SIZE)] * workers))
+    return pool
+
+
+def run_cell(scheme_name, transport, cell_dir, run_id, options):
+    folder, variant = _variant(scheme_name)
+    port = free_port(transport)
+    os.makedirs(cell_dir, exist_ok=True)
+    stats_path = os.path.join(cell_dir, "server_stats.json")
+    server_args = ["serve", "--scheme", scheme_name, "--protocol", transport, "--port", str(port),
+                   "--stats", stats_path]
+    if options["challenge"]:
+        server_args.append("--challenge")
+    if options["client_cert"]:
+        server_args += ["--client-cert", options["client_cert"][0]]
+    # Started before the server and the event loop, so the workers are not forked from either
+    pool = sign_pool(folder, variant, options["sign_workers"]) if options["challenge"] else None
+    server = _spawn(TOOLS_DIR, "handshake_bench", server_args,
+                    os.path.join(cell_dir, "server.log"))
+    try:
+        wait_until_ready(server, transport, port)
+        rows, wall_s = asyncio.run(run_load(
+            folder, variant, transport, port, options["connections"], options["concurrency"],
+            pool, options["client_cert"]))
+    finally:
+        stop(server)
+        server.log.close()
+        if pool:
+            pool.shutdown()
+    server_stats = None
+    if os.path.exists(stats_path):
+        with open(stats_path) as f:
+            server_stats = json.load(f)
+    summary = summarise(rows, wall_s, server_stats)
+
+    path = os.path.join(cell_dir, f"handshake_{scheme_name}_{transport}.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CONNECTION_COLUMNS)
+        writer.writerows(rows)
+    write_manifest(path, run_id, "handshake", scheme_name, transport,
+                   {"connections": options["connections"],
+                    "concurrency": options["concurrency"],
+                    "challenge": options["challenge"],
+                    "sign_workers": options["sign_workers"] if options["challenge"] else None,
+                    "mutual_tls": bool(options["client_cert"]) and transport == "tcp"},
+                   {"host": LOOPBACK, "port": port}, summary=summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Connection setup rate: handshakes only, optionally with a signed "
+                    "challenge-response, at high concurrency")
+    sub = parser.add_subparsers(dest="command")
+    srv = sub.add_parser("serve", help="Handshake server (started by the benchmark)")
+    srv.add_argument("--scheme", choices=list(SCHEME_VARIANTS), required=True)
+    srv.add_argument("--protocol", choices=TRANSPORTS, required=True)
+    srv.add_argument("--port", type=int, required=True)
+    srv.add_argument("--challenge", action="store_true")
+    srv.add_argument("--client-cert", help="Require TLS client certificates issued by this")
+    srv.add_argument("--stats", required=True)
+    parser.add_argument("--schemes", nargs="+", choices=list(SCHEME_VARIANTS),
+                        default=["RSA-2048", "ML-DSA-44"])
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=TRANSPORTS)
+    parser.add_argument("--connections", type=int, default=CONNECTIONS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--challenge", action="store_true",
+                        help="Add the signed nonce exchange after the transport handshake")
+    parser.add_argument("--sign-workers", type=int, default=SIGN_WORKERS,
+                        help="Processes computing the client's challenge signatures")
+    parser.add_argument("--no-mutual", action="store_true",
+                        help="Skip the TLS client certificate on TCP")
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"))
+    parser.add_argument("--run-id")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        folder, variant = _variant(args.scheme)
+        asyncio.run(serve(folder, variant, args.protocol, args.port, args.challenge, args.stats,
+                          args.client_cert))
+        return
+
+    run_id = args.run_id or new_run_id()
+    run_dir = os.path.join(args.out, run_id, "handshake")
+    os.makedirs(run_dir)
+    options = {"connections": args.connections, "concurrency": args.concurrency,
+               "challenge": args.challenge, "sign_workers": args.sign_workers,
+               "client_cert": None if args.no_mutual else make_client_cert(run_dir)}
+    print(f"{'scheme':<10} {'transport':<9} {'ok':>9} {'hs/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'sign p50':>9} {'srv CPU ms/hs':>14}")
+    failed = False
+    for scheme_name in args.schemes:
+        for transport in args.transports:
+            s = run_cell(scheme_name, transport, os.path.join(run_dir, f"{scheme_name}-{transport}"),
+                         run_id, options)
+            failed |= s["ok"] < s["connections"]
+            key = "setup" if args.challenge else "handshake"
+            latency = " ".join(f"{s[f'{key}_p{p}_ms'] or float('nan'):8.1f}" for p in PERCENTILES)
+            sign, cpu = s["sign_p50_ms"], s.get("server_cpu_ms_per_handshake")
+            print(f"{scheme_name:<10} {transport:<9} {s['ok']:>4}/{s['connections']:<4} "
+                  f"{s['handshakes_per_s']:8.1f} {latency} "
+                  f"{'-' if sign is None else f'{sign:.1f}':>9} "
+                  f"{'-' if cpu is None else f'{cpu:.2f}':>14}", flush=True)
+    print(f"-> {run_dir}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import random
+import signal
+import time
+
+RETRANSMIT_MS = 200.0  # Linux minimum RTO; what a lost TCP segment costs
+SEGMENT_SIZE = 1448  # TCP payload per segment on a 1500-byte MTU with timestamps
+DEFAULTS = {
+    "loss": 0.0,          # independent drop probability
+    "burst_enter": 0.0,   # Gilbert-Elliott: P(good -> bad) per packet
+    "burst_exit": 1.0,    # P(bad -> good) per packet
+    "burst_loss": 1.0,    # drop probability while in the bad state
+    "delay_ms": 0.0,
+    "jitter_ms": 0.0,     # uniform +/- around delay_ms
+    "reorder": 0.0,       # probability a packet is held back
+    "reorder_ms": 10.0,   # extra delay for held-back packets
+    "rate_kbps": 0.0,     # bandwidth cap, 0 = unlimited
+    "retransmit_ms": RETRANSMIT_MS,
+    "seed": 0,
+}
+
+
+def parse_spec(text):
+    """Parse "loss=0.1,delay_ms=20" into a full impairment dict."""
+    spec = dict(DEFAULTS)
+    for item in filter(None, (text or "").split(",")):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in DEFAULTS:
+            raise ValueError(f"Unknown impairment {key!r}; choose from {sorted(DEFAULTS)}")
+        spec[key] = int(value) if key == "seed" else float(value)
+    return spec
+
+
+class Impairment:
+    """Seeded per-direction packet fate: drop, or the delay before delivery.
+
+    Each direction gets its own generator so the upstream and downstream
+    sequences do not depend on how their packets interleave. On a stream
+    nothing is dropped: lost packets are counted as retransmitted, with their
+    bytes kept apart from the bytes delivered on time.
+    """
+
+    def __init__(self, spec, direction, stream=False):
+        self.spec = spec
+        self.random = random.Random(f"{spec['seed']}-{direction}")
+        self.bad = False
+        self.link_free_at = 0.0
+        self.lost = ("retransmitted", "retransmitted_bytes") if stream else ("dropped", None)
+        self.stats = {"packets": 0, "bytes": 0, "dropped": 0, "reordered": 0}
+        if stream:
+            self.stats.update({"retransmitted": 0, "retransmitted_bytes": 0})
+
+    def _lost(self):
+        s = self.spec
+        if s["burst_enter"] > 0:
+            flip = s["burst_exit"] if self.bad else s["burst_enter"]
+            if self.random.random() < flip:
+                self.bad = not self.bad
+            if self.bad and self.random.random() < s["burst_loss"]:
+                return True
+        return self.random.random() < s["loss"]
+
+    def decide(self, size, now):
+        """Return the delay in seconds before the packet is delivered, or None to drop it."""
+        s = self.spec
+        self.stats["packets"] += 1
+        if self._lost():
+            count, lost_bytes = self.lost
+            self.stats[count] += 1
+            if lost_bytes:
+                self.stats[lost_bytes] += size
+            return None
+        self.stats["bytes"] += size
+        departure = now
+        if s["rate_kbps"] > 0:
+            departure = max(now, self.link_free_at) + size * 8 / (s["rate_kbps"] * 1000)
+            self.link_free_at = departure
+        delay = s["delay_ms"]
+        if s["jitter_ms"] > 0:
+            delay += self.random.uniform(-s["jitter_ms"], s["jitter_ms"])
+        if s["reorder"] > 0 and self.random.random() < s["reorder"]:
+            self.stats["reordered"] += 1
+            delay += s["reorder_ms"]
+        return departure - now + max(delay, 0.0) / 1000
+
+
+# ----------- UDP (QUIC) ------------
+
+
+class _Upstream(asyncio.DatagramProtocol):
+    def __init__(self, relay, client_addr):
+        self.relay = relay
+        self.client_addr = client_addr
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.relay.forward(self.relay.downstream, data,
+                           lambda d: self.relay.transport.sendto(d, self.client_addr))
+
+
+class UdpRelay(asyncio.DatagramProtocol):
+    """Listen for clients and relay each one over its own upstream socket."""
+
+    def __init__(self, target, spec):
+        self.target = target
+        self.upstream = Impairment(spec, "up")
+        self.downstream = Impairment(spec, "down")
+        self.clients = {}
+        self.transport = None
+        self.loop = asyncio.get_event_loop()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def forward(self, impairment, data, send):
+        delay = impairment.decide(len(data), self.loop.time())
+        if delay is None:
+            return
+        if delay > 0:
+            self.loop.call_later(delay, send, data)
+        else:
+            send(data)
+
+    def datagram_received(self, data, addr):
+        upstream = self.clients.get(addr)
+        if upstream is None:
+            upstream = _Upstream(self, addr)
+            self.clients[addr] = upstream
+            self.loop.create_task(self.loop.create_datagram_endpoint(
+                lambda: upstream, remote_addr=self.target))
+        self.forward(self.upstream, data, lambda d: self._send_up(upstream, d))
+
+    def _send_up(self, upstream, data):
+        if upstream.transport is not None:
+            upstream.transport.sendto(data)
+        else:  # endpoint still being created
+            self.loop.call_soon(self._send_up, upstream, data)
+
+    def stats(self):
+        return {"up": self.upstream.stats, "down": self.downstream.stats,
+                "clients": len(self.clients)}
+
+
+# ----------- TCP (TLS) ------------
+
+
+class TcpRelay:
+    """Byte-stream relay with per-segment delay, bandwidth and loss penalties.
+
+    Reads are cut into SEGMENT_SIZE segments, each with its own fate, so
+    loss rates mean the same as on the wire however the socket batches.
+    A TCP stream cannot lose bytes, so a "lost" segment is delivered late by
+    retransmit_ms instead, which is what the sender's retransmission costs.
+    Delivery order is always preserved.
+    """
+
+    def __init__(self, target, spec):
+        self.target = target
+        self.spec = spec
+        self.upstream = Impairment(spec, "up", stream=True)
+        self.downstream = Impairment(spec, "down", stream=True)
+        self.connections = 0
+        self.failed = 0
+
+    async def _read(self, reader, queue, impairment):
+        loop = asyncio.get_event_loop()
+        deliver_at = 0.0
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                now = loop.time()
+                # Consecutive segments due at the same time go out in one write
+                start = 0
+                for offset in range(0, len(data), SEGMENT_SIZE):
+                    segment = min(SEGMENT_SIZE, len(data) - offset)
+                    delay = impairment.decide(segment, now)
+                    if delay is None:
+                        delay = self.spec["retransmit_ms"] / 1000
+                    if now + delay > deliver_at and offset > start:
+                        await queue.put((deliver_at, data[start:offset]))
+                        start = offset
+                    deliver_at = max(deliver_at, now + delay)
+                await queue.put((deliver_at, data[start:]))
+        except (ConnectionError, OSError):
+            pass
+        await queue.put((deliver_at, None))
+
+    async def _write(self, writer, queue):
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                deliver_at, data = await queue.get()
+                await asyncio.sleep(max(deliver_at - loop.time(), 0))
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            writer.close()
+
+    async def _pump(self, reader, writer, impairment):
+        # Reads keep flowing while earlier data waits out its delay
+        queue = asyncio.Queue()
+        await asyncio.gather(self._read(reader, queue, impairment),
+                             self._write(writer, queue))
+
+    async def handle(self, client_reader, client_writer):
+        self.connections += 1
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError as e:
+            self.failed += 1
+            print(f"[IMPAIR] cannot reach {self.target[0]}:{self.target[1]}: {e}", flush=True)
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self._pump(client_reader, server_writer, self.upstream),
+            self._pump(server_reader, client_writer, self.downstream))
+        server_writer.close()
+        client_writer.close()
+
+    def stats(self):
+        return {"up": self.upstream.stats, "down": self.downstream.stats,
+                "connections": self.connections, "failed_connections": self.failed}
+
+
+async def serve(protocol, listen, target, spec, stats_path=None, ready=print):
+    loop = asyncio.get_event_loop()
+    if protocol == "quic":
+        relay = UdpRelay(target, spec)
+        transport, _ = await loop.create_datagram_endpoint(lambda: relay, local_addr=listen)
+        port = transport.get_extra_info("sockname")[1]
+        closer = transport.close
+    else:
+        relay = TcpRelay(target, spec)
+        server = await asyncio.start_server(relay.handle, *listen)
+        port = server.sockets[0].getsockname()[1]
+        closer = server.close
+    ready(f"[IMPAIR] {protocol} relay listening on {listen[0]}:{port} -> {target[0]}:{target[1]}")
+
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+    closer()
+    if stats_path:
+        with open(stats_path, "w") as f:
+            json.dump({"protocol": protocol, "impairment": spec,
+                       "written_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                       **relay.stats()}, f, indent=2)
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Loopback relay adding seeded loss, delay, reordering and rate limits")
+    parser.add_argument("--protocol", choices=["tcp", "quic"], required=True)
+    parser.add_argument("--listen", type=_address, default=("127.0.0.1", 0),
+                        help="host:port to accept clients on (port 0 = pick one)")
+    parser.add_argument("--target", type=_address, required=True, help="Server host:port")
+    parser.add_argument("--impair", default="",
+                        help="Comma-separated key=value, e.g. loss=0.1,delay_ms=20,seed=1; "
+                             f"keys: {', '.join(DEFAULTS)}")
+    parser.add_argument("--stats", help="Write packet counters here on exit")
+    args = parser.parse_args()
+    asyncio.run(serve(args.protocol, args.listen, args.target, parse_spec(args.impair),
+                      args.stats, ready=lambda msg: print(msg, flush=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+REPEAT = 5
+TOP = 15
+
+
+def parse_importtime(text):
+    """Records of a -X importtime log: (module, self_us, cumulative_us, depth)."""
+    records = []
+    for line in text.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            records.append((name, int(own), int(cumulative), (len(indent) - 1) // 2))
+    return records
+
+
+def measure(command, cwd=None, env=None):
+    """Run command under -X importtime; returns (wall seconds, records, exit code)."""
+    env = dict(os.environ if env is None else env)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *command], env=env,
+                            cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, parse_importtime(result.stderr), result.returncode
+
+
+def summarise(runs):
+    """Median per module over repeated runs, so one cold-cache run does not dominate."""
+    walls = [wall for wall, _, _ in runs]
+    own, cumulative, depth = {}, {}, {}
+    for _, records, _ in runs:
+        for name, s, c, d in records:
+            own.setdefault(name, []).append(s)
+            cumulative.setdefault(name, []).append(c)
+            depth[name] = d
+    modules = [{"module": name, "self_ms": statistics.median(own[name]) / 1000,
+                "cumulative_ms": statistics.median(cumulative[name]) / 1000,
+                "depth": depth[name]} for name in own]
+    top_level = [m for m in modules if m["depth"] == 0]
+    packages = {}
+    for m in top_level:
+        root = m["module"].split(".")[0]
+        packages[root] = packages.get(root, 0.0) + m["cumulative_ms"]
+    return {"runs": len(runs), "wall_ms": statistics.median(walls) * 1000,
+            "import_ms": sum(m["cumulative_ms"] for m in top_level),
+            "modules": len(modules),
+            "packages": sorted(({"package": k, "cumulative_ms": v} for k, v in packages.items()),
+                               key=lambda p: -p["cumulative_ms"]),
+            "self": sorted(modules, key=lambda m: -m["self_ms"])}
+
+
+def print_report(label, report, top=TOP):
+    print(f"\n{label}")
+    print(f"  start-up {report['wall_ms']:.0f} ms, of which imports {report['import_ms']:.0f} ms "
+          f"({report['modules']} modules, median of {report['runs']} runs)")
+    print(f"  {'top-level package':<32} {'cumulative ms':>14}")
+    for p in report["packages"][:top]:
+        print(f"  {p['package']:<32} {p['cumulative_ms']:14.1f}")
+    print(f"  {'module (self time)':<32} {'self ms':>14}")
+    for m in report["self"][:top]:
+        print(f"  {m['module']:<32} {m['self_ms']:14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Start-up and import-time report for a Python entry point, from "
+                    "-X importtime")
+    parser.add_argument("script", help="Entry point, e.g. Updated8MBv2Scripts/Scripts/RSA/client.py")
+    parser.add_argument("args", nargs=argparse.REMAINDER,
+                        help="Arguments for the script, default --help. Options for this tool go "
+                             "before the script")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--top", type=int, default=TOP)
+    parser.add_argument("--modules", nargs="+",
+                        help="Also time a bare import of each of these, e.g. aioquic.asyncio")
+    parser.add_argument("--json", help="Also write the report here")
+    args = parser.parse_args()
+    script_args = [a for a in args.args if a != "--"] or ["--help"]
+
+    script = os.path.abspath(args.script)
+    command = [script, *script_args]
+    cwd = os.path.dirname(script)  # the scripts resolve keys and certificates from here
+    measure(command, cwd)  # warm the page cache and __pycache__
+    runs = [measure(command, cwd) for _ in range(args.repeat)]
+    failed = {code for _, _, code in runs} - {0}
+    if failed:
+        print(f"warning: {os.path.basename(script)} exited with {sorted(failed)}")
+    report = {"command": [os.path.relpath(script), *script_args], **summarise(runs)}
+    print_report(" ".join(report["command"]), report, args.top)
+    isolated = {}
+    if args.modules:
+        # site and encodings load in every interpreter; report only what the module adds
+        baseline = summarise([measure(["-c", "pass"]) for _ in range(args.repeat)])["import_ms"]
+    for module in args.modules or []:
+        measure(["-c", f"import {module}"])
+        isolated[module] = summarise([measure(["-c", f"import {module}"])
+                                      for _ in range(args.repeat)])["import_ms"] - baseline
+    if isolated:
+        print(f"\n  {'bare import, over interpreter start':<36} {'ms':>10}")
+        for module, ms in isolated.items():
+            print(f"  {module:<32} {ms:14.1f}")
+        report["isolated_ms"] = isolated
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import warnings
+
+from results_store import CONNECTION_NAMES, RESULTS_DB, ResultsStore
+from run_manifest import REPO_DIR
+
+LOSS_COLUMN = "Packet loss (%)"
+METRICS = list(CONNECTION_NAMES.values())
+PERCENTILES = [50, 90, 99]
+BY = ["family", "transport"]
+FILTERS = ["role", "family", "scheme", "transport", "source", "run_id"]
+
+
+def loss_table(rows, by=BY, percentiles=PERCENTILES, metrics=METRICS):
+    """Statistics of the per-connection metrics per label and loss level.
+
+    rows are ResultsStore.connections() or .client_handshakes() rows; those
+    without a loss level are left out. Connections of every file at one level are pooled, so a
+    level measured with more runs is not weighted like a single run. The
+    result has Label, the loss level, Files, Connections and "<metric>
+    mean" / "<metric> p<N>" columns, the table `plots.py loss` draws.
+    """
+    import numpy as np
+    import pandas as pd
+    rows = rows[rows["loss_pct"].notna()]
+    columns = ["Label", LOSS_COLUMN, "Files", "Connections",
+               *[f"{m} {stat}" for m in metrics for stat in ["mean", *[f"p{p}" for p in percentiles]]]]
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+    labels = rows[by].astype(object).where(rows[by].notna(), "").astype(str).agg(" ".join, axis=1)
+    rows = rows.assign(Label=labels.str.strip(), **{LOSS_COLUMN: rows["loss_pct"]})
+    table = []
+    for (label, loss), group in rows.groupby(["Label", LOSS_COLUMN], sort=True):
+        values = group[metrics].to_numpy(dtype=float)
+        record = {"Label": label, LOSS_COLUMN: loss, "Files": group["file_id"].nunique(),
+                  "Connections": len(group)}
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            # Python runs only know the handshake; the other columns are all NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            quantiles = np.nanpercentile(values, percentiles, axis=0)
+        for j, metric in enumerate(metrics):
+            record[f"{metric} mean"] = means[j]
+            for i, p in enumerate(percentiles):
+                record[f"{metric} p{p}"] = quantiles[i, j]
+        table.append(record)
+    return pd.DataFrame(table, columns=columns)
+
+
+def derive(store, by=BY, percentiles=PERCENTILES, under=None, include_flagged=False,
+           include_warmup=False, **criteria):
+    """Loss table from the loss-tagged client runs in the store.
+
+    Go client logs give every connection's metrics; Python client runs (e.g.
+    from sweep.py --losses) give one handshake each, from their manifest.
+    Returns (table, files) where files are the contributing store entries,
+    whose content hashes key the plot cache. Runs flagged by outliers.py are
+    left out unless include_flagged, warmup repetitions unless include_warmup.
+    """
+    import pandas as pd
+    files = store.files(under=under, include_flagged=include_flagged,
+                        include_warmup=include_warmup, **criteria)
+    files = files[files["loss_pct"].notna() & ((files["kind"] == "connections")
+                                                 | files["handshake_ms"].notna())]
+    go = files[files["kind"] == "connections"]["id"].tolist()
+    python = files[files["kind"] == "series"]["id"].tolist()
+    frames = [store.connections(ids=go), store.client_handshakes(ids=python)]
+    rows = pd.concat([f for f in frames if len(f)] or frames[:1], ignore_index=True)
+    return loss_table(rows, by, percentiles), files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Handshake, latency, RTT and TTC percentiles per packet-loss level, "
+                    "from the loss-tagged client logs in the results store")
+    parser.add_argument("--db", default=RESULTS_DB)
+    parser.add_argument("--ingest", nargs="*", default=[REPO_DIR], metavar="ROOT",
+                        help="Index these roots first (default: the repository); "
+                             "pass no value to skip")
+    parser.add_argument("--out", help="Write the table as CSV, for plots.py loss --table")
+    parser.add_argument("--by", default=",".join(BY), help="File attributes that name a curve")
+    parser.add_argument("--percentiles", nargs="+", type=float, default=PERCENTILES)
+    parser.add_argument("--under", help="Only files below this directory")
+    parser.add_argument("--include-flagged", action="store_true",
+                        help="Keep runs the outlier and integrity checks flagged")
+    parser.add_argument("--include-warmup", action="store_true",
+                        help="Keep the warmup repetitions of orchestrated runs")
+    for key in FILTERS:
+        parser.add_argument(f"--{key.replace('_', '-')}")
+    args = parser.parse_args()
+    percentiles = [int(p) if float(p).is_integer() else p for p in args.percentiles]
+
+    with ResultsStore(args.db) as store:
+        if args.ingest:
+            store.ingest(args.ingest)
+        criteria = {key: getattr(args, key) for key in FILTERS}
+        table, files = derive(store, [k for k in args.by.split(",") if k], percentiles,
+                              args.under, args.include_flagged, args.include_warmup,
+                              **criteria)
+    if table.empty:
+        parser.error("no loss-tagged client runs match; run sweep.py --losses, or file the "
+                     "client logs under a loss<N> directory")
+    import pandas as pd
+    shown = ["Label", LOSS_COLUMN, "Files", "Connections",
+             *[c for c in table.columns if c.startswith("Handshake")]]
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table[shown].to_string(index=False, float_format="{:.2f}".format))
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"{len(table)} rows from {len(files)} files -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import csv
+import gc
+import os
+import statistics
+import sys
+import time
+
+from run_manifest import REPO_DIR, new_run_id, write_manifest
+
+RSA_SCRIPTS = os.path.join(REPO_DIR, "Updated8MBv2Scripts", "Scripts", "RSA")
+SIZES = [1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+ITERATIONS = 30
+KEYGEN_ITERATIONS = 10
+WARMUP = 3
+ML_DSA_LEVELS = [44, 65, 87]
+RSA_BITS = [2048, 3072, 4096]
+SERIES_COLUMNS = ["Iteration", "Time (ns)"]
+
+
+def time_op(fn, iterations, warmup):
+    """Per-call wall time in ns after warmup calls, with the GC paused like timeit."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            fn()
+            times.append(time.perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return times
+
+
+def summarise(times, size):
+    mean = statistics.fmean(times)
+    stdev = statistics.stdev(times) if len(times) > 1 else 0.0
+    ordered = sorted(times)
+    return {
+        "iterations": len(times),
+        "mean_ns": mean,
+        "median_ns": statistics.median(times),
+        "stdev_ns": stdev,
+        "cov": stdev / mean if mean else None,
+        "min_ns": ordered[0],
+        "p95_ns": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "ops_per_s": 1e9 / mean if mean else None,
+        "ns_per_byte": mean / size if size else None,
+    }
+
+
+# ----------- Cases ------------
+
+
+def ml_dsa_cases(levels, sizes):
+    from dilithium_py.ml_dsa import ML_DSA_44, ML_DSA_65, ML_DSA_87
+    schemes = {44: ML_DSA_44, 65: ML_DSA_65, 87: ML_DSA_87}
+    for level in levels:
+        ml_dsa = schemes[level]
+        scheme = f"ML-DSA-{level}"
+        yield scheme, "keygen", 0, ml_dsa.keygen
+        public_key, private_key = ml_dsa.keygen()
+        for size in sizes:
+            message = b"x" * size
+            signature = ml_dsa.sign(private_key, message)
+            yield scheme, "sign", size, lambda m=message: ml_dsa.sign(private_key, m)
+            yield scheme, "verify", size, lambda m=message, s=signature: ml_dsa.verify(
+                public_key, m, s)
+
+
+def rsa_pkcs1_cases(bits_list, sizes):
+    from Crypto.Hash import SHA256
+    from Crypto.PublicKey import RSA
+    from Crypto.Signature import pkcs1_15
+    for bits in bits_list:
+        scheme = f"RSA-{bits}"
+        yield scheme, "keygen", 0, lambda b=bits: RSA.generate(b)
+        private_key = RSA.generate(bits)
+        signer = pkcs1_15.new(private_key)
+        verifier = pkcs1_15.new(private_key.publickey())
+        for size in sizes:
+            message = b"x" * size
+            signature = signer.sign(SHA256.new(message))
+            # hashing is part of the cost, as in the client/server scripts
+            yield scheme, "sign", size, lambda m=message: signer.sign(SHA256.new(m))
+            yield scheme, "verify", size, lambda m=message, s=signature: verifier.verify(
+                SHA256.new(m), s)
+
+
+def rsa_oaep_cases(sizes):
+    sys.path.insert(0, RSA_SCRIPTS)
+    import rsa_utils
+    private_key, public_key = rsa_utils.generate_rsa_keys()
+    # OAEP-SHA256 fits at most k - 2*hLen - 2 bytes in one block
+    limit = private_key.key_size // 8 - 2 * 32 - 2
+    scheme = f"RSA-OAEP-{private_key.key_size}"
+    for size in sorted({min(size, limit) for size in sizes}):
+        message = b"x" * size
+        ciphertext = rsa_utils.encrypt_rsa(public_key, message)
+        yield scheme, "encrypt", size, lambda m=message: rsa_utils.encrypt_rsa(public_key, m)
+        yield scheme, "decrypt", size, lambda c=ciphertext: rsa_utils.decrypt_rsa(private_key, c)
+
+
+# ----------- Store ------------
+
+
+def save_case(directory, run_id, scheme, op, size, times, warmup):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{scheme}_{op}_{size}.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SERIES_COLUMNS)
+        writer.writerows(enumerate(times))
+    summary = summarise(times, size)
+    write_manifest(path, run_id, "micro", scheme, "none",
+                   {"op": op, "data_size": size, "warmup": warmup},
+                   {"host": None}, summary=summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time keygen/sign/verify and OAEP encrypt/decrypt outside the network path")
+    parser.add_argument("--suites", nargs="+", choices=["mldsa", "pkcs1", "oaep"],
+                        default=["mldsa", "pkcs1", "oaep"])
+    parser.add_argument("--levels", nargs="+", type=int, choices=ML_DSA_LEVELS, default=[44])
+    parser.add_argument("--key-bits", nargs="+", type=int, choices=RSA_BITS, default=[2048])
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES,
+                        help="Message sizes in bytes")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--keygen-iterations", type=int, default=KEYGEN_ITERATIONS)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"),
+                        help="Results go to <out>/<run-id>/micro/, next to transport runs")
+    parser.add_argument("--run-id")
+    args = parser.parse_args()
+
+    run_id = args.run_id or new_run_id()
+    directory = os.path.join(args.out, run_id, "micro")
+    cases = []
+    if "mldsa" in args.suites:
+        cases.append(ml_dsa_cases(args.levels, args.sizes))
+    if "pkcs1" in args.suites:
+        cases.append(rsa_pkcs1_cases(args.key_bits, args.sizes))
+    if "oaep" in args.suites:
+        cases.append(rsa_oaep_cases(args.sizes))
+
+    print(f"{'scheme':<14} {'op':<8} {'bytes':>9} {'ops/s':>10} {'ns/byte':>9} {'CoV':>6}")
+    for suite in cases:
+        for scheme, op, size, fn in suite:
+            iterations = args.keygen_iterations if op == "keygen" else args.iterations
+            times = time_op(fn, iterations, args.warmup)
+            s = save_case(directory, run_id, scheme, op, size, times, args.warmup)
+            per_byte = f"{s['ns_per_byte']:9.2f}" if s["ns_per_byte"] else f"{'-':>9}"
+            print(f"{scheme:<14} {op:<8} {size:>9} {s['ops_per_s']:10.1f} {per_byte} "
+                  f"{s['cov']:6.1%}", flush=True)
+    print(f"-> {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import statistics
+
+# Run-to-run coefficient of variation below which a cell is considered stable
+STABLE_COV = 0.05
+ROLES = ["server", "client", "sampler"]
+SAMPLER_CPUS = None  # set by configure(); the psutil sampler thread pins itself here
+
+
+def parse_cpus(text):
+    """Parse "2", "2,3" or "0-3,6" into a set of CPU numbers."""
+    cpus = set()
+    for item in filter(None, str(text).split(",")):
+        first, _, last = item.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpus(cpus):
+    return ",".join(str(c) for c in sorted(cpus))
+
+
+def pin(cpus, pid=0):
+    """Restrict pid (0 = the calling thread on Linux) to cpus; False where unsupported.
+
+    Threads inherit the affinity of the thread that creates them, so pinning
+    the main thread before any threads start covers the whole process.
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(pid, cpus)
+    except OSError as e:
+        print(f"[NOISE] could not pin to CPUs {format_cpus(cpus)}: {e}")
+        return False
+    return True
+
+
+def raise_priority(nice):
+    """Lower the process niceness to nice; negative values usually need root."""
+    if nice is None:
+        return False
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, nice)
+    except (OSError, AttributeError) as e:
+        print(f"[NOISE] could not set nice {nice}: {e}")
+        return False
+    return True
+
+
+def configure(cpus=None, sampler_cpus=None, nice=None):
+    """Apply the --cpus/--sampler-cpus/--nice options of a benchmark script.
+
+    Call from the main thread before any threads are started.
+    """
+    global SAMPLER_CPUS
+    if cpus:
+        pin(parse_cpus(cpus))
+    if sampler_cpus:
+        SAMPLER_CPUS = parse_cpus(sampler_cpus)
+    raise_priority(nice)
+
+
+def pin_sampler():
+    """Called at the top of the sampler thread so its psutil polling stays off the
+    cores doing the work."""
+    if SAMPLER_CPUS:
+        pin(SAMPLER_CPUS)
+
+
+def plan_cores(available=None, roles=ROLES):
+    """Give each role its own core, highest numbers first (CPU 0 takes most interrupts).
+
+    With fewer cores than roles the remaining roles share the last one, and
+    the plan says so.
+    """
+    if available is None:
+        available = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else set()
+    cores = sorted(available, reverse=True)
+    if not cores:
+        return {}, ["CPU affinity is not supported on this platform"]
+    plan = {role: {cores[min(i, len(cores) - 1)]} for i, role in enumerate(roles)}
+    warnings = []
+    if len(cores) < len(roles):
+        warnings.append(f"only {len(cores)} CPU(s) for {len(roles)} roles; "
+                        f"{', '.join(roles[len(cores) - 1:])} share CPU {cores[-1]}")
+    return plan, warnings
+
+
+def current_settings():
+    settings = {}
+    if hasattr(os, "sched_getaffinity"):
+        settings["cpu_affinity"] = format_cpus(os.sched_getaffinity(0))
+    if hasattr(os, "getpriority"):
+        settings["nice"] = os.getpriority(os.PRIO_PROCESS, 0)
+    if SAMPLER_CPUS:
+        settings["sampler_cpu_affinity"] = format_cpus(SAMPLER_CPUS)
+    return settings
+
+
+def coefficient_of_variation(values):
+    values = [v for v in values if v is not None and v == v]
+    if len(values) < 2:
+        return None
+    mean = statistics.fmean(values)
+    return statistics.stdev(values) / abs(mean) if mean else None
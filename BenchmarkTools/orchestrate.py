@@ -0,0 +1,256 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import psutil
+
+from bench_writer import FORMATS
+from noise_control import STABLE_COV, coefficient_of_variation, format_cpus, plan_cores
+from run_manifest import collect_environment, new_run_id
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(REPO_DIR, "Updated8MBv2Scripts", "Scripts")
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMES = {"rsa": "RSA", "mldsa": "ML-DSA"}
+TRANSPORTS = ["tcp", "quic"]
+LOOPBACK = "127.0.0.1"
+READY_TIMEOUT = 30
+RUN_TIMEOUT = 600
+# Servers write this sidecar last, after verification, so its presence means
+# the connection is fully accounted for (QUIC servers never exit on their own).
+DONE_PATTERN = "*.cpu.json"
+STABILITY_METRICS = ["Connection Time(s)", "Throughput (MB/s)", "Mean CPU (%)", "CPU s/MB"]
+
+
+def free_port(transport):
+    kind = socket.SOCK_STREAM if transport == "tcp" else socket.SOCK_DGRAM
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind((LOOPBACK, 0))
+        return s.getsockname()[1]
+
+
+def _listening(pid, transport, port):
+    try:
+        connections = psutil.Process(pid).net_connections(
+            kind="tcp" if transport == "tcp" else "udp")
+    except psutil.Error:
+        return False
+    for c in connections:
+        if c.laddr and c.laddr.port == port and (transport == "quic" or c.status == psutil.CONN_LISTEN):
+            return True
+    return False
+
+
+def wait_until_ready(process, transport, port, timeout=READY_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args[2]} exited with code {process.returncode} "
+                               "before listening")
+        if _listening(process.pid, transport, port):
+            return
+        time.sleep(0.05)
+    raise TimeoutError(f"{process.args[2]} not listening on {transport}/{port} after {timeout}s")
+
+
+def wait_for_outputs(directory, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if glob.glob(os.path.join(directory, DONE_PATTERN)):
+            return True
+        if process.poll() is not None:
+            return bool(glob.glob(os.path.join(directory, DONE_PATTERN)))
+        time.sleep(0.1)
+    return False
+
+
+def stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def _spawn(script_dir, role, args, log_path):
+    log = open(log_path, "w")
+    process = subprocess.Popen([sys.executable, "-u", f"{role}.py", *args], cwd=script_dir,
+                               stdout=log, stderr=subprocess.STDOUT)
+    process.log = log
+    return process
+
+
+def run_once(scheme, transport, rep_dir, run_id, output_format="legacy", correlate=False,
+             timeout=RUN_TIMEOUT, extra_args=(), impair=None, pinning=None):
+    """One server/client pair on a fresh loopback port; returns a result record.
+
+    extra_args (e.g. --size, --key-bits) are passed to both scripts. impair is
+    an impair.py spec ("loss=0.1,seed=1"); when set the client goes through
+    the impairment relay instead of connecting to the server directly.
+    pinning maps server/client/sampler to CPU sets (see noise_control.plan_cores)
+    and may carry a "nice" value for both scripts.
+    """
+    script_dir = os.path.join(SCRIPTS_DIR, SCHEMES[scheme])
+    port = free_port(transport)
+    common = ["--protocol", transport, "--run-id", run_id,
+              "--output-format", output_format, *extra_args]
+    pinned = {"server": [], "client": []}
+    if pinning:
+        for role in pinned:
+            if role in pinning:
+                pinned[role] = ["--cpus", format_cpus(pinning[role]),
+                                "--sampler-cpus", format_cpus(pinning["sampler"])]
+            if pinning.get("nice") is not None:
+                pinned[role] += ["--nice", str(pinning["nice"])]
+    server_dir = os.path.join(rep_dir, "server")
+    client_dir = os.path.join(rep_dir, "client")
+    os.makedirs(server_dir)
+    os.makedirs(client_dir)
+
+    record = {"scheme": scheme, "transport": transport, "run_id": run_id,
+              "port": port, "dir": rep_dir, "impair": impair}
+    started = time.time()
+    server = _spawn(script_dir, "server",
+                    [*common, "--port", str(port), "--host", LOOPBACK,
+                     "--output-dir", server_dir, "--verbose", *pinned["server"]],
+                    os.path.join(rep_dir, "server.log"))
+    client = relay = None
+    try:
+        wait_until_ready(server, transport, port)
+        client_port = port
+        if impair is not None:
+            client_port = free_port(transport)
+            relay = _spawn(TOOLS_DIR, "impair",
+                           ["--protocol", transport, "--impair", impair,
+                            "--listen", f"{LOOPBACK}:{client_port}",
+                            "--target", f"{LOOPBACK}:{port}",
+                            "--stats", os.path.join(rep_dir, "impair.json")],
+                           os.path.join(rep_dir, "impair.log"))
+            wait_until_ready(relay, transport, client_port)
+        client_args = [*common, "--port", str(client_port), "--host", LOOPBACK,
+                       "--output-dir", client_dir, "--verbose", *pinned["client"]]
+        if correlate:
+            client_args.append("--correlate")
+        client = _spawn(script_dir, "client", client_args,
+                        os.path.join(rep_dir, "client.log"))
+        record["client_exit"] = client.wait(timeout=timeout)
+        record["server_done"] = wait_for_outputs(
+            server_dir, server, timeout - (time.time() - started))
+        record["ok"] = record["client_exit"] == 0 and record["server_done"]
+    except (RuntimeError, TimeoutError, subprocess.TimeoutExpired) as e:
+        record["ok"] = False
+        record["error"] = str(e)
+    finally:
+        for process in (client, relay, server):
+            if process is not None:
+                stop(process)
+                process.log.close()
+    record["server_exit"] = server.returncode
+    record["wall_s"] = time.time() - started
+    return record
+
+
+def stability_report(run_dir, metrics=STABILITY_METRICS):
+    """Run-to-run coefficient of variation per cell, role and metric (warmups excluded)."""
+    from stats_compare import collect_samples
+    samples = collect_samples(run_dir)
+    report = []
+    if samples.empty:
+        return report
+    for (role, scheme, transport), group in samples.groupby(["role", "scheme", "transport"]):
+        for metric in metrics:
+            if metric not in group or group[metric].isna().all():
+                continue
+            cov = coefficient_of_variation(group[metric].astype(float).tolist())
+            report.append({"role": role, "scheme": scheme, "transport": transport,
+                           "metric": metric, "n": int(group[metric].notna().sum()),
+                           "cov": cov, "stable": cov is not None and cov <= STABLE_COV})
+    return report
+
+
+def print_stability(report):
+    print(f"\nRun-to-run CoV (stable at <= {STABLE_COV:.0%}):")
+    for r in report:
+        cov = "n/a" if r["cov"] is None else f"{r['cov']:6.1%}"
+        print(f"  {r['role']:<7} {r['scheme']:<10} {r['transport']:<5} {r['metric']:<20} "
+              f"n={r['n']:<3} {cov:>7}  {'stable' if r['stable'] else 'NOISY'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run client/server benchmarks on loopback with fresh ports")
+    parser.add_argument("--schemes", nargs="+", choices=list(SCHEMES), default=list(SCHEMES))
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=TRANSPORTS)
+    parser.add_argument("--repetitions", "-n", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Repetitions run first in every cell; recorded but flagged "
+                             "as warmup and excluded from stats")
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"),
+                        help="Parent directory; each invocation gets its own run directory")
+    parser.add_argument("--run-id", help="Name of the run directory (default: new run ID)")
+    parser.add_argument("--output-format", choices=FORMATS, default="legacy")
+    parser.add_argument("--correlate", action="store_true")
+    parser.add_argument("--impair", metavar="SPEC",
+                        help="Route clients through impair.py, e.g. loss=0.1,delay_ms=20,seed=1")
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT,
+                        help="Seconds allowed per repetition")
+    parser.add_argument("--pin", action="store_true",
+                        help="Pin server, client and sampler threads to separate cores")
+    parser.add_argument("--nice", type=int,
+                        help="Niceness for both scripts, e.g. -10 (needs privileges)")
+    args = parser.parse_args()
+
+    run_id = args.run_id or new_run_id()
+    run_dir = os.path.join(args.out, run_id)
+    os.makedirs(run_dir)
+    pinning = {}
+    if args.pin:
+        pinning, warnings = plan_cores()
+        for warning in warnings:
+            print(f"[NOISE] {warning}")
+        print("[NOISE] " + ", ".join(f"{role} -> CPU {format_cpus(cpus)}"
+                                     for role, cpus in pinning.items()))
+    if args.nice is not None:
+        pinning["nice"] = args.nice
+    settings = {"pinning": {k: (format_cpus(v) if isinstance(v, set) else v)
+                            for k, v in (pinning or {}).items()},
+                "cpu_governor": collect_environment()["cpu_governor"]}
+    results = []
+    for scheme in args.schemes:
+        for transport in args.transports:
+            cell = f"{scheme}-{transport}"
+            for i in range(args.warmup + args.repetitions):
+                warmup = i < args.warmup
+                name = f"warmup-{i + 1:02d}" if warmup else f"rep-{i - args.warmup + 1:02d}"
+                record = run_once(scheme, transport, os.path.join(run_dir, cell, name),
+                                  f"{run_id}-{cell}-{name}", args.output_format,
+                                  args.correlate, args.timeout, impair=args.impair,
+                                  pinning=pinning or None)
+                record["dir"] = os.path.relpath(record["dir"], run_dir)
+                record["warmup"] = warmup
+                results.append(record)
+                status = "ok" if record["ok"] else f"FAILED {record.get('error', '')}"
+                print(f"{cell:<11} {name:<10} {record['wall_s']:7.2f}s  {status}")
+                with open(os.path.join(run_dir, "run.json"), "w") as f:
+                    json.dump({"run_id": run_id, "argv": sys.argv[1:], "noise_control": settings,
+                               "results": results}, f, indent=2)
+
+    failed = [r for r in results if not r["ok"]]
+    stability = stability_report(run_dir)
+    print_stability(stability)
+    with open(os.path.join(run_dir, "stability.json"), "w") as f:
+        json.dump({"threshold": STABLE_COV, "noise_control": settings, "cells": stability},
+                  f, indent=2)
+    print(f"{len(results) - len(failed)}/{len(results)} repetitions ok -> {run_dir}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
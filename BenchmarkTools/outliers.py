@@ -0,0 +1,161 @@
+import argparse
+import glob
+import os
+import re
+
+from results_store import RESULTS_DB, ResultsStore
+from run_manifest import REPO_DIR
+
+# Per-run values compared within a configuration; see ResultsStore.runs()
+METRICS = ["throughput_mbps", "conn_time_s", "mean_cpu_pct", "handshake_ms"]
+# Runs are only compared with runs of the same configuration and payload
+CONFIG = ["kind", "source", "role", "scheme", "transport", "loss_pct", "size"]
+# Iglewicz and Hoaglin's cut-off for the modified z-score 0.6745 (x - median) / MAD
+THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+# The MAD is floored at this fraction of the median, so when most runs agree
+# to the last digit a run has to be about a quarter off before it counts
+MIN_RELATIVE_MAD = 0.05
+MIN_RUNS = 5
+# Both stacks sample every 100 ms and the Go samplers' first reading (and the
+# Python ones' before they used the process clock) is always 0, so a run needs a
+# couple of samples inside the connection before 0 % means anything
+SAMPLE_INTERVAL_S = 0.1
+MIN_CPU_SPAN_S = 2 * SAMPLE_INTERVAL_S
+# What the Python servers log when a transfer did not arrive intact
+LOG_FAILURES = re.compile(r"incomplete|closed unexpectedly|verification failed", re.IGNORECASE)
+REASONS = {"outlier": "metric far from the configuration's median",
+           "zero_cpu": "0 % CPU in every sample",
+           "bytes": "fewer bytes received than the run was asked to send",
+           "incomplete": "the run's log reports a truncated or unverified transfer",
+           "empty": "no samples or connections"}
+
+
+def robust_z(runs, metrics=METRICS, by=CONFIG, min_runs=MIN_RUNS):
+    """Modified z-score of each metric against its configuration's median and MAD.
+
+    NaN where the group has fewer than min_runs values or a median of 0.
+    """
+    import numpy as np
+    import pandas as pd
+    groups = runs[by].astype(object).where(runs[by].notna(), "").astype(str).agg("|".join, axis=1)
+    z = pd.DataFrame(index=runs.index)
+    for metric in metrics:
+        values = runs[metric].astype(float)
+        grouped = values.groupby(groups)
+        median = grouped.transform("median")
+        mad = (values - median).abs().groupby(groups).transform("median")
+        mad = np.maximum(mad, MIN_RELATIVE_MAD * median.abs())
+        count = grouped.transform("count")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = MAD_SCALE * (values - median) / mad
+        z[metric] = score.where((count >= min_runs) & (mad > 0))
+        z[f"{metric} median"] = median
+    return z
+
+
+def _log_failures(paths):
+    """First failure line of the *.log files next to or above each results file, by path."""
+    found, by_dir = {}, {}
+    for path in paths:
+        directory = os.path.dirname(path)
+        for candidate in (directory, os.path.dirname(directory)):
+            if candidate not in by_dir:
+                by_dir[candidate] = None
+                for log in sorted(glob.glob(os.path.join(candidate, "*.log"))):
+                    with open(log, errors="replace") as f:
+                        for line in f:
+                            if LOG_FAILURES.search(line):
+                                by_dir[candidate] = f"{os.path.basename(log)}: {line.strip()}"
+                                break
+                    if by_dir[candidate]:
+                        break
+            if by_dir[candidate]:
+                found[path] = by_dir[candidate]
+                break
+    return found
+
+
+def detect(runs, threshold=THRESHOLD, min_runs=MIN_RUNS):
+    """Flags for ResultsStore.runs() rows: a DataFrame of file_id, reason, detail.
+
+    Byte-identical copies are scored once, so the duplicates in the tree do
+    not pull the medians, and share the outcome.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = ["file_id", "reason", "detail"]
+    if runs.empty:
+        return pd.DataFrame(columns=columns)
+    numeric = ["rows", "payload_bytes", "message_bytes", "max_cpu_pct", *METRICS]
+    runs = runs.astype({column: float for column in numeric})
+    runs = runs.assign(size=runs["payload_bytes"].fillna(runs["message_bytes"]))
+    unique = runs.drop_duplicates("sha1").reset_index(drop=True)
+    flags = []
+
+    empty = unique["rows"].fillna(0) == 0
+    flags.append(unique[empty].assign(reason="empty", detail="no rows after the header"))
+
+    span = unique["conn_time_s"].fillna(unique["rows"] * SAMPLE_INTERVAL_S)
+    zero = ((unique["kind"] == "series") & ~empty & (unique["max_cpu_pct"].fillna(0) == 0)
+            & (span >= MIN_CPU_SPAN_S))
+    flags.append(unique[zero].assign(
+        reason="zero_cpu", detail=[f"0 % in all {n:.0f} samples over {s:.2f} s"
+                                   for n, s in zip(unique.loc[zero, "rows"], span[zero])]))
+
+    short = unique["message_bytes"] < unique["payload_bytes"]
+    flags.append(unique[short].assign(
+        reason="bytes", detail=[f"received {m:.0f} of {p:.0f} bytes" for m, p in
+                                zip(unique.loc[short, "message_bytes"],
+                                    unique.loc[short, "payload_bytes"])]))
+
+    failures = _log_failures(unique["path"])
+    failed = unique["path"].isin(failures)
+    flags.append(unique[failed].assign(reason="incomplete",
+                                       detail=unique.loc[failed, "path"].map(failures)))
+
+    z = robust_z(unique, min_runs=min_runs)
+    for metric in METRICS:
+        far = (z[metric].abs() > threshold).to_numpy()
+        if not far.any():
+            continue
+        flags.append(unique[far].assign(
+            reason="outlier",
+            detail=[f"{metric} {v:.4g} vs median {m:.4g} (z {s:+.1f})" for v, m, s in
+                    zip(unique.loc[far, metric], z.loc[far, f"{metric} median"],
+                        z.loc[far, metric])]))
+
+    flags = pd.concat([f[["sha1", "reason", "detail"]] for f in flags], ignore_index=True)
+    # Every copy of a flagged file gets its flags
+    flags = runs[["file_id", "sha1"]].merge(flags, on="sha1")
+    return flags[columns].sort_values(["file_id", "reason"], kind="stable").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-run the outlier and integrity checks over the results store and "
+                    "list the flagged runs that plots leave out")
+    parser.add_argument("--db", default=RESULTS_DB)
+    parser.add_argument("--ingest", nargs="*", default=[REPO_DIR], metavar="ROOT",
+                        help="Index these roots first (default: the repository); "
+                             "pass no value to skip")
+    parser.add_argument("--under", help="Only list files below this directory")
+    parser.add_argument("--reason", choices=list(REASONS))
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.ingest:
+            store.ingest(args.ingest)
+        total = store.flag()
+        flagged = store.flagged(under=args.under)
+    if args.reason:
+        flagged = flagged[flagged["reason"] == args.reason]
+    for reason, group in flagged.groupby("reason", sort=True):
+        print(f"{reason} ({REASONS[reason]}): {group['file_id'].nunique()} files")
+        for row in group.itertuples():
+            print(f"  {os.path.relpath(row.path)}: {row.detail}")
+    print(f"{flagged['file_id'].nunique()} flagged files listed, {total} flags in the store")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from csv_loader import default_workers
+from loss_curves import LOSS_COLUMN, PERCENTILES, derive
+from results_store import RESULTS_DB, ResultsStore
+from run_manifest import REPO_DIR
+from smoothing import DECIMATORS, MAX_POINTS, SMOOTHERS, WINDOW
+
+PLOT_DIR = os.path.join(REPO_DIR, "runs", "plots")
+CACHE_FILE = ".plot-cache.json"
+GROUP_BY = ["source", "role", "family", "transport"]
+FILTERS = ["role", "family", "scheme", "transport", "source", "run_id"]
+SERIES_METRICS = ["CPU (%)", "Memory (MB)"]
+BOX_METRICS = ["CPU (%)", "Memory (MB)", "Throughput (MB/s)"]
+SUMMARY_METRICS = ["Connection Time(s)", "Throughput (MB/s)"]
+CONNECTION_METRICS = ["Handshake(ms)", "Latency(ms)", "RTT(ms)", "TTC(ms)"]
+SOAK_METRICS = ["RSS (MB)", "Threads", "FDs", "Throughput (MB/s)"]
+FIGSIZE = (10, 6)
+DPI = 100
+
+with open(os.path.abspath(__file__), "rb") as _f:
+    # Part of every cache key, so changing how figures are drawn re-renders them
+    CODE_VERSION = hashlib.sha1(_f.read()).hexdigest()
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def group_label(row, by):
+    return " ".join(str(row[key]) for key in by if row[key] is not None and row[key] == row[key])
+
+
+# ----------- Renderers ------------
+# Module-level so worker processes can run them. Each takes the output path,
+# the data prepared for that figure and its options.
+
+
+def _figure(options):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=options.get("figsize", FIGSIZE))
+    return plt, fig, ax
+
+
+def _finish(plt, fig, ax, path, options):
+    ax.set_title(options.get("title", ""))
+    ax.set_xlabel(options.get("xlabel", ""))
+    ax.set_ylabel(options.get("ylabel", ""))
+    ax.grid(True, alpha=0.5)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=DPI)
+    plt.close(fig)
+
+
+def _reduce(x, columns, options):
+    """Smooth each column, then pick the samples to draw from the first one.
+
+    Returns (x, columns) cut to at most about max_points samples, so hours
+    of 100 ms samples draw as fast as a short run and keep their peaks.
+    """
+    import numpy as np
+    from smoothing import decimate, smooth
+    x = np.asarray(x, dtype=float)
+    columns = [smooth(c, options.get("smooth", "none"), options.get("window", WINDOW))
+               for c in columns]
+    keep = decimate(x, columns[0], options.get("max_points", MAX_POINTS),
+                    options.get("decimate", "lttb"))
+    return x[keep], [c[keep] for c in columns]
+
+
+def render_timeseries(path, groups, options):
+    """Mean of the runs in each group on a common time grid, with the p10-p90 band."""
+    from resample import average_runs
+    plt, fig, ax = _figure(options)
+    metric = options["metric"]
+    for label, frame in groups.items():
+        runs = [run for _, run in frame.groupby("file_id")]
+        # The tail that fewer than a tenth of the runs reach would be one run's noise
+        averaged = average_runs(runs, "Time(s)", [metric], min_runs=max(1, len(runs) // 10))
+        if averaged.empty:
+            continue
+        x, (mean, low, high) = _reduce(
+            averaged["Time(s)"], [averaged[metric], averaged[f"{metric} p10"],
+                                  averaged[f"{metric} p90"]], options)
+        line, = ax.plot(x, mean, label=f"{label} ({len(runs)} runs)" if len(runs) > 1 else label)
+        if len(runs) > 1:
+            ax.fill_between(x, low, high, color=line.get_color(), alpha=0.15, linewidth=0)
+    _finish(plt, fig, ax, path, options)
+
+
+def render_box(path, groups, options):
+    plt, fig, ax = _figure(options)
+    labels = list(groups)
+    ax.boxplot([groups[label] for label in labels], showfliers=options.get("fliers", True))
+    ax.set_xticks(range(1, len(labels) + 1), labels, rotation=15)
+    _finish(plt, fig, ax, path, options)
+
+
+def render_bars(path, groups, options):
+    """Mean of the per-file values with one standard deviation as the error bar."""
+    import numpy as np
+    plt, fig, ax = _figure(options)
+    labels = list(groups)
+    means = [float(np.mean(groups[label])) for label in labels]
+    errors = [float(np.std(groups[label], ddof=1)) if len(groups[label]) > 1 else 0.0
+              for label in labels]
+    colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+    ax.bar(labels, means, yerr=errors, capsize=4,
+           color=[colors[i % len(colors)] for i in range(len(labels))])
+    ax.tick_params(axis="x", rotation=15)
+    _finish(plt, fig, ax, path, options)
+
+
+def render_loss(path, table, options):
+    plt, fig, ax = _figure(options)
+    metric = options["metric"]
+    for i, (label, rows) in enumerate(table.groupby("Label", sort=True)):
+        rows = rows.sort_values(LOSS_COLUMN)
+        ax.plot(rows[LOSS_COLUMN], rows[metric], marker="o", linestyle=["-", "--"][i % 2],
+                label=label)
+    _finish(plt, fig, ax, path, options)
+
+
+def render_file(path, frame, options):
+    """One results file, decimated to the figure's resolution."""
+    plt, fig, ax = _figure(options)
+    x, (y,) = _reduce(frame["Time(s)"], [frame[options["metric"]]], options)
+    ax.plot(x, y)
+    _finish(plt, fig, ax, path, options)
+
+
+def render_lines(path, frames, options):
+    """One line per labelled frame, e.g. the series of several soak runs."""
+    plt, fig, ax = _figure(options)
+    for label, frame in frames.items():
+        x, (y,) = _reduce(frame["Time(s)"], [frame[options["metric"]]], options)
+        ax.plot(x, y, label=label)
+    _finish(plt, fig, ax, path, options)
+
+
+RENDERERS = {f.__name__: f for f in (render_timeseries, render_box, render_bars, render_loss,
+                                     render_file, render_lines)}
+
+
+def _render(job):
+    started = time.perf_counter()
+    RENDERERS[job["render"]](job["path"], job["data"], job["options"])
+    return job["path"], time.perf_counter() - started
+
+
+# ----------- Planning ------------
+# A plan is one figure: its file name, renderer, options and the inputs it
+# depends on. Data is only loaded for the figures whose key changed.
+
+
+def figure_key(plan):
+    payload = json.dumps([CODE_VERSION, plan["render"], plan["options"], sorted(plan["inputs"])],
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _labelled(files, by):
+    files = files.copy()
+    files["label"] = [group_label(row, by) for _, row in files.iterrows()]
+    return files.sort_values(["label", "id"])
+
+
+def _inputs(files):
+    """(sha1, label) pairs, so regrouping with --by or a changed label redraws the figure."""
+    return sorted([sha1, label] for sha1, label in zip(files["sha1"], files["label"]))
+
+
+def _series_options(args):
+    return {"smooth": args.smooth, "window": args.window, "max_points": args.max_points,
+            "decimate": args.decimate}
+
+
+def plan_timeseries(files, args):
+    files = _labelled(files, args.by)
+    plans = []
+    for metric in args.metrics or SERIES_METRICS:
+        plans.append({"name": f"timeseries_{slug(metric)}.png", "render": "render_timeseries",
+                      "options": {"metric": metric, "title": f"{metric} over time",
+                                  "xlabel": "Time (s)", "ylabel": metric,
+                                  **_series_options(args)},
+                      "inputs": _inputs(files), "files": files})
+    return plans
+
+
+def plan_box(files, args):
+    files = _labelled(files, args.by)
+    default = CONNECTION_METRICS if args.kind == "connections" else BOX_METRICS
+    return [{"name": f"box_{args.kind}_{slug(metric)}.png", "render": "render_box",
+             "options": {"metric": metric, "title": f"{metric} distribution", "ylabel": metric,
+                         "fliers": not args.no_fliers},
+             "inputs": _inputs(files), "files": files}
+            for metric in args.metrics or default]
+
+
+def plan_bars(files, args):
+    files = _labelled(files, args.by)
+    return [{"name": f"bars_{slug(metric)}.png", "render": "render_bars",
+             "options": {"metric": metric, "title": f"Average {metric}", "ylabel": metric},
+             "inputs": _inputs(files), "files": files}
+            for metric in args.metrics or SUMMARY_METRICS]
+
+
+def plan_files(files, args):
+    plans = []
+    files = _labelled(files, args.by)
+    for _, row in files.iterrows():
+        stem = os.path.splitext(os.path.basename(row["path"]))[0]
+        for metric in args.metrics or SERIES_METRICS:
+            name = f"{slug(row['label'])}_{slug(stem)}_{slug(metric)}.png"
+            plans.append({"name": name, "render": "render_file",
+                          "options": {"metric": metric, "xlabel": "Time (s)", "ylabel": metric,
+                                      "title": f"{metric} - {os.path.basename(row['path'])}",
+                                      **_series_options(args)},
+                          "inputs": [[row["sha1"], row["label"]]],
+                          "files": files[files["id"] == row["id"]]})
+    return plans
+
+
+def prepare(plan, kind, store):
+    """The data a renderer needs for one plan, queried from the store."""
+    import numpy as np
+    files = plan["files"]
+    metric = plan["options"]["metric"]
+    labels = dict(zip(files["id"], files["label"]))
+    rows = store.series if kind == "series" else store.connections
+    frame = rows(unique=False, ids=files["id"].tolist())
+    if plan["render"] == "render_file":
+        return frame[["Time(s)", metric]]
+    frame = frame.assign(label=frame["file_id"].map(labels))
+    if plan["render"] == "render_timeseries":
+        return {label: rows[["file_id", "Time(s)", metric]]
+                for label, rows in frame.groupby("label", sort=True)}
+    if plan["render"] == "render_bars":  # one value per file
+        per_file = frame.groupby(["label", "file_id"])[metric].mean().dropna()
+        return {label: values.to_numpy() for label, values in per_file.groupby(level=0)}
+    return {label: rows[metric].dropna().to_numpy(dtype=np.float64)
+            for label, rows in frame.groupby("label", sort=True)}
+
+
+def plan_loss(table_path, args, store=None):
+    """Loss curves from a table, or derived from the loss-tagged client logs in the store."""
+    import pandas as pd
+    if table_path:
+        table = pd.read_csv(table_path)
+        with open(table_path, "rb") as f:
+            inputs = [hashlib.sha1(f.read()).hexdigest()]
+        metrics = args.metrics or [c for c in table.columns if c not in (LOSS_COLUMN, "Label")]
+    else:
+        criteria = {key: getattr(args, key) for key in FILTERS}
+        table, files = derive(store, args.by, PERCENTILES, args.under, args.include_flagged,
+                              args.include_warmup, **criteria)
+        if table.empty:
+            return []
+        inputs = _inputs(_labelled(files, args.by))
+        metrics = [f"{m} {args.stat}" for m in args.metrics or CONNECTION_METRICS]
+        # Python client runs only know their handshake, so a curve set made of
+        # them has nothing to draw for latency, RTT or TTC
+        metrics = [m for m in metrics if table[m].notna().any()]
+    return [{"name": f"loss_{slug(metric)}.png", "render": "render_loss",
+             "options": {"metric": metric, "title": f"{metric} under packet loss",
+                         "xlabel": LOSS_COLUMN, "ylabel": metric},
+             "inputs": inputs, "data": table[[LOSS_COLUMN, "Label", metric]]}
+            for metric in metrics]
+
+
+def plan_soak(paths, args):
+    """One figure per soak column, a line per soak CSV (soak.py output)."""
+    import pandas as pd
+    frames, inputs = {}, []
+    for path in paths:
+        with open(path, "rb") as f:
+            inputs.append(hashlib.sha1(f.read()).hexdigest())
+        run_dir = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(path))))
+        stem = os.path.splitext(os.path.basename(path))[0].removeprefix("soak_")
+        frames[f"{run_dir} {stem}".strip()] = pd.read_csv(path)
+    metrics = args.metrics or SOAK_METRICS
+    return [{"name": f"soak_{slug(metric)}.png", "render": "render_lines",
+             "options": {"metric": metric, "title": f"{metric} during the soak",
+                         "xlabel": "Time (s)", "ylabel": metric, **_series_options(args)},
+             "inputs": inputs,
+             "data": {label: frame[["Time(s)", metric]] for label, frame in frames.items()
+                      if metric in frame.columns}}
+            for metric in metrics]
+
+
+# ----------- Rendering ------------
+
+
+def load_cache(out_dir):
+    path = os.path.join(out_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def render_plans(plans, out_dir, kind=None, store=None, force=False, workers=None):
+    """Render the plans whose inputs changed; returns (rendered, skipped) paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    cache = load_cache(out_dir)
+    jobs, skipped = [], []
+    for plan in plans:
+        path = os.path.join(out_dir, plan["name"])
+        key = figure_key(plan)
+        if not force and cache.get(plan["name"]) == key and os.path.exists(path):
+            skipped.append(path)
+            continue
+        data = plan["data"] if "data" in plan else prepare(plan, kind, store)
+        jobs.append({"path": path, "render": plan["render"], "data": data,
+                     "options": plan["options"], "name": plan["name"], "key": key})
+    workers = workers or default_workers()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            list(pool.map(_render, jobs))
+    else:
+        for job in jobs:
+            _render(job)
+    cache.update({job["name"]: job["key"] for job in jobs})
+    with open(os.path.join(out_dir, CACHE_FILE), "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    return [job["path"] for job in jobs], skipped
+
+
+PLANNERS = {"timeseries": ("series", plan_timeseries), "box": (None, plan_box),
+            "bars": ("series", plan_bars), "files": ("series", plan_files)}
+
+
+def excluded(store, kind, args):
+    """Flags of the runs matching the filters that are left out of the figures."""
+    criteria = {key: getattr(args, key) for key in FILTERS}
+    flagged = store.flagged(kind=kind, under=args.under, **criteria)
+    if args.command == "loss":
+        flagged = flagged[flagged["loss_pct"].notna() & ((flagged["kind"] == "connections")
+                                                         | flagged["handshake_ms"].notna())]
+    return flagged.drop_duplicates(["sha1", "reason", "detail"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plot benchmark results from the results store; only figures whose "
+                    "inputs changed are rendered")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=RESULTS_DB)
+    common.add_argument("--ingest", nargs="*", default=[REPO_DIR], metavar="ROOT",
+                        help="Index these roots before plotting (default: the repository); "
+                             "pass no value to skip")
+    common.add_argument("--out", default=PLOT_DIR)
+    common.add_argument("--metrics", nargs="+")
+    common.add_argument("--by", default=",".join(GROUP_BY),
+                        help="File attributes that name a line/box/bar")
+    common.add_argument("--under", help="Only files below this directory")
+    common.add_argument("--latest", action="store_true",
+                        help="Only the newest file per role/family/transport")
+    for key in FILTERS:
+        common.add_argument(f"--{key.replace('_', '-')}")
+    common.add_argument("--include-flagged", action="store_true",
+                        help="Keep runs the outlier and integrity checks flagged (outliers.py)")
+    common.add_argument("--include-warmup", action="store_true",
+                        help="Keep the warmup repetitions of orchestrated runs")
+    common.add_argument("--force", action="store_true", help="Ignore the render cache")
+    common.add_argument("--workers", type=int, help="Render processes (default: one per CPU)")
+    series = argparse.ArgumentParser(add_help=False)
+    series.add_argument("--smooth", choices=SMOOTHERS, default="none",
+                        help="Rolling filter applied before decimation")
+    series.add_argument("--window", type=int, default=WINDOW,
+                        help="Samples per rolling window, or the EWMA span")
+    series.add_argument("--max-points", type=int, default=MAX_POINTS,
+                        help="Samples drawn per line; 0 draws all of them")
+    series.add_argument("--decimate", choices=DECIMATORS, default="lttb",
+                        help="lttb keeps the shape, minmax the exact envelope")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("timeseries", parents=[common, series], help="Mean time series per group")
+    box = sub.add_parser("box", parents=[common], help="Distribution per group")
+    box.add_argument("--kind", choices=["series", "connections"], default="series",
+                     help="Resource samples or per-connection client metrics")
+    box.add_argument("--no-fliers", action="store_true")
+    sub.add_parser("bars", parents=[common], help="Mean of the per-run summaries per group")
+    sub.add_parser("files", parents=[common, series], help="One figure per results file")
+    soak = sub.add_parser("soak", parents=[common, series], help="Series of soak.py runs")
+    soak.add_argument("csvs", nargs="+", metavar="CSV", help="runs/<id>/soak/soak_*.csv")
+    loss = sub.add_parser("loss", parents=[common], help="Metrics against packet loss")
+    loss.add_argument("--table",
+                      help=f"CSV with '{LOSS_COLUMN}', 'Label' and one column per metric; "
+                           "default: derived from the loss-tagged client logs in the store")
+    loss.add_argument("--stat", default=f"p{PERCENTILES[0]}",
+                      choices=["mean", *[f"p{p}" for p in PERCENTILES]],
+                      help="Statistic of each connection metric to draw when deriving")
+    args = parser.parse_args()
+    args.by = [key for key in args.by.split(",") if key]
+
+    started = time.perf_counter()
+    flagged = None
+    with ResultsStore(args.db) as store:
+        if args.command == "loss":
+            if args.ingest and not args.table:
+                store.ingest(args.ingest)
+            kind, plans = None, plan_loss(args.table, args, store)
+            if not args.table and not args.include_flagged:
+                flagged = excluded(store, None, args)
+            if not plans:
+                parser.error("no loss-tagged client logs match the filters")
+        elif args.command == "soak":
+            kind, plans = None, plan_soak(args.csvs, args)
+        else:
+            if args.ingest:
+                store.ingest(args.ingest)
+            kind, planner = PLANNERS[args.command]
+            kind = kind or args.kind
+            criteria = {key: getattr(args, key) for key in FILTERS}
+            files = store.files(kind=kind, under=args.under, latest=args.latest,
+                                include_flagged=args.include_flagged,
+                                include_warmup=args.include_warmup, **criteria)
+            if not args.include_flagged:
+                flagged = excluded(store, kind, args)
+            if files.empty:
+                parser.error("no results match the filters")
+            plans = planner(files, args)
+        rendered, skipped = render_plans(plans, args.out, kind, store, args.force, args.workers)
+    if flagged is not None and len(flagged):
+        print(f"Left out {flagged['sha1'].nunique()} flagged runs (--include-flagged keeps them):")
+        for row in flagged.itertuples():
+            print(f"  {os.path.relpath(row.path)}: {row.reason}, {row.detail}")
+    print(f"{len(rendered)} rendered, {len(skipped)} up to date in "
+          f"{time.perf_counter() - started:.1f}s -> {args.out}")
+    for path in rendered:
+        print(f"  {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from run_manifest import collect_environment
+from stats_compare import (ALPHA, LOWER_IS_BETTER, PHASE_METRICS,
+                           collect_samples, compare)
+
+CONFIG_KEYS = ["role", "scheme", "transport", "op", "data_size", "chunk_size"]
+GATE_METRICS = ["Connection Time(s)", "Throughput (MB/s)", "Mean CPU (%)",
+                "Peak Memory (MB)", "CPU s/MB", *PHASE_METRICS, "Op time (ns)"]
+# Relative change of the median tolerated before a slowdown counts as a regression
+DEFAULT_TOLERANCE = 0.10
+TOLERANCES = {
+    "Mean CPU (%)": 0.20,        # sampled at 100 ms, very noisy for short transfers
+    "Peak Memory (MB)": 0.05,
+    "Phase handshake (ms)": 0.20,
+    "Phase key_load CPU (ms)": 0.25,
+}
+NOISE_MADS = 3.0  # with too few samples for a test, also require the shift to exceed this many MADs
+# Below this many baseline values (or with a MAD of 0) the spread says nothing,
+# so a shift beyond the tolerance is judged on the tolerance alone
+MIN_MAD_N = 3
+
+
+def config_name(config):
+    return " ".join(f"{k}={config[k]}" for k in CONFIG_KEYS
+                    if config.get(k) is not None and config[k] == config[k])  # skip None/NaN
+
+
+def summarise(samples, metrics=GATE_METRICS):
+    """Per configuration and metric, the raw values plus median and MAD."""
+    configs = []
+    keys = [k for k in CONFIG_KEYS if k in samples]
+    for values, group in samples.groupby(keys, dropna=False):
+        config = dict(zip(keys, values if isinstance(values, tuple) else (values,)))
+        entry = {"config": {k: (v.item() if hasattr(v, "item") else v) for k, v in config.items()},
+                 "metrics": {}}
+        for metric in metrics:
+            if metric not in group:
+                continue
+            data = group[metric].dropna().astype(float).to_numpy()
+            if not len(data):
+                continue
+            median = float(np.median(data))
+            entry["metrics"][metric] = {
+                "n": len(data),
+                "median": median,
+                "mad": float(np.median(np.abs(data - median))),
+                "values": data.tolist(),
+            }
+        configs.append(entry)
+    return configs
+
+
+def save_baseline(run_dir, path, include_warmup=False):
+    baseline = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "source": run_dir,
+        "environment": collect_environment(),
+        "configs": summarise(collect_samples(run_dir, include_warmup)),
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    return baseline
+
+
+def check_metric(metric, base, current, tolerance, alpha=ALPHA):
+    """Classify one metric as ok / improved / regression / noise."""
+    result = compare(base["values"], current["values"], metric=metric, alpha=alpha)
+    change = result["relative_change"]
+    worse = change > 0 if metric in LOWER_IS_BETTER else change < 0
+    beyond_tolerance = not math.isnan(change) and abs(change) > tolerance
+    flags = list(result["flags"])
+    if result["flags"] and (base["n"] < MIN_MAD_N or base["mad"] == 0):
+        significant = True
+        flags.append(f"tolerance only: baseline n={base['n']}, MAD={base['mad']:.3g}")
+    elif result["flags"]:
+        # Not enough samples for the test: fall back to the baseline's own spread
+        shift = abs(result["median_b"] - result["median_a"])
+        significant = shift > NOISE_MADS * base["mad"]
+    else:
+        significant = result["p"] < alpha
+    if beyond_tolerance and significant:
+        status = "REGRESSION" if worse else "improved"
+    elif beyond_tolerance:
+        status = "noise"
+    else:
+        status = "ok"
+    return {"metric": metric, "status": status, "tolerance": tolerance,
+            "baseline_median": result["median_a"], "current_median": result["median_b"],
+            "relative_change": change, "p": result["p"], "n_baseline": result["n_a"],
+            "n_current": result["n_b"], "flags": flags}
+
+
+def check(run_dir, baseline, tolerances=None, alpha=ALPHA, include_warmup=False):
+    tolerances = tolerances or {}
+    # A blanket tolerance replaces the built-in per-metric ones; named ones refine it
+    tolerances = {**({} if "default" in tolerances else TOLERANCES), **tolerances}
+    current = {config_name(c["config"]): c
+               for c in summarise(collect_samples(run_dir, include_warmup))}
+    report = []
+    for base in baseline["configs"]:
+        name = config_name(base["config"])
+        entry = {"config": name, "metrics": [], "missing_metrics": []}
+        if name not in current:
+            entry["missing"] = True
+            report.append(entry)
+            continue
+        for metric, base_stats in base["metrics"].items():
+            cur_stats = current[name]["metrics"].get(metric)
+            if cur_stats is None:
+                entry["missing_metrics"].append(metric)
+                continue
+            entry["metrics"].append(check_metric(
+                metric, base_stats, cur_stats,
+                tolerances.get(metric, tolerances.get("default", DEFAULT_TOLERANCE)), alpha))
+        report.append(entry)
+    return report
+
+
+def missing_from(report):
+    """(configuration, metric) pairs of the baseline the run has no values for; metric
+    is None when the whole configuration is missing."""
+    return [(e["config"], None) for e in report if e.get("missing")] + \
+        [(e["config"], m) for e in report for m in e.get("missing_metrics", [])]
+
+
+def print_report(report):
+    """Print the report; returns (regressions, missing)."""
+    for entry in report:
+        print(entry["config"])
+        if entry.get("missing"):
+            print("  !! not in this run")
+            continue
+        for metric in entry.get("missing_metrics", []):
+            print(f"  !! {metric:<26} not in this run")
+        for m in entry["metrics"]:
+            marker = {"REGRESSION": "!!", "improved": "++", "noise": "~ "}.get(m["status"], "  ")
+            flags = f" [{'; '.join(m['flags'])}]" if m["flags"] else ""
+            print(f"  {marker} {m['metric']:<26} {m['baseline_median']:>12.4g} -> "
+                  f"{m['current_median']:<12.4g} {m['relative_change'] * 100:+7.1f}% "
+                  f"(tol {m['tolerance'] * 100:.0f}%, p={m['p']:.3g}) {m['status']}{flags}")
+    regressions = [(e["config"], m["metric"]) for e in report for m in e["metrics"]
+                   if m["status"] == "REGRESSION"]
+    slower_phases = sorted({m for _, m in regressions if m.startswith("Phase ")})
+    missing = missing_from(report)
+    print()
+    if regressions:
+        print(f"{len(regressions)} regression(s)")
+        if slower_phases:
+            print("Slower phases: " + ", ".join(p[len("Phase "):] for p in slower_phases))
+    elif not missing:
+        print("No regressions")
+    if missing:
+        configs = sum(metric is None for _, metric in missing)
+        print(f"Incomplete run: {configs} baseline configuration(s) and "
+              f"{len(missing) - configs} metric(s) have no values, so they were not checked")
+    return regressions, missing
+
+
+def _tolerance(text):
+    metric, _, value = text.rpartition("=")
+    return metric or "default", float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Save a benchmark baseline, or check a run against one")
+    sub = parser.add_subparsers(dest="command", required=True)
+    save = sub.add_parser("save", help="Summarise a run directory into a baseline file")
+    save.add_argument("run_dir")
+    save.add_argument("--baseline", required=True)
+    save.add_argument("--include-warmup", action="store_true")
+    chk = sub.add_parser("check", help="Exit 1 if the run regressed against the baseline "
+                                        "or lacks any of its configurations or metrics")
+    chk.add_argument("run_dir")
+    chk.add_argument("--baseline", required=True)
+    chk.add_argument("--tolerance", type=_tolerance, action="append", default=[],
+                     metavar="[METRIC=]FRACTION",
+                     help='e.g. 0.05 for every metric, or "Throughput (MB/s)=0.03"')
+    chk.add_argument("--alpha", type=float, default=ALPHA)
+    chk.add_argument("--include-warmup", action="store_true")
+    chk.add_argument("--json", help="Also write the report here")
+    args = parser.parse_args()
+
+    if args.command == "save":
+        baseline = save_baseline(args.run_dir, args.baseline, args.include_warmup)
+        print(f"Saved {len(baseline['configs'])} configurations to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    report = check(args.run_dir, baseline, dict(args.tolerance), args.alpha,
+                   args.include_warmup)
+    regressions, missing = print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"baseline": args.baseline, "run_dir": args.run_dir, "report": report},
+                      f, indent=2)
+    sys.exit(1 if regressions or missing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+
+PERCENTILES = [10, 90]
+METHODS = ["interp", "bin"]
+
+
+def infer_step(times):
+    """Median sampling interval over all runs (100 ms for both implementations)."""
+    diffs = [np.diff(t) for t in times if len(t) > 1]
+    diffs = np.concatenate(diffs) if diffs else np.array([])
+    diffs = diffs[diffs > 0]
+    return float(np.median(diffs)) if len(diffs) else 1.0
+
+
+def common_grid(times, step=None):
+    """Grid from the earliest first sample to the latest last one.
+
+    The grid spans the longest run, so long transfers are not cut to the
+    length of the shortest.
+    """
+    step = step or infer_step(times)
+    starts = [t[0] for t in times if len(t)]
+    ends = [t[-1] for t in times if len(t)]
+    if not starts:
+        return np.array([]), step
+    start = min(starts)
+    return start + step * np.arange(int(np.floor((max(ends) - start) / step + 1e-9)) + 1), step
+
+
+def _interp(t, v, grid):
+    out = np.full((len(grid), v.shape[1]), np.nan)
+    inside = (grid >= t[0]) & (grid <= t[-1])  # no extrapolation past a run's own span
+    for j in range(v.shape[1]):
+        ok = ~np.isnan(v[:, j])
+        if ok.sum() >= 2:
+            out[inside, j] = np.interp(grid[inside], t[ok], v[ok, j])
+    return out
+
+
+def _bin(t, v, grid, step):
+    index = np.floor((t - grid[0]) / step + 0.5).astype(int)  # nearest grid point
+    keep = (index >= 0) & (index < len(grid))
+    index, v = index[keep], v[keep]
+    out = np.full((len(grid), v.shape[1]), np.nan)
+    for j in range(v.shape[1]):
+        ok = ~np.isnan(v[:, j])
+        counts = np.bincount(index[ok], minlength=len(grid))
+        sums = np.bincount(index[ok], weights=v[ok, j], minlength=len(grid))
+        filled = counts > 0
+        out[filled, j] = sums[filled] / counts[filled]
+    return out
+
+
+def align(times, values, grid, method="interp", step=None):
+    """Resample each run onto grid.
+
+    times is a list of 1-D timestamp arrays, values a list of (samples,
+    metrics) arrays. Returns a (runs, len(grid), metrics) array that is NaN
+    wherever a run has no data, so runs of different lengths can be reduced
+    with the nan-aware NumPy functions.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown resampling method: {method}")
+    metrics = values[0].shape[1] if values else 0
+    stack = np.full((len(times), len(grid), metrics), np.nan)
+    for i, (t, v) in enumerate(zip(times, values)):
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(v, dtype=float).reshape(len(t), metrics)
+        valid = ~np.isnan(t)
+        t, v = t[valid], v[valid]
+        if len(t) < 2:
+            continue
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+        stack[i] = _interp(t, v, grid) if method == "interp" else _bin(t, v, grid, step)
+    return stack
+
+
+def bands(stack, percentiles=PERCENTILES):
+    """Mean, percentiles and contributing run count per grid point."""
+    runs = np.sum(~np.isnan(stack), axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN grid points stay NaN
+        mean = np.nanmean(stack, axis=0)
+        spread = {p: np.nanpercentile(stack, p, axis=0) for p in percentiles}
+    return mean, spread, runs
+
+
+def average_runs(frames, time_column, columns=None, step=None, method="interp",
+                 percentiles=PERCENTILES, min_runs=1):
+    """Average DataFrames of several runs on a common time grid.
+
+    Returns a DataFrame with time_column, the mean of each column under its
+    own name, "<column> p<N>" bands and "Runs", the number of runs
+    contributing to each point. Points covered by fewer than min_runs runs
+    are dropped.
+    """
+    import pandas as pd
+    frames = [f for f in frames if len(f) and time_column in f.columns]
+    if not frames:
+        return pd.DataFrame()
+    if columns is None:
+        columns = [c for c in frames[0].select_dtypes(include="number").columns
+                   if c != time_column]
+    times = [f[time_column].to_numpy(dtype=float) for f in frames]
+    values = [f.reindex(columns=columns).to_numpy(dtype=float) for f in frames]
+    grid, step = common_grid(times, step)
+    mean, spread, runs = bands(align(times, values, grid, method, step), percentiles)
+    out = {time_column: grid}
+    for j, column in enumerate(columns):
+        out[column] = mean[:, j]
+    for p, data in spread.items():
+        for j, column in enumerate(columns):
+            out[f"{column} p{p}"] = data[:, j]
+    out["Runs"] = runs.max(axis=1) if len(columns) else np.zeros(len(grid), dtype=int)
+    result = pd.DataFrame(out)
+    return result[result["Runs"] >= max(min_runs, 1)].reset_index(drop=True)
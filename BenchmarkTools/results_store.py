@@ -0,0 +1,590 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+from run_manifest import REPO_DIR, manifest_path
+
+RESULTS_DB = os.path.join(REPO_DIR, "runs", "results.sqlite")
+EXTENSIONS = (".csv", ".npz", ".parquet")
+# bench_writer's split format keeps the summary beside the series
+SUMMARY_SUFFIXES = ("_summary.csv", "_summary.parquet")
+SKIP_DIRS = {".git", "__pycache__", ".venv", "venv"}
+STAMP = re.compile(r"(\d{8})-(\d{6})")
+# "loss5", "loss-10", "loss_2.5pct": the packet loss in percent, as sweep.py
+# names its cells and as loss experiments without a relay can be filed
+LOSS_TAG = re.compile(r"(?:^|[^a-z])loss[-_=]?(\d+(?:\.\d+)?)(?:pct|%)?(?![\d.])")
+# Bumped when the tables change; an older store is dropped and re-indexed
+STORE_VERSION = 6
+# orchestrate.py's warmup repetitions, which are kept but never analysed
+WARMUP_DIR = f"{os.sep}warmup-"
+
+# Source schemas mapped onto the store's columns, with a unit scale.
+# The Python scripts log seconds and "CPU (%)", the Go implementation
+# milliseconds and "CPU(%)".
+PYTHON_SERIES = {"Time(s)": ("time_s", 1.0), "CPU (%)": ("cpu_pct", 1.0),
+                 "Memory (MB)": ("memory_mb", 1.0)}
+PYTHON_SUMMARY = {"Connection Time(s)": "conn_time_s",
+                  "Signed Message Size (bytes)": "message_bytes",
+                  "Throughput (MB/s)": "throughput_mbps"}
+GO_SERVER = {"Elapsed(ms)": ("time_s", 0.001), "CPU(%)": ("cpu_pct", 1.0),
+             "Memory(MB)": ("memory_mb", 1.0), "Throughput(MB/s)": ("throughput_mbps", 1.0),
+             "ConnDuration(s)": ("conn_s", 1.0)}
+GO_CLIENT = {"Handshake(ms)": "handshake_ms", "Latency(ms)": "latency_ms", "RTT(ms)": "rtt_ms",
+             "TTC(ms)": "ttc_ms"}
+# Query results use the Python scripts' column names, which the plots expect
+SERIES_NAMES = {"time_s": "Time(s)", "cpu_pct": "CPU (%)", "memory_mb": "Memory (MB)",
+                "throughput_mbps": "Throughput (MB/s)", "conn_s": "Connection Time(s)"}
+CONNECTION_NAMES = {v: k for k, v in GO_CLIENT.items()}
+FILE_COLUMNS = ["path", "kind", "source", "role", "scheme", "family", "transport", "run_id",
+                "started", "loss_pct", "op", "mtime", "size", "sha1"]
+# Rows of each kind of file; microbench.py's per-iteration times go to timings
+TABLES = {"series": "samples", "connections": "connections", "micro": "timings"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    kind TEXT NOT NULL,      -- series, connections, micro, other or error
+    source TEXT,             -- python or go
+    role TEXT,
+    scheme TEXT,             -- variant from the manifest when there is one, else the family
+    family TEXT,             -- RSA or ML-DSA
+    transport TEXT,
+    run_id TEXT,
+    started TEXT,            -- timestamp in the file name, ISO 8601
+    loss_pct REAL,           -- packet loss the run was under, see loss_of()
+    payload_bytes REAL,      -- data size the run was asked to send, from the manifest
+    op TEXT,                 -- microbenchmarks: the timed operation, from the manifest
+    warmup INTEGER NOT NULL DEFAULT 0,  -- 1 under a warmup-NN repetition directory
+    handshake_ms REAL,       -- Python clients: the manifest's handshake correlation timings
+    conn_time_s REAL,
+    message_bytes REAL,
+    throughput_mbps REAL,
+    rows INTEGER,
+    error TEXT,
+    ingested_at REAL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    time_s REAL,
+    cpu_pct REAL,
+    memory_mb REAL,
+    throughput_mbps REAL,
+    conn_s REAL
+);
+CREATE TABLE IF NOT EXISTS connections (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    handshake_ms REAL,
+    latency_ms REAL,
+    rtt_ms REAL,
+    ttc_ms REAL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    time_ns REAL
+);
+CREATE TABLE IF NOT EXISTS flags (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,    -- see outliers.REASONS
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_file ON samples(file_id, seq);
+CREATE INDEX IF NOT EXISTS connections_file ON connections(file_id, seq);
+CREATE INDEX IF NOT EXISTS timings_file ON timings(file_id, seq);
+CREATE INDEX IF NOT EXISTS files_config ON files(kind, role, family, transport);
+CREATE INDEX IF NOT EXISTS flags_file ON flags(file_id);
+"""
+
+
+def sha1_of(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def describe_path(path):
+    """role, family, transport and start time guessed from a results path.
+
+    Covers the layouts in the tree: Output-Server/Output/server_benchmarks_rsa/
+    tcp_<stamp>.csv, .../client_benchmarks_mldsa/quic_dilithium_<stamp>.csv and
+    Results/Metrics/Client/mldsa-logs/client/quic/metrics-<stamp>.csv.
+    """
+    parts = [p.lower() for p in os.path.normpath(path).split(os.sep)]
+    name = parts[-1]
+    info = {"role": None, "family": None, "transport": None, "started": None}
+    for part in reversed(parts):
+        if info["role"] is None:
+            if "server" in part:
+                info["role"] = "server"
+            elif "client" in part:
+                info["role"] = "client"
+        if info["family"] is None:
+            if "mldsa" in part or "ml-dsa" in part or "dilithium" in part:
+                info["family"] = "ML-DSA"
+            elif "rsa" in part:
+                info["family"] = "RSA"
+        if info["transport"] is None:
+            tokens = re.split(r"[^a-z]+", part)
+            for transport in ("tcp", "quic"):
+                if transport in tokens:
+                    info["transport"] = transport
+    stamp = STAMP.search(name)
+    if stamp:
+        d, t = stamp.groups()
+        info["started"] = f"{d[:4]}-{d[4:6]}-{d[6:]}T{t[:2]}:{t[2:4]}:{t[4:]}"
+    return info
+
+
+def loss_of(path):
+    """Packet loss in percent a results file was recorded under, or None.
+
+    orchestrate.py leaves impair.json, with the relay's settings, in the
+    repetition directory above client/ and server/. Runs without it, such
+    as netem experiments, are tagged by a loss<N> path component.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    for candidate in (directory, os.path.dirname(directory)):
+        stats = os.path.join(candidate, "impair.json")
+        if os.path.exists(stats):
+            import json
+            with open(stats) as f:
+                impairment = json.load(f).get("impairment", {})
+            return 100.0 * float(impairment.get("loss", 0.0))
+    for part in reversed(os.path.normpath(path).lower().split(os.sep)):
+        match = LOSS_TAG.search(part)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _read_header(path):
+    if not path.endswith(".csv"):  # .npz and .parquet only come from bench_writer
+        return None
+    with open(path, newline="") as f:
+        return [c.strip() for c in f.readline().strip().split(",")]
+
+
+def parse_file(path, role=None):
+    """Normalise one results file.
+
+    Returns (kind, source, summary, rows) where rows are tuples in the column
+    order of the samples, connections or timings table. role is the manifest's,
+    which is all that marks a microbenchmark series.
+    """
+    import pandas as pd
+    if role == "micro":
+        from microbench import SERIES_COLUMNS
+        frame = pd.read_csv(path, usecols=[SERIES_COLUMNS[1]])
+        return "micro", "python", {}, pd.DataFrame({"time_ns": frame[SERIES_COLUMNS[1]]})
+    header = _read_header(path)
+    if header is not None and "Elapsed(ms)" in header:
+        frame = pd.read_csv(path, usecols=[c for c in GO_SERVER if c in header])
+        columns = [GO_SERVER.get(c) for c in frame.columns]
+        out = pd.DataFrame({name: frame[c] * scale for c, (name, scale) in zip(frame.columns, columns)})
+        out = out.reindex(columns=["time_s", "cpu_pct", "memory_mb", "throughput_mbps", "conn_s"])
+        return "series", "go", {}, out
+    if header is not None and "Handshake(ms)" in header:
+        frame = pd.read_csv(path, usecols=[c for c in GO_CLIENT if c in header])
+        out = frame.rename(columns=GO_CLIENT).reindex(
+            columns=["handshake_ms", "latency_ms", "rtt_ms", "ttc_ms"])
+        return "connections", "go", {}, out
+    if header is None or ("Time(s)" in header and "CPU (%)" in header):
+        from bench_writer import load_benchmark
+        series, summary = load_benchmark(path)
+        out = pd.DataFrame({name: series[c] * scale for c, (name, scale) in PYTHON_SERIES.items()
+                            if c in series.columns})
+        out = out.reindex(columns=["time_s", "cpu_pct", "memory_mb", "throughput_mbps", "conn_s"])
+        summary = {column: (None if summary.get(name) is None else float(summary[name]))
+                   for name, column in PYTHON_SUMMARY.items()}
+        return "series", "python", summary, out
+    return "other", None, {}, None
+
+
+def _manifest_info(path):
+    sidecar = manifest_path(path)
+    if not os.path.exists(sidecar):
+        return {}
+    import json
+    with open(sidecar) as f:
+        manifest = json.load(f)
+    timings = manifest.get("correlation") or {}
+    handshake = None
+    if "handshake_end_wall" in timings and "handshake_start_wall" in timings:
+        handshake = (timings["handshake_end_wall"] - timings["handshake_start_wall"]) * 1000
+    return {"role": manifest.get("role"), "scheme": manifest.get("scheme"),
+            "transport": manifest.get("transport"), "run_id": manifest.get("run_id"),
+            "payload_bytes": manifest.get("parameters", {}).get("data_size"),
+            "op": manifest.get("parameters", {}).get("op"),
+            "handshake_ms": handshake}
+
+
+class ResultsStore:
+    """SQLite index of the benchmark results in the tree.
+
+    Files are keyed by path; a file is parsed again only when its size or
+    mtime changed and its content hash no longer matches, so re-running
+    ingest over an unchanged tree costs a stat per file.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+            # The store is an index of the tree, so it is rebuilt rather than migrated
+            self.db.executescript("DROP TABLE IF EXISTS flags; DROP TABLE IF EXISTS samples; "
+                                  "DROP TABLE IF EXISTS connections; DROP TABLE IF EXISTS files;")
+            self.db.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------- Ingestion ------------
+
+    def ingest(self, roots=(REPO_DIR,), prune=True, verbose=False):
+        """Index new and changed results files under roots; returns counts.
+
+        When anything changed the outlier and integrity checks are re-run over
+        the whole store, since a new run moves its configuration's median.
+        """
+        counts = {"seen": 0, "parsed": 0, "unchanged": 0, "renamed": 0, "removed": 0,
+                  "errors": 0, "flags": None}
+        known = {row[0]: row[1:] for row in self.db.execute(
+            "SELECT path, id, mtime, size, sha1 FROM files")}
+        walked = [path for root in roots for path in self._walk(os.path.abspath(root))]
+        seen = set(walked)
+        prefixes = tuple(os.path.join(os.path.abspath(root), "") for root in roots)
+        # Indexed files gone from the walked roots, by content: a new path with
+        # the same hash is the same file moved, and keeps its rows
+        gone = {entry[3]: (path, entry[0]) for path, entry in known.items()
+                if path.startswith(prefixes) and path not in seen}
+        for path in walked:
+            counts["seen"] += 1
+            stat = os.stat(path)
+            previous = known.get(path)
+            if previous and previous[1] == stat.st_mtime and previous[2] == stat.st_size:
+                counts["unchanged"] += 1
+                continue
+            digest = sha1_of(path)
+            if previous and previous[3] == digest:  # touched, not changed
+                self.db.execute("UPDATE files SET mtime = ?, size = ? WHERE id = ?",
+                                (stat.st_mtime, stat.st_size, previous[0]))
+                counts["unchanged"] += 1
+                continue
+            if previous is None and digest in gone:
+                old_path, file_id = gone.pop(digest)
+                del known[old_path]
+                self._rename_file(file_id, path, stat)
+                counts["renamed"] += 1
+                if verbose:
+                    print(f"[STORE] moved {old_path} -> {path}")
+                continue
+            error = self._ingest_file(path, stat, digest, previous and previous[0])
+            counts["errors" if error else "parsed"] += 1
+            if verbose:
+                print(f"[STORE] {'error' if error else 'indexed'} {path}"
+                      + (f": {error}" if error else ""))
+        if prune:
+            for path, (file_id, *_) in known.items():
+                if path.startswith(prefixes) and path not in seen:
+                    self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                    counts["removed"] += 1
+        self.db.commit()
+        if counts["parsed"] or counts["errors"] or counts["removed"] or counts["renamed"]:
+            counts["flags"] = self.flag()
+        return counts
+
+    def _walk(self, root):
+        if os.path.isfile(root):
+            yield root
+            return
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(files):
+                if name.endswith(EXTENSIONS) and not name.endswith(SUMMARY_SUFFIXES):
+                    yield os.path.join(directory, name)
+
+    @staticmethod
+    def _path_info(path):
+        """The file columns that come from where a file is and its manifest."""
+        info = describe_path(path)
+        info["scheme"] = info["family"]
+        info["run_id"] = None
+        info["loss_pct"] = loss_of(path)
+        info["payload_bytes"] = None
+        info["op"] = None
+        info["handshake_ms"] = None
+        info["warmup"] = int(WARMUP_DIR in path)
+        info.update({k: v for k, v in _manifest_info(path).items() if v})
+        return info
+
+    def _rename_file(self, file_id, path, stat):
+        # The rows are unchanged; what the path says about the run is re-read
+        record = {"path": path, "mtime": stat.st_mtime, "size": stat.st_size,
+                  **self._path_info(path)}
+        self.db.execute(f"UPDATE files SET {', '.join(f'{n} = ?' for n in record)} WHERE id = ?",
+                        [*record.values(), file_id])
+
+    def _ingest_file(self, path, stat, digest, file_id):
+        info = self._path_info(path)
+        error = None
+        try:
+            kind, source, summary, frame = parse_file(path, info["role"])
+        except Exception as e:  # malformed or truncated files are recorded, not fatal
+            kind, source, summary, frame, error = "error", None, {}, None, f"{type(e).__name__}: {e}"
+        record = {"path": path, "mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest,
+                  "kind": kind, "source": source, "conn_time_s": None, "message_bytes": None,
+                  "throughput_mbps": None, **info, **summary,
+                  "rows": None if frame is None else len(frame), "error": error,
+                  "ingested_at": time.time()}
+        with self.db:
+            if file_id is not None:
+                self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            names = list(record)
+            cursor = self.db.execute(
+                f"INSERT INTO files ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [record[n] for n in names])
+            if frame is not None and len(frame):
+                table = TABLES[kind]
+                frame = frame.astype(float).astype(object).where(frame.notna(), None)
+                rows = [(cursor.lastrowid, i, *values)
+                        for i, values in enumerate(frame.itertuples(index=False, name=None))]
+                self.db.executemany(
+                    f"INSERT INTO {table} (file_id, seq, {', '.join(frame.columns)}) "
+                    f"VALUES ({', '.join('?' * (len(frame.columns) + 2))})", rows)
+        return error
+
+    # ----------- Queries ------------
+
+    def files(self, kind=None, under=None, latest=False, unique=True, ids=None,
+              include_flagged=True, include_warmup=False, **criteria):
+        """Indexed files as a DataFrame.
+
+        criteria match file columns (role, scheme, family, transport, source,
+        run_id); under restricts to a directory and ids to those file ids.
+        unique drops byte-identical
+        copies (the tree has several), latest keeps the newest file per
+        role/family/transport. The flags column lists the reasons a file was
+        flagged (see outliers.py); include_flagged=False leaves those files
+        out before latest picks. Warmup repetitions are left out unless
+        include_warmup, or unless they are asked for by id.
+        """
+        import pandas as pd
+        clauses, params = [], []
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        for key, value in criteria.items():
+            if value is None:
+                continue
+            if key not in FILE_COLUMNS:
+                raise ValueError(f"Unknown file attribute: {key}")
+            clauses.append(f"{key} = ?")
+            params.append(value)
+        if ids is not None:
+            clauses.append(f"id IN ({','.join(str(int(i)) for i in ids) or 'NULL'})")
+        if under:
+            clauses.append("path LIKE ? ESCAPE '\\'")
+            prefix = os.path.join(os.path.abspath(under), "")
+            params.append(prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if not include_flagged:
+            clauses.append("flagged.reasons IS NULL")
+        if not include_warmup and ids is None:
+            clauses.append("warmup = 0")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        files = pd.read_sql_query(
+            f"SELECT files.*, flagged.reasons AS flags FROM files LEFT JOIN "
+            f"(SELECT file_id, GROUP_CONCAT(DISTINCT reason) AS reasons FROM flags "
+            f"GROUP BY file_id) flagged ON flagged.file_id = files.id {where} ORDER BY id",
+            self.db, params=params)
+        if unique:
+            files = files.drop_duplicates("sha1")
+        if latest and len(files):
+            order = files["started"].fillna("") + files["mtime"].map("{:020.6f}".format)
+            files = (files.assign(_order=order).sort_values("_order")
+                     .groupby(["role", "family", "transport"], dropna=False).tail(1)
+                     .drop(columns="_order"))
+        return files.reset_index(drop=True)
+
+    def _rows(self, table, names, file_ids, extra=""):
+        import pandas as pd
+        if not len(file_ids):
+            return pd.DataFrame(columns=["file_id", *names.values()])
+        columns = ", ".join(f"{expr} AS \"{name}\"" for expr, name in names.items())
+        ids = ",".join(str(int(i)) for i in file_ids)
+        return pd.read_sql_query(
+            f"SELECT t.file_id, {columns} FROM {table} t JOIN files f ON f.id = t.file_id "
+            f"WHERE t.file_id IN ({ids}) ORDER BY t.file_id, t.seq{extra}", self.db)
+
+    def series(self, **criteria):
+        """Resource time series of the matching files, one row per sample.
+
+        Columns use the Python scripts' names whatever the source schema; the
+        per-connection values of Python runs are repeated on every row, as in
+        the legacy CSVs.
+        """
+        files = self.files(kind="series", **criteria)
+        names = {"t.time_s": "Time(s)", "t.cpu_pct": "CPU (%)", "t.memory_mb": "Memory (MB)",
+                 "COALESCE(t.throughput_mbps, f.throughput_mbps)": "Throughput (MB/s)",
+                 "COALESCE(t.conn_s, f.conn_time_s)": "Connection Time(s)",
+                 "f.message_bytes": "Signed Message Size (bytes)"}
+        rows = self._rows("samples", names, files["id"])
+        return rows.merge(self._labels(files), on="file_id", how="left")
+
+    def connections(self, **criteria):
+        """Per-connection client metrics (Go client logs), one row per connection."""
+        files = self.files(kind="connections", **criteria)
+        names = {f"t.{column}": name for column, name in CONNECTION_NAMES.items()}
+        rows = self._rows("connections", names, files["id"])
+        return rows.merge(self._labels(files), on="file_id", how="left")
+
+    def client_handshakes(self, **criteria):
+        """Python client runs shaped like connections(): one connection each, with only
+        the handshake known (from the run manifest)."""
+        import pandas as pd
+        files = self.files(kind="series", **criteria)
+        files = files[files["handshake_ms"].notna()]
+        rows = pd.DataFrame({"file_id": files["id"],
+                             **{name: files["handshake_ms"] if column == "handshake_ms"
+                                else float("nan") for column, name in CONNECTION_NAMES.items()}})
+        return rows.merge(self._labels(files), on="file_id", how="left")
+
+    def timings(self, **criteria):
+        """microbench.py's per-iteration times, one row per timed call."""
+        files = self.files(kind="micro", **criteria)
+        rows = self._rows("timings", {"t.time_ns": "Time (ns)"}, files["id"])
+        labels = self._labels(files).join(files[["op", "payload_bytes"]])
+        return rows.merge(labels, on="file_id", how="left")
+
+    @staticmethod
+    def _labels(files):
+        return files.rename(columns={"id": "file_id"})[
+            ["file_id", "path", "source", "role", "scheme", "family", "transport", "run_id",
+             "started", "loss_pct"]]
+
+    def runs(self, include_warmup=False):
+        """One row per indexed series or connections file with its per-run values.
+
+        throughput_mbps and conn_time_s come from the Python summary, or from
+        the last and longest Go samples; mean/max_cpu_pct and handshake_ms
+        are the file's sample and connection averages. Warmup repetitions are
+        left out unless include_warmup.
+        """
+        import pandas as pd
+        return pd.read_sql_query(
+            "SELECT f.id AS file_id, f.path, f.sha1, f.kind, f.source, f.role, f.scheme, "
+            "f.family, f.transport, f.loss_pct, f.payload_bytes, f.message_bytes, f.rows, "
+            "COALESCE(f.conn_time_s, s.conn_s) AS conn_time_s, "
+            "COALESCE(f.throughput_mbps, (SELECT l.throughput_mbps FROM samples l "
+            "WHERE l.file_id = f.id ORDER BY l.seq DESC LIMIT 1)) AS throughput_mbps, "
+            "s.mean_cpu_pct, s.max_cpu_pct, COALESCE(c.handshake_ms, f.handshake_ms) "
+            "AS handshake_ms FROM files f "
+            "LEFT JOIN (SELECT file_id, AVG(cpu_pct) AS mean_cpu_pct, MAX(cpu_pct) AS max_cpu_pct, "
+            "MAX(conn_s) AS conn_s FROM samples GROUP BY file_id) s ON s.file_id = f.id "
+            "LEFT JOIN (SELECT file_id, AVG(handshake_ms) AS handshake_ms FROM connections "
+            "GROUP BY file_id) c ON c.file_id = f.id "
+            "WHERE f.kind IN ('series', 'connections') "
+            f"{'' if include_warmup else 'AND f.warmup = 0 '}ORDER BY f.id", self.db)
+
+    def flag(self):
+        """Re-run the outlier and integrity checks over every file; returns the flag count."""
+        from outliers import detect
+        flags = detect(self.runs())
+        with self.db:
+            self.db.execute("DELETE FROM flags")
+            self.db.executemany("INSERT INTO flags (file_id, reason, detail) VALUES (?, ?, ?)",
+                                flags.itertuples(index=False, name=None))
+        return len(flags)
+
+    def flagged(self, kind=None, under=None, **criteria):
+        """The flags of the matching files, one row per flag, with the file's path."""
+        import pandas as pd
+        files = self.files(kind=kind, under=under, unique=False, **criteria)
+        flags = pd.read_sql_query("SELECT file_id, reason, detail FROM flags ORDER BY file_id",
+                                  self.db)
+        return flags.merge(files.rename(columns={"id": "file_id"}).drop(columns="flags"),
+                           on="file_id")
+
+    def overview(self):
+        import pandas as pd
+        return pd.read_sql_query(
+            "SELECT kind, source, role, family, transport, COUNT(*) AS files, "
+            "COUNT(DISTINCT sha1) AS distinct_files, SUM(rows) AS rows FROM files "
+            "GROUP BY kind, source, role, family, transport ORDER BY kind, source, role, family, "
+            "transport", self.db)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index benchmark CSVs into a SQLite store that plots query instead of "
+                    "re-reading the tree")
+    parser.add_argument("--db", default=RESULTS_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Index new and changed files")
+    ingest.add_argument("roots", nargs="*", default=[REPO_DIR])
+    ingest.add_argument("--no-prune", action="store_true",
+                        help="Keep entries for files that no longer exist")
+    ingest.add_argument("-v", "--verbose", action="store_true")
+    sub.add_parser("show", help="Summarise the store")
+    export = sub.add_parser("export", help="Write the matching series, connections or "
+                                           "microbenchmark timings as CSV")
+    export.add_argument("output")
+    export.add_argument("--kind", choices=list(TABLES), default="series")
+    for key in ("role", "family", "scheme", "transport", "source", "run_id", "op", "under"):
+        export.add_argument(f"--{key.replace('_', '-')}")
+    export.add_argument("--latest", action="store_true")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.command == "ingest":
+            started = time.perf_counter()
+            counts = store.ingest(args.roots, prune=not args.no_prune, verbose=args.verbose)
+            print(f"{counts['seen']} files: {counts['parsed']} indexed, "
+                  f"{counts['unchanged']} unchanged, {counts['renamed']} moved, "
+                  f"{counts['removed']} removed, {counts['errors']} errors "
+                  f"in {time.perf_counter() - started:.2f}s -> {args.db}")
+            if counts["flags"] is not None:
+                print(f"{counts['flags']} flags from the outlier and integrity checks "
+                      "(outliers.py lists them)")
+        elif args.command == "show":
+            import pandas as pd
+            with pd.option_context("display.width", 200, "display.max_rows", None):
+                print(store.overview().to_string(index=False))
+            errors = store.db.execute("SELECT path, error FROM files WHERE kind = 'error'").fetchall()
+            for path, error in errors:
+                print(f"error: {path}: {error}")
+            for reason, count in store.db.execute(
+                    "SELECT reason, COUNT(DISTINCT file_id) FROM flags GROUP BY reason"):
+                print(f"flagged {reason}: {count} files")
+        else:
+            criteria = {key: getattr(args, key) for key in
+                        ("role", "family", "scheme", "transport", "source", "run_id", "op", "under")}
+            query = {"series": store.series, "connections": store.connections,
+                     "micro": store.timings}[args.kind]
+            frame = query(latest=args.latest, **criteria)
+            frame.to_csv(args.output, index=False)
+            print(f"{len(frame)} rows from {frame['file_id'].nunique()} files -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import glob
+import ipaddress
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from functools import lru_cache
+from importlib import metadata
+
+from noise_control import current_settings
+
+LIBRARIES = ["aioquic", "dilithium-py", "pycryptodome", "cryptography",
+             "psutil", "numpy", "pandas", "pyarrow"]
+MANIFEST_SUFFIX = ".manifest.json"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def is_loopback(host):
+    if host in (None, ""):
+        return None
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cpu_model():
+    cpuinfo = _read("/proc/cpuinfo") or ""
+    for line in cpuinfo.splitlines():
+        if line.startswith("model name"):
+            return line.split(":", 1)[1].strip()
+    return platform.processor() or None
+
+
+def _cpu_governors():
+    paths = glob.glob(
+        "/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_governor")
+    governors = sorted({_read(p) for p in paths} - {None})
+    return governors or None
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(["git", "-C", REPO_DIR, *args], capture_output=True,
+                             text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def _library_versions():
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+@lru_cache(maxsize=1)
+def collect_environment():
+    revision = _git("rev-parse", "HEAD")
+    dirty = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "python_implementation": platform.python_implementation(),
+        "cpu_model": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "cpu_governor": _cpu_governors(),
+        "git_revision": revision,
+        "git_dirty": bool(dirty) if revision else None,
+        "libraries": _library_versions(),
+    }
+
+
+def manifest_path(output_path):
+    return os.path.splitext(output_path)[0] + MANIFEST_SUFFIX
+
+
+def write_manifest(output_path, run_id, role, scheme, transport, parameters, endpoint,
+                   correlation=None, summary=None):
+    """Write <stem>.manifest.json describing the run that produced output_path."""
+    manifest = {
+        "run_id": run_id,
+        "role": role,
+        "scheme": scheme,
+        "transport": transport,
+        "parameters": parameters,
+        "endpoint": {**endpoint, "loopback": is_loopback(endpoint.get("host"))},
+        "outputs": {"series": os.path.basename(output_path)},
+        "correlation": correlation or {},
+        "summary": summary or {},
+        "written_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {**collect_environment(), **current_settings()},
+    }
+    path = manifest_path(output_path)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def load_manifests(root):
+    manifests = []
+    pattern = os.path.join(root, "**", "*" + MANIFEST_SUFFIX)
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["path"] = os.path.join(os.path.dirname(path),
+                                        manifest["outputs"]["series"])
+        manifests.append(manifest)
+    return manifests
+
+
+def filter_manifests(manifests, **criteria):
+    """Keep manifests whose top-level or parameter fields equal every criterion."""
+    def matches(m):
+        for key, value in criteria.items():
+            actual = m.get(key, m["parameters"].get(key))
+            if value is not None and str(actual) != str(value):
+                return False
+        return True
+    return [m for m in manifests if matches(m)]
+
+
+def group_runs(manifests):
+    """Map run_id -> {role: [manifest, ...]} so client and server outputs can be joined."""
+    runs = {}
+    for m in manifests:
+        runs.setdefault(m["run_id"], {}).setdefault(m["role"], []).append(m)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List benchmark runs by their manifests")
+    parser.add_argument("root", nargs="?", default=REPO_DIR)
+    parser.add_argument("--scheme")
+    parser.add_argument("--transport", choices=["tcp", "quic"])
+    parser.add_argument("--role", choices=["client", "server"])
+    parser.add_argument("--run-id")
+    args = parser.parse_args()
+
+    manifests = filter_manifests(load_manifests(args.root), scheme=args.scheme,
+                                 transport=args.transport, role=args.role,
+                                 run_id=args.run_id)
+    for run_id, roles in sorted(group_runs(manifests).items()):
+        for role, entries in sorted(roles.items()):
+            for m in entries:
+                print(f"{run_id}  {role:<6}  {m['scheme']:<10}  {m['transport']:<4}  "
+                      f"{os.path.relpath(m['path'], args.root)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import numpy as np
+
+SMOOTHERS = ["none", "mean", "ewma", "median"]
+DECIMATORS = ["lttb", "minmax", "none"]
+WINDOW = 5
+# Two points per horizontal pixel of a 10 inch figure at 100 dpi
+MAX_POINTS = 2000
+# Largest (1 - alpha) ** -k allowed inside one EWMA block, far below float64 overflow
+_EWMA_RANGE = 1e150
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float)
+    return values, ~np.isnan(values)
+
+
+def rolling_mean(values, window=WINDOW):
+    """Centred moving average; NaNs are skipped and the edges use the samples available."""
+    values, ok = _finite(values)
+    if window <= 1 or len(values) == 0:
+        return values.copy()
+    sums = np.concatenate([[0.0], np.cumsum(np.where(ok, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(ok)])
+    index = np.arange(len(values))
+    lo = np.clip(index - window // 2, 0, len(values))
+    hi = np.clip(index + (window - 1) // 2 + 1, 0, len(values))
+    n = counts[hi] - counts[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[hi] - sums[lo]) / n, np.nan)
+
+
+def rolling_median(values, window=WINDOW):
+    """Centred moving median; unlike the mean a single spike does not smear into its window."""
+    values, _ = _finite(values)
+    if window <= 1 or len(values) == 0:
+        return values.copy()
+    before, after = window // 2, (window - 1) // 2
+    padded = np.concatenate([np.full(before, np.nan), values, np.full(after, np.nan)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    out = np.full(len(values), np.nan)
+    filled = ~np.all(np.isnan(windows), axis=1)
+    out[filled] = np.nanmedian(windows[filled], axis=1)
+    return out
+
+
+def ewma(values, span=WINDOW):
+    """Exponentially weighted moving average, alpha = 2 / (span + 1).
+
+    Matches pandas ewm(span=span, adjust=False, ignore_na=True).
+
+    The recurrence is evaluated in blocks. Within a block y_k is a cumulative
+    sum of x_j (1 - alpha) ** -j, rescaled, so there is no Python loop per
+    sample. NaNs are skipped and stay NaN in the output.
+    """
+    values, ok = _finite(values)
+    out = np.full(len(values), np.nan)
+    x = values[ok]
+    if len(x) == 0:
+        return out
+    alpha = 2.0 / (max(span, 1) + 1)
+    if alpha >= 1:
+        out[ok] = x
+        return out
+    decay = 1.0 - alpha
+    block = max(1, int(np.log(_EWMA_RANGE) / -np.log(decay)))
+    y = np.empty_like(x)
+    previous = x[0]
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        k = np.arange(len(chunk))
+        grow = decay ** -k
+        first = 1 if start == 0 else 0  # the series starts at its first sample
+        scaled = alpha * chunk * grow
+        if first:
+            scaled[0] = chunk[0]
+            carried = 0.0
+        else:
+            carried = previous
+        y[start:start + len(chunk)] = decay ** k * (np.cumsum(scaled) + decay * carried)
+        previous = y[start + len(chunk) - 1]
+    out[ok] = y
+    return out
+
+
+def smooth(values, method="none", window=WINDOW):
+    if method == "none":
+        return np.asarray(values, dtype=float)
+    if method == "mean":
+        return rolling_mean(values, window)
+    if method == "ewma":
+        return ewma(values, window)
+    if method == "median":
+        return rolling_median(values, window)
+    raise ValueError(f"Unknown smoothing method: {method}")
+
+
+def lttb(x, y, points):
+    """Indices kept by largest-triangle-three-buckets.
+
+    The first and last samples are always kept; from each of points - 2
+    equal buckets in between, the sample forming the largest triangle with
+    the previous pick and the next bucket's mean. Peaks survive because
+    they make large triangles.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    picks = np.empty(points, dtype=int)
+    picks[0], picks[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            nlo, nhi = n - 1, n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        ax, ay = x[previous], y[previous]
+        areas = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        previous = lo + int(np.argmax(areas))
+        picks[i + 1] = previous
+    return picks
+
+
+def minmax(y, points):
+    """Indices of the minimum and maximum of each of points // 2 equal buckets, in order.
+
+    Exact for the envelope: every local extreme a pixel column can show is kept.
+    """
+    n = len(y)
+    buckets = max(1, points // 2)
+    if points >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.concatenate([y, np.full(buckets * size - n, y[-1])]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picks = np.concatenate([offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)])
+    return np.unique(np.clip(picks, 0, n - 1))
+
+
+def decimate(x, y, points=MAX_POINTS, method="lttb"):
+    """Indices of the samples to draw: at most about points of them, NaNs dropped.
+
+    Returns indices into the original arrays, so other columns of the same
+    series (a percentile band, say) can be cut to the same samples.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+    if method == "none" or not points or len(valid) <= points:
+        return valid
+    if method == "lttb":
+        return valid[lttb(x[valid], y[valid], points)]
+    if method == "minmax":
+        return valid[minmax(y[valid], points)]
+    raise ValueError(f"Unknown decimation method: {method}")
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import socket
+import ssl
+import sys
+import time
+
+import numpy as np
+import psutil
+
+from orchestrate import (LOOPBACK, REPO_DIR, SCHEMES, SCRIPTS_DIR, TRANSPORTS, _spawn,
+                         free_port, stop, wait_until_ready)
+from run_manifest import new_run_id, write_manifest
+from sweep import SCHEME_VARIANTS, parse_size
+from traces import CHUNK_SIZE, Signer, _tls_context, load_trace, send_quic, send_tcp
+
+SOAK_COLUMNS = ["Time(s)", "RSS (MB)", "Threads", "FDs", "Messages", "Aborted", "Failed",
+                "Throughput (MB/s)"]
+INTERVAL = 5.0
+ALPHA = 0.01
+# Growth over the run, after the settle period, below which a trend is not worth an alert
+MIN_GROWTH = {"RSS (MB)": 5.0, "Threads": 2, "FDs": 2}
+SETTLE_FRACTION = 0.1  # leading share of samples ignored for growth (imports, caches, pools)
+DRIFT_TOLERANCE = 0.10
+MAX_POINTS = 2000  # the pairwise tests are O(n^2); longer series are thinned evenly
+
+
+def _thin(*series):
+    n = len(series[0])
+    if n <= MAX_POINTS:
+        return series
+    keep = np.linspace(0, n - 1, MAX_POINTS).astype(int)
+    return tuple(np.asarray(s)[keep] for s in series)
+
+
+# ----------- Trend tests ------------
+
+
+def mann_kendall(values):
+    """Mann-Kendall trend test: (S, z, two-sided p) with the tie-corrected variance."""
+    x, = _thin(np.asarray(values, dtype=float))
+    n = len(x)
+    if n < 3:
+        return 0.0, 0.0, 1.0
+    s = float(np.sign(x[None, :] - x[:, None])[np.triu_indices(n, 1)].sum())
+    _, counts = np.unique(x, return_counts=True)
+    var = (n * (n - 1) * (2 * n + 5) - np.sum(counts * (counts - 1) * (2 * counts + 5))) / 18
+    if var <= 0:
+        return s, 0.0, 1.0
+    z = (s - np.sign(s)) / math.sqrt(var)  # continuity correction
+    return s, z, math.erfc(abs(z) / math.sqrt(2))
+
+
+def theil_sen(t, values):
+    """Median of pairwise slopes; robust to the odd GC pause or burst."""
+    t, x = _thin(np.asarray(t, dtype=float), np.asarray(values, dtype=float))
+    i, j = np.triu_indices(len(x), 1)
+    dt = t[j] - t[i]
+    keep = dt > 0
+    return float(np.median((x[j] - x[i])[keep] / dt[keep])) if keep.any() else 0.0
+
+
+def growth_alerts(samples, alpha=ALPHA, min_growth=MIN_GROWTH):
+    """Resource series that keep rising: significant upward trend and real growth."""
+    alerts = []
+    start = int(len(samples) * SETTLE_FRACTION)
+    rows = samples[start:]
+    if len(rows) < 3:
+        return alerts
+    t = [r["Time(s)"] for r in rows]
+    for metric, threshold in min_growth.items():
+        values = [r[metric] for r in rows]
+        _, z, p = mann_kendall(values)
+        slope = theil_sen(t, values)
+        growth = slope * (t[-1] - t[0])
+        if z > 0 and p < alpha and growth >= threshold:
+            alerts.append({"metric": metric, "kind": "monotonic growth", "p": p,
+                           "slope_per_hour": slope * 3600, "growth": growth,
+                           "first": values[0], "last": values[-1]})
+    return alerts
+
+
+def drift_alert(samples, alpha=ALPHA, tolerance=DRIFT_TOLERANCE):
+    """Throughput trend between the first and last third of the run."""
+    rows = samples[1:]  # the first window includes start-up
+    if len(rows) < 6:
+        return None
+    values = [r["Throughput (MB/s)"] for r in rows]
+    third = len(values) // 3
+    first, last = float(np.median(values[:third])), float(np.median(values[-third:]))
+    _, z, p = mann_kendall(values)
+    drift = (last - first) / first if first else float("nan")
+    if p < alpha and abs(drift) > tolerance:
+        return {"metric": "Throughput (MB/s)", "kind": "drift", "p": p, "drift": drift,
+                "first": first, "last": last}
+    return None
+
+
+# ----------- Load ------------
+
+
+async def client_loop(deadline, counters, signer, transport, port, sizes, abort_rate, rng,
+                      timeout):
+    context = _tls_context(signer.scheme) if transport == "tcp" else None
+    while time.time() < deadline:
+        size = rng.choice(sizes)
+        payload = signer.message(size)
+        abort = rng.random() < abort_rate
+        try:
+            if abort:
+                await asyncio.wait_for(abort_transfer(transport, port, context, payload), timeout)
+                counters["aborted"] += 1
+                continue
+            if transport == "tcp":
+                sent = asyncio.to_thread(send_tcp, LOOPBACK, port, context, payload)
+            else:
+                sent = send_quic(LOOPBACK, port, payload)
+            await asyncio.wait_for(sent, timeout)
+            counters["messages"] += 1
+            counters["bytes"] += len(payload)
+        except (OSError, ConnectionError, asyncio.TimeoutError):
+            counters["failed"] += 1
+
+
+async def abort_transfer(transport, port, context, payload):
+    """Send half a message and walk away, as a crashed or impatient client would."""
+    half = payload[:len(payload) // 2]
+    if transport == "tcp":
+        def run():
+            with socket.create_connection((LOOPBACK, port)) as s:
+                with context.wrap_socket(s, server_hostname=LOOPBACK) as tls:
+                    tls.sendall(half)
+        await asyncio.to_thread(run)
+        return
+    from aioquic.asyncio import connect
+    from aioquic.quic.configuration import QuicConfiguration
+    configuration = QuicConfiguration(is_client=True)
+    configuration.verify_mode = ssl.CERT_NONE
+    async with connect(LOOPBACK, port, configuration=configuration) as connection:
+        stream_id = connection._quic.get_next_available_stream_id()
+        for offset in range(0, len(half), CHUNK_SIZE):
+            connection._quic.send_stream_data(stream_id, half[offset:offset + CHUNK_SIZE])
+        connection.transmit()
+        await asyncio.sleep(0.05)
+        # Leaving the block closes the connection with the stream still open
+
+
+async def sample_loop(deadline, process, counters, path, interval):
+    samples = []
+    started = time.time()
+    last = dict(counters)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SOAK_COLUMNS)
+        while time.time() < deadline:
+            await asyncio.sleep(interval)
+            now = dict(counters)
+            try:
+                row = {"Time(s)": time.time() - started,
+                       "RSS (MB)": process.memory_info().rss / (1024 * 1024),
+                       "Threads": process.num_threads(),
+                       "FDs": process.num_fds()}
+            except psutil.Error:
+                print("[SOAK] server process is gone")
+                break
+            row.update({"Messages": now["messages"] - last["messages"],
+                        "Aborted": now["aborted"] - last["aborted"],
+                        "Failed": now["failed"] - last["failed"],
+                        "Throughput (MB/s)": (now["bytes"] - last["bytes"]) / (1024 * 1024)
+                        / interval})
+            last = now
+            samples.append(row)
+            writer.writerow([row[c] for c in SOAK_COLUMNS])
+            f.flush()  # a killed soak still leaves its samples
+            print(f"[SOAK] {row['Time(s)']:8.0f}s  RSS {row['RSS (MB)']:7.1f} MB  "
+                  f"threads {row['Threads']:4d}  fds {row['FDs']:4d}  "
+                  f"{row['Throughput (MB/s)']:6.2f} MB/s  msgs {row['Messages']}", flush=True)
+    return samples
+
+
+async def soak(process, signer, transport, port, duration, clients, sizes, abort_rate, path,
+               interval, seed, timeout):
+    deadline = time.time() + duration
+    counters = {"messages": 0, "aborted": 0, "failed": 0, "bytes": 0}
+    loops = [client_loop(deadline, counters, signer, transport, port, sizes, abort_rate,
+                         random.Random(seed + i), timeout) for i in range(clients)]
+    results = await asyncio.gather(sample_loop(deadline, process, counters, path, interval),
+                                   *loops)
+    return results[0], counters
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a client population against one server for a long time and "
+                    "alert on resource growth and throughput drift")
+    parser.add_argument("--scheme", choices=list(SCHEME_VARIANTS), default="ML-DSA-44")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="quic")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent client loops")
+    parser.add_argument("--sizes", nargs="+", default=["64KB"],
+                        help="Message sizes, drawn uniformly")
+    parser.add_argument("--trace", help="Draw message sizes from this trace instead")
+    parser.add_argument("--abort-rate", type=float, default=0.0,
+                        help="Share of transfers abandoned half way (exercises cleanup paths)")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="Sampling seconds")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--drift-tolerance", type=float, default=DRIFT_TOLERANCE)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds per transfer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"))
+    parser.add_argument("--run-id")
+    args = parser.parse_args()
+
+    run_id = args.run_id or new_run_id()
+    soak_dir = os.path.join(args.out, run_id, "soak")
+    server_dir = os.path.join(soak_dir, "server")
+    os.makedirs(server_dir)
+    folder, variant_args = SCHEME_VARIANTS[args.scheme]
+    signer = Signer(folder, int(args.scheme.rsplit("-", 1)[1]))
+    sizes = ([size for _, _, size in load_trace(args.trace)] if args.trace
+             else [parse_size(s) for s in args.sizes])
+    for size in set(sizes):
+        signer.message(size)  # sign up front so the first samples are not all signing
+
+    port = free_port(args.transport)
+    server = _spawn(os.path.join(SCRIPTS_DIR, SCHEMES[folder]), "server",
+                    ["--protocol", args.transport, "--run-id", run_id, "--host", LOOPBACK,
+                     "--port", str(port), "--output-dir", server_dir, "--size", "0",
+                     "--connections", "0", *variant_args],
+                    os.path.join(soak_dir, "server.log"))
+    series_path = os.path.join(soak_dir, f"soak_{args.scheme}_{args.transport}.csv")
+    try:
+        wait_until_ready(server, args.transport, port)
+        samples, counters = asyncio.run(soak(
+            psutil.Process(server.pid), signer, args.transport, port, args.duration,
+            args.clients, sizes, args.abort_rate, series_path, args.interval, args.seed,
+            args.timeout))
+    finally:
+        stop(server)
+        server.log.close()
+
+    alerts = growth_alerts(samples, args.alpha)
+    drift = drift_alert(samples, args.alpha, args.drift_tolerance)
+    if drift:
+        alerts.append(drift)
+    summary = {"duration_s": args.duration, "clients": args.clients, "samples": len(samples),
+               **counters, "alerts": alerts}
+    write_manifest(series_path, run_id, "soak", args.scheme, args.transport,
+                   {"data_size": 0, "sizes": sorted(set(sizes)), "abort_rate": args.abort_rate,
+                    "interval_s": args.interval},
+                   {"host": LOOPBACK, "port": port}, summary=summary)
+    with open(os.path.join(soak_dir, "soak.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{counters['messages']} messages, {counters['aborted']} aborted, "
+          f"{counters['failed']} failed over {len(samples)} samples -> {soak_dir}")
+    for alert in alerts:
+        if alert["kind"] == "drift":
+            print(f"ALERT {alert['metric']} drifted {alert['drift']:+.1%} "
+                  f"({alert['first']:.3g} -> {alert['last']:.3g}, p={alert['p']:.2g})")
+        else:
+            print(f"ALERT {alert['metric']} grows {alert['slope_per_hour']:+.3g}/h "
+                  f"({alert['first']:.4g} -> {alert['last']:.4g}, p={alert['p']:.2g})")
+    if not alerts:
+        print("No growth or drift detected")
+    sys.exit(1 if alerts else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+from bench_writer import load_benchmark
+from run_manifest import REPO_DIR, filter_manifests, load_manifests
+
+ALPHA = 0.05
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 10000
+MIN_SAMPLES = 5  # per side; below this a comparison is reported but flagged
+METRICS = ["Connection Time(s)", "Throughput (MB/s)", "Mean CPU (%)", "Peak Memory (MB)",
+           "Handshake (ms)", "CPU s/MB"]
+# Where the time went: wall-clock phases from the manifest timings and
+# per-phase thread CPU from the .cpu.json sidecar
+PHASE_METRICS = ["Phase handshake (ms)", "Phase transfer (ms)", "Phase key_load CPU (ms)",
+                 "Phase receive CPU (ms)", "Phase verify CPU (ms)"]
+# Crypto microbenchmarks (microbench.py), one sample per timed iteration
+MICRO_METRICS = ["Op time (ns)", "ops/s", "ns/byte"]
+LOWER_IS_BETTER = {"Connection Time(s)", "Mean CPU (%)", "Peak Memory (MB)",
+                   "Handshake (ms)", "CPU s/MB", *PHASE_METRICS, "Op time (ns)", "ns/byte"}
+
+
+# ----------- Samples ------------
+
+
+def _cpu_report(series_path):
+    path = os.path.splitext(series_path)[0] + ".cpu.json"
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _span_ms(timings, phase):
+    if f"{phase}_end_wall" not in timings:
+        return None
+    return (timings[f"{phase}_end_wall"] - timings[f"{phase}_start_wall"]) * 1000
+
+
+def sample_row(manifest):
+    """One connection's metrics, keyed like METRICS, plus its configuration."""
+    series, summary = load_benchmark(manifest["path"])
+    timings = manifest.get("correlation", {})
+    handshake = _span_ms(timings, "handshake")
+    cpu = _cpu_report(manifest["path"])
+    phase_cpu = {name: entry["cpu_s"] * 1000 for name, entry in cpu.get("phases", {}).items()}
+    return {
+        "run_id": manifest["run_id"],
+        "role": manifest["role"],
+        "scheme": manifest["scheme"],
+        "transport": manifest["transport"],
+        **manifest["parameters"],
+        "warmup": f"{os.sep}warmup-" in manifest["path"],
+        "path": manifest["path"],
+        "Connection Time(s)": summary.get("Connection Time(s)"),
+        "Throughput (MB/s)": summary.get("Throughput (MB/s)"),
+        "Mean CPU (%)": series["CPU (%)"].mean() if len(series) else None,
+        "Peak Memory (MB)": series["Memory (MB)"].max() if len(series) else None,
+        "Handshake (ms)": handshake,
+        "CPU s/MB": cpu.get("cpu_s_per_mb"),
+        "Phase handshake (ms)": handshake,
+        "Phase transfer (ms)": (_span_ms(timings, "client_send") if manifest["role"] == "client"
+                                else _span_ms(timings, "server_receive")),
+        "Phase key_load CPU (ms)": phase_cpu.get("key_load"),
+        "Phase receive CPU (ms)": phase_cpu.get("receive"),
+        "Phase verify CPU (ms)": phase_cpu.get("verify"),
+    }
+
+
+def micro_rows(manifest):
+    """One row per timed iteration of a crypto microbenchmark."""
+    import pandas as pd
+    times = pd.read_csv(manifest["path"])["Time (ns)"].astype(float)
+    size = manifest["parameters"].get("data_size") or 0
+    config = {"run_id": manifest["run_id"], "role": manifest["role"],
+              "scheme": manifest["scheme"], "transport": manifest["transport"],
+              **manifest["parameters"], "warmup": False, "path": manifest["path"]}
+    return [{**config, "Op time (ns)": t, "ops/s": 1e9 / t if t else None,
+             "ns/byte": t / size if size else None} for t in times]
+
+
+def collect_samples(root, include_warmup=False, **criteria):
+    import pandas as pd
+    rows = []
+    for manifest in filter_manifests(load_manifests(root), **criteria):
+        if manifest["role"] == "micro":
+            rows.extend(micro_rows(manifest))
+        elif manifest["role"] in ("client", "server"):
+            rows.append(sample_row(manifest))
+    samples = pd.DataFrame(rows)
+    if len(samples) and not include_warmup:
+        samples = samples[~samples["warmup"]]
+    return samples
+
+
+def select(samples, spec):
+    """Filter samples with a "key=value,key=value" configuration spec."""
+    mask = np.ones(len(samples), dtype=bool)
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        mask &= samples[key.strip()].astype(str).to_numpy() == value.strip()
+    return samples[mask]
+
+
+# ----------- Statistics ------------
+
+
+def bootstrap_ci(values, statistic=np.mean, confidence=CONFIDENCE,
+                 resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """Percentile bootstrap interval of statistic(values)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return (math.nan, math.nan)
+    rng = np.random.default_rng(seed)
+    draws = rng.choice(values, size=(resamples, len(values)), replace=True)
+    stats = statistic(draws, axis=1)
+    tail = (1 - confidence) / 2
+    return tuple(np.quantile(stats, [tail, 1 - tail]))
+
+
+def bootstrap_diff_ci(a, b, statistic=np.median, confidence=CONFIDENCE,
+                      resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """Percentile bootstrap interval of statistic(b) - statistic(a)."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if len(a) < 2 or len(b) < 2:
+        return (math.nan, math.nan)
+    rng = np.random.default_rng(seed)
+    draws_a = rng.choice(a, size=(resamples, len(a)), replace=True)
+    draws_b = rng.choice(b, size=(resamples, len(b)), replace=True)
+    diffs = statistic(draws_b, axis=1) - statistic(draws_a, axis=1)
+    tail = (1 - confidence) / 2
+    return tuple(np.quantile(diffs, [tail, 1 - tail]))
+
+
+def _rankdata(values):
+    """Average ranks (1-based) with ties sharing their mean rank."""
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(len(values))
+    sorted_values = values[order]
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and sorted_values[j + 1] == sorted_values[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def _exact_u_distribution(n1, n2):
+    """Counts of each U value (0..n1*n2) under H0, no ties."""
+    # counts[i][j] is the distribution for sample sizes (i, j)
+    counts = [[None] * (n2 + 1) for _ in range(n1 + 1)]
+    for i in range(n1 + 1):
+        for j in range(n2 + 1):
+            if i == 0 or j == 0:
+                dist = np.zeros(i * j + 1)
+                dist[0] = 1
+            else:
+                dist = np.zeros(i * j + 1)
+                # the largest observation is from sample 1 (beating all j) or from sample 2
+                with_first = counts[i - 1][j]
+                dist[j:j + len(with_first)] += with_first
+                without = counts[i][j - 1]
+                dist[:len(without)] += without
+            counts[i][j] = dist
+    return counts[n1][n2]
+
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test; exact without ties for small samples.
+
+    Returns (U of a, p-value, method).
+    """
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return math.nan, math.nan, "none"
+    combined = np.concatenate([a, b])
+    ranks = _rankdata(combined)
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    ties = len(np.unique(combined)) < len(combined)
+
+    if not ties and n1 * n2 <= 400:
+        dist = _exact_u_distribution(n1, n2)
+        dist = dist / dist.sum()
+        u_low = min(u1, n1 * n2 - u1)
+        p = min(1.0, 2 * dist[:int(u_low) + 1].sum())
+        return u1, p, "exact"
+
+    mean_u = n1 * n2 / 2
+    _, tie_counts = np.unique(combined, return_counts=True)
+    n = n1 + n2
+    tie_term = ((tie_counts ** 3 - tie_counts).sum()) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return u1, 1.0, "normal"
+    z = (abs(u1 - mean_u) - 0.5) / sigma  # continuity correction
+    p = math.erfc(max(z, 0) / math.sqrt(2))
+    return u1, min(p, 1.0), "normal"
+
+
+def min_attainable_p(n1, n2):
+    """Smallest two-sided p an exact rank test can give with these sample sizes."""
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    return min(1.0, 2 / math.comb(n1 + n2, n1))
+
+
+def cliffs_delta(a, b):
+    """P(b > a) - P(b < a); equals the rank-biserial correlation."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if len(a) == 0 or len(b) == 0:
+        return math.nan
+    diff = b[None, :] - a[:, None]
+    return float(((diff > 0).sum() - (diff < 0).sum()) / diff.size)
+
+
+def hedges_g(a, b):
+    """Standardised mean difference (b - a) with small-sample correction."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return math.nan
+    pooled = math.sqrt(((n1 - 1) * a.var(ddof=1) + (n2 - 1) * b.var(ddof=1)) / (n1 + n2 - 2))
+    if pooled == 0:
+        return math.nan
+    correction = 1 - 3 / (4 * (n1 + n2) - 9)
+    return (b.mean() - a.mean()) / pooled * correction
+
+
+def cliffs_magnitude(delta):
+    # Romano et al. thresholds
+    size = abs(delta)
+    if math.isnan(size):
+        return "n/a"
+    if size < 0.147:
+        return "negligible"
+    if size < 0.33:
+        return "small"
+    if size < 0.474:
+        return "medium"
+    return "large"
+
+
+def compare(a, b, metric=None, alpha=ALPHA, min_samples=MIN_SAMPLES, seed=0):
+    """Compare samples a (reference) and b (candidate) of one metric."""
+    a = np.asarray([v for v in a if v is not None and not math.isnan(v)], dtype=float)
+    b = np.asarray([v for v in b if v is not None and not math.isnan(v)], dtype=float)
+    u, p, method = mann_whitney_u(a, b)
+    delta = cliffs_delta(a, b)
+    flags = []
+    if len(a) < min_samples or len(b) < min_samples:
+        flags.append(f"n<{min_samples}")
+    if min_attainable_p(len(a), len(b)) > alpha:
+        flags.append("cannot reach significance")
+    median_a = float(np.median(a)) if len(a) else math.nan
+    median_b = float(np.median(b)) if len(b) else math.nan
+    result = {
+        "metric": metric,
+        "n_a": len(a), "n_b": len(b),
+        "mean_a": float(a.mean()) if len(a) else math.nan,
+        "mean_b": float(b.mean()) if len(b) else math.nan,
+        "mean_a_ci": bootstrap_ci(a, seed=seed),
+        "mean_b_ci": bootstrap_ci(b, seed=seed),
+        "median_a": median_a, "median_b": median_b,
+        "median_diff": median_b - median_a,
+        "median_diff_ci": bootstrap_diff_ci(a, b, seed=seed),
+        "relative_change": (median_b - median_a) / median_a if median_a else math.nan,
+        "u": u, "p": p, "test": method,
+        "cliffs_delta": delta, "effect": cliffs_magnitude(delta),
+        "hedges_g": hedges_g(a, b),
+        "significant": bool(p < alpha) and not flags,
+        "flags": flags,
+    }
+    if metric is not None and result["significant"]:
+        better = (median_b < median_a) == (metric in LOWER_IS_BETTER)
+        result["verdict"] = "b better" if better else "b worse"
+    else:
+        result["verdict"] = "inconclusive" if flags else "no evidence of difference"
+    return result
+
+
+def compare_frames(samples_a, samples_b, metrics=METRICS, **kwargs):
+    return [compare(samples_a[m].dropna().tolist() if m in samples_a else [],
+                    samples_b[m].dropna().tolist() if m in samples_b else [],
+                    metric=m, **kwargs)
+            for m in metrics]
+
+
+# ----------- CLI ------------
+
+
+def _fmt(value, digits=4):
+    if isinstance(value, tuple):
+        return f"[{_fmt(value[0], digits)}, {_fmt(value[1], digits)}]"
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    return f"{value:.{digits}g}"
+
+
+def print_report(results, label_a, label_b):
+    print(f"A = {label_a}\nB = {label_b}\n")
+    for r in results:
+        if r["n_a"] == 0 and r["n_b"] == 0:
+            continue
+        print(f"{r['metric']}")
+        print(f"  A: n={r['n_a']:<3} mean {_fmt(r['mean_a'])} CI {_fmt(r['mean_a_ci'])}  "
+              f"median {_fmt(r['median_a'])}")
+        print(f"  B: n={r['n_b']:<3} mean {_fmt(r['mean_b'])} CI {_fmt(r['mean_b_ci'])}  "
+              f"median {_fmt(r['median_b'])}")
+        relative = "" if math.isnan(r["relative_change"]) else \
+            f"  ({_fmt(r['relative_change'] * 100, 3)}%)"
+        print(f"  median B-A {_fmt(r['median_diff'])} CI {_fmt(r['median_diff_ci'])}{relative}")
+        print(f"  Mann-Whitney U={_fmt(r['u'])} p={_fmt(r['p'], 3)} ({r['test']})  "
+              f"Cliff's delta {_fmt(r['cliffs_delta'], 3)} ({r['effect']})  "
+              f"Hedges' g {_fmt(r['hedges_g'], 3)}")
+        flags = f"  [{'; '.join(r['flags'])}]" if r["flags"] else ""
+        print(f"  -> {r['verdict']}{flags}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare two benchmark configurations with bootstrap CIs, "
+                    "Mann-Whitney U and effect sizes")
+    parser.add_argument("root", nargs="?", default=REPO_DIR,
+                        help="Directory searched for run manifests")
+    parser.add_argument("--a", required=True, help="Reference, e.g. scheme=RSA-2048,transport=tcp")
+    parser.add_argument("--b", required=True, help="Candidate, e.g. scheme=ML-DSA-44,transport=tcp")
+    parser.add_argument("--role", choices=["client", "server", "micro"], default="server")
+    parser.add_argument("--metrics", nargs="+",
+                        help=f"Default: {', '.join(METRICS)} (micro: {', '.join(MICRO_METRICS)})")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--include-warmup", action="store_true")
+    parser.add_argument("--json", help="Also write the results here")
+    args = parser.parse_args()
+
+    samples = collect_samples(args.root, args.include_warmup, role=args.role)
+    if samples.empty:
+        parser.error(f"no {args.role} manifests under {args.root}")
+    metrics = args.metrics or (MICRO_METRICS if args.role == "micro" else METRICS)
+    results = compare_frames(select(samples, args.a), select(samples, args.b), metrics,
+                             alpha=args.alpha, min_samples=args.min_samples)
+    print_report(results, args.a, args.b)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"a": args.a, "b": args.b, "role": args.role, "results": results},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
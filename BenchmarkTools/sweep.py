@@ -0,0 +1,189 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+
+from bench_writer import FORMATS
+from orchestrate import REPO_DIR, RUN_TIMEOUT, TRANSPORTS, run_once
+from run_manifest import new_run_id
+
+# Scheme name -> (script folder key in orchestrate.SCHEMES, script arguments)
+SCHEME_VARIANTS = {
+    "RSA-2048": ("rsa", ["--key-bits", "2048"]),
+    "RSA-3072": ("rsa", ["--key-bits", "3072"]),
+    "RSA-4096": ("rsa", ["--key-bits", "4096"]),
+    "ML-DSA-44": ("mldsa", ["--level", "44"]),
+    "ML-DSA-65": ("mldsa", ["--level", "65"]),
+    "ML-DSA-87": ("mldsa", ["--level", "87"]),
+}
+UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+DEFAULT_SIZES = ["1KB", "1MB", "8MB"]
+DEFAULT_CHUNKS = ["4KB"]
+SECONDS_PER_MB = 5.0  # python QUIC moves roughly 0.5 MB/s on loopback
+SWEEP_FILE = "sweep.json"
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+
+def parse_size(text):
+    text = str(text).strip().upper()
+    for unit in sorted(UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * UNITS[unit])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("GB", "MB", "KB"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def cell_key(cell):
+    key = (f"{cell['scheme']}_{cell['transport']}_{format_size(cell['size'])}"
+           f"_c{format_size(cell['chunk_size'])}")
+    if cell.get("loss") is not None:
+        key += f"_loss{cell['loss'] * 100:g}"
+    return key
+
+
+def _normalise(cell):
+    if cell["scheme"] not in SCHEME_VARIANTS:
+        raise ValueError(f"Unknown scheme {cell['scheme']}; choose from {list(SCHEME_VARIANTS)}")
+    if cell["transport"] not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {cell['transport']}")
+    loss = cell.get("loss")
+    return {"scheme": cell["scheme"], "transport": cell["transport"],
+            "size": parse_size(cell["size"]), "chunk_size": parse_size(cell["chunk_size"]),
+            "loss": None if loss is None else float(loss)}
+
+
+def expand_grid(schemes, transports, sizes, chunk_sizes, losses=(None,)):
+    return [_normalise({"scheme": s, "transport": t, "size": n, "chunk_size": c, "loss": p})
+            for s, t, n, c, p in itertools.product(schemes, transports, sizes, chunk_sizes,
+                                                    losses)]
+
+
+def load_cells(path):
+    """Read cells from JSON: a list of cells, or a grid of lists per field."""
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        return [_normalise(cell) for cell in spec]
+    return expand_grid(spec.get("schemes", list(SCHEME_VARIANTS)),
+                       spec.get("transports", TRANSPORTS),
+                       spec.get("sizes", DEFAULT_SIZES),
+                       spec.get("chunk_sizes", DEFAULT_CHUNKS),
+                       spec.get("losses", [None]))
+
+
+def completed_cells(sweep_dir):
+    path = os.path.join(sweep_dir, CHECKPOINT_FILE)
+    done = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry["ok"]:
+                        done.add(entry["key"])
+    return done
+
+
+def run_cell(cell, sweep_dir, options):
+    key = cell_key(cell)
+    folder, variant_args = SCHEME_VARIANTS[cell["scheme"]]
+    extra_args = [*variant_args, "--size", str(cell["size"]),
+                  "--chunk-size", str(cell["chunk_size"])]
+    timeout = options["timeout"] + options["seconds_per_mb"] * cell["size"] / UNITS["MB"]
+    impair = options.get("impair")
+    if cell["loss"] is not None:
+        impair = ",".join(filter(None, [impair, f"loss={cell['loss']}"]))
+    cell_dir = os.path.join(sweep_dir, key)
+    if os.path.exists(cell_dir):
+        # Left by an interrupted or failed attempt; its rep directories would
+        # collide with the new ones and its files would be counted with them
+        print(f"{key:<36} clearing the outputs of an earlier attempt", flush=True)
+        shutil.rmtree(cell_dir)
+    results = []
+    for i in range(options["warmup"] + options["repetitions"]):
+        warmup = i < options["warmup"]
+        name = f"warmup-{i + 1:02d}" if warmup else f"rep-{i - options['warmup'] + 1:02d}"
+        record = run_once(folder, cell["transport"], os.path.join(cell_dir, name),
+                          f"{options['sweep_id']}-{key}-{name}", options["output_format"],
+                          options["correlate"], timeout, extra_args, impair)
+        record["dir"] = os.path.relpath(record["dir"], sweep_dir)
+        record["warmup"] = warmup
+        results.append(record)
+        status = "ok" if record["ok"] else f"FAILED {record.get('error', '')}"
+        print(f"{key:<36} {name:<10} {record['wall_s']:8.2f}s  {status}", flush=True)
+    return {"key": key, "cell": cell, "ok": all(r["ok"] for r in results), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run every cell of a scheme x transport x size x chunk grid, resumably")
+    parser.add_argument("--schemes", nargs="+", choices=list(SCHEME_VARIANTS),
+                        default=["RSA-2048", "ML-DSA-44"])
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=TRANSPORTS)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="Payload sizes, e.g. 1KB 64KB 8MB 1GB")
+    parser.add_argument("--chunk-sizes", nargs="+", default=DEFAULT_CHUNKS)
+    parser.add_argument("--losses", nargs="+", type=float,
+                        help="Loss rates (0-1) applied through impair.py, one cell each")
+    parser.add_argument("--impair", metavar="SPEC",
+                        help="Base impair.py spec for every cell, e.g. delay_ms=20,seed=1")
+    parser.add_argument("--cells", help="JSON file with a cell list or a grid (overrides the lists)")
+    parser.add_argument("--repetitions", "-n", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Warmup repetitions per cell, recorded but excluded from stats")
+    parser.add_argument("--output-format", choices=FORMATS, default="legacy")
+    parser.add_argument("--correlate", action="store_true")
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT,
+                        help="Base seconds allowed per repetition")
+    parser.add_argument("--seconds-per-mb", type=float, default=SECONDS_PER_MB,
+                        help="Extra seconds allowed per MB of payload")
+    parser.add_argument("--out", default=os.path.join(REPO_DIR, "runs"))
+    parser.add_argument("--resume", metavar="SWEEP_DIR",
+                        help="Continue an interrupted sweep; its stored grid and options are reused")
+    args = parser.parse_args()
+
+    if args.resume:
+        sweep_dir = args.resume
+        with open(os.path.join(sweep_dir, SWEEP_FILE)) as f:
+            sweep = json.load(f)
+    else:
+        cells = (load_cells(args.cells) if args.cells else
+                 expand_grid(args.schemes, args.transports, args.sizes, args.chunk_sizes,
+                             args.losses or [None]))
+        sweep_id = f"sweep-{new_run_id()}"
+        sweep_dir = os.path.join(args.out, sweep_id)
+        os.makedirs(sweep_dir)
+        sweep = {"sweep_id": sweep_id, "argv": sys.argv[1:], "cells": cells,
+                 "options": {"sweep_id": sweep_id, "repetitions": args.repetitions,
+                             "warmup": args.warmup, "output_format": args.output_format,
+                             "correlate": args.correlate, "impair": args.impair,
+                             "timeout": args.timeout,
+                             "seconds_per_mb": args.seconds_per_mb}}
+        with open(os.path.join(sweep_dir, SWEEP_FILE), "w") as f:
+            json.dump(sweep, f, indent=2)
+
+    done = completed_cells(sweep_dir)
+    pending = [c for c in sweep["cells"] if cell_key(c) not in done]
+    print(f"{len(sweep['cells'])} cells, {len(done)} already done, {len(pending)} to run "
+          f"-> {sweep_dir}")
+    failed = 0
+    for cell in pending:
+        entry = run_cell(cell, sweep_dir, sweep["options"])
+        failed += not entry["ok"]
+        # Append-only so an interrupted sweep loses at most the cell in progress
+        with open(os.path.join(sweep_dir, CHECKPOINT_FILE), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    print(f"{len(pending) - failed}/{len(pending)} cells ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import argparse
+import html
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from bench_writer import load_benchmark
+from run_manifest import manifest_path
+from smoothing import decimate
+from stats_compare import CONFIDENCE, LOWER_IS_BETTER, METRICS, bootstrap_ci, collect_samples
+from sweep import CHECKPOINT_FILE, SWEEP_FILE, cell_key, format_size
+
+REPORT_FILE = "report.html"
+ROLES = ["server", "client"]
+SERIES_METRICS = ["CPU (%)", "Memory (MB)"]
+# Samples per embedded series; enough for a 600 px chart, small enough for 200-cell sweeps
+POINTS = 300
+# Files next to a benchmark output, and in its repetition directory, worth linking
+SIDECARS = {".cpu.json": "cpu", ".alloc.json": "alloc"}
+REP_FILES = ["server.log", "client.log", "impair.json", "impair.log"]
+
+
+def load_sweep(sweep_dir):
+    """sweep.json and the latest checkpoint entry of every finished cell."""
+    with open(os.path.join(sweep_dir, SWEEP_FILE)) as f:
+        sweep = json.load(f)
+    entries = {}
+    path = os.path.join(sweep_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["key"]] = entry
+    return sweep, entries
+
+
+def cell_status(entry):
+    if entry is None:
+        return "pending"
+    ok = sum(r["ok"] for r in entry["results"] if not r.get("warmup"))
+    total = sum(not r.get("warmup") for r in entry["results"])
+    return "ok" if entry["ok"] else f"failed {total - ok}/{total}"
+
+
+def summary_rows(sweep, entries, samples, metrics, confidence=CONFIDENCE):
+    """One row per cell and role: the mean of each metric with its bootstrap CI."""
+    rows = []
+    for cell in sweep["cells"]:
+        key = cell_key(cell)
+        for role in ROLES:
+            selected = (samples[(samples["cell"] == key) & (samples["role"] == role)]
+                        if len(samples) else samples)
+            row = {"cell": key, "role": role, "scheme": cell["scheme"],
+                   "transport": cell["transport"], "size": format_size(cell["size"]),
+                   "chunk": format_size(cell["chunk_size"]),
+                   "loss": "" if cell.get("loss") is None else f"{cell['loss'] * 100:g}%",
+                   "status": cell_status(entries.get(key)), "n": len(selected), "metrics": {}}
+            for metric in metrics:
+                values = (selected[metric].dropna().to_numpy(dtype=float)
+                          if metric in selected else np.array([]))
+                if not len(values):
+                    continue
+                low, high = bootstrap_ci(values, confidence=confidence)
+                row["metrics"][metric] = [float(values.mean()), low, high]
+            rows.append(row)
+    return rows
+
+
+def _links(path, out_dir):
+    """Manifest, profile sidecars and repetition logs of one benchmark output."""
+    stem = os.path.splitext(path)[0]
+    candidates = [("manifest", manifest_path(path)), ("data", path)]
+    candidates += [(name, stem + suffix) for suffix, name in SIDECARS.items()]
+    rep_dir = os.path.dirname(os.path.dirname(path))
+    candidates += [(name, os.path.join(rep_dir, name)) for name in REP_FILES]
+    return [[name, os.path.relpath(p, out_dir)] for name, p in candidates if os.path.exists(p)]
+
+
+def drilldown(samples, out_dir, metrics=SERIES_METRICS, points=POINTS):
+    """Per cell, every repetition's decimated series and links, for embedding."""
+    cells = {}
+    for _, sample in samples.sort_values(["cell", "role", "path"]).iterrows():
+        try:
+            series, _ = load_benchmark(sample["path"])
+        except Exception as e:  # a truncated output still gets its row and links
+            series, error = None, f"{type(e).__name__}: {e}"
+        else:
+            error = None
+        rep = os.path.basename(os.path.dirname(os.path.dirname(sample["path"])))
+        entry = {"name": f"{sample['role']} {rep}", "role": sample["role"],
+                 "links": _links(sample["path"], out_dir), "error": error, "series": {}}
+        for metric in metrics:
+            if series is None or metric not in series or "Time(s)" not in series:
+                continue
+            t = series["Time(s)"].to_numpy(dtype=float)
+            v = series[metric].to_numpy(dtype=float)
+            keep = decimate(t, v, points, "minmax")
+            entry["series"][metric] = [np.round(t[keep], 3).tolist(),
+                                       np.round(v[keep], 3).tolist()]
+        cells.setdefault(sample["cell"], []).append(entry)
+    return cells
+
+
+def _format(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "–"
+    if value == 0:
+        return "0"
+    digits = max(0, 3 - int(math.floor(math.log10(abs(value)))) - 1)
+    return f"{value:.{min(digits, 6)}f}"
+
+
+def _table(rows, role, metrics):
+    head = ["Cell", "Scheme", "Transport", "Size", "Chunk", "Loss", "Status", "n"]
+    out = ["<table class=sortable><thead><tr>"]
+    out += [f"<th>{html.escape(h)}</th>" for h in head]
+    out += [f"<th title='mean [{int(CONFIDENCE * 100)}% bootstrap CI]'>{html.escape(m)}"
+            f"<span class=dir>{' ↓' if m in LOWER_IS_BETTER else ' ↑'}</span></th>"
+            for m in metrics]
+    out.append("</tr></thead><tbody>")
+    for row in rows:
+        if row["role"] != role:
+            continue
+        status = "ok" if row["status"] == "ok" else "bad"
+        cells = [row["cell"], row["scheme"], row["transport"], row["size"], row["chunk"],
+                 row["loss"], row["status"], row["n"]]
+        out.append(f"<tr data-cell='{html.escape(row['cell'])}' class={status}>")
+        out += [f"<td>{html.escape(str(c))}</td>" for c in cells]
+        for metric in metrics:
+            if metric in row["metrics"]:
+                mean, low, high = row["metrics"][metric]
+                ci = "" if math.isnan(low) else f" <small>[{_format(low)}, {_format(high)}]</small>"
+                out.append(f"<td data-value='{mean}'>{_format(mean)}{ci}</td>")
+            else:
+                out.append("<td data-value=''>–</td>")
+        out.append("</tr>")
+    out.append("</tbody></table>")
+    return "\n".join(out)
+
+
+STYLE = """
+body{font-family:sans-serif;margin:1.5em;color:#222}
+table{border-collapse:collapse;font-size:13px;margin-bottom:1.5em}
+th,td{border:1px solid #ccc;padding:3px 6px;text-align:right;white-space:nowrap}
+th{background:#eee;cursor:pointer;position:sticky;top:0}
+td:nth-child(-n+7){text-align:left}
+tr.bad td{background:#fde8e8}
+tbody tr:hover td{background:#e8f0fe;cursor:pointer}
+tr.selected td{background:#cfe0fc}
+small{color:#666}
+.dir{color:#999;font-weight:normal}
+#detail{border-top:2px solid #888;padding-top:.5em}
+.chart{display:inline-block;margin:0 1em 1em 0}
+.links li{font-size:13px}
+"""
+
+SCRIPT = """
+const data = JSON.parse(document.getElementById('data').textContent);
+const colors = ['#1f77b4','#ff7f0e','#2ca02c','#d62728','#9467bd','#8c564b','#e377c2',
+                '#7f7f7f','#bcbd22','#17becf'];
+function chart(title, reps, metric) {
+  const W = 560, H = 240, L = 50, B = 30, T = 20, R = 10;
+  const lines = reps.filter(r => r.series[metric]);
+  if (!lines.length) return '';
+  let x0 = Infinity, x1 = -Infinity, y0 = Infinity, y1 = -Infinity;
+  for (const r of lines) {
+    const [t, v] = r.series[metric];
+    for (let i = 0; i < t.length; i++) {
+      x0 = Math.min(x0, t[i]); x1 = Math.max(x1, t[i]);
+      y0 = Math.min(y0, v[i]); y1 = Math.max(y1, v[i]);
+    }
+  }
+  y0 = Math.min(0, y0);
+  if (x1 <= x0) x1 = x0 + 1;
+  if (y1 <= y0) y1 = y0 + 1;
+  const sx = x => L + (x - x0) / (x1 - x0) * (W - L - R);
+  const sy = y => H - B - (y - y0) / (y1 - y0) * (H - B - T);
+  let svg = `<svg width=${W} height=${H} font-size=11>`;
+  svg += `<text x=${L} y=13>${title}</text>`;
+  svg += `<line x1=${L} y1=${H - B} x2=${W - R} y2=${H - B} stroke=#888 />`;
+  svg += `<line x1=${L} y1=${T} x2=${L} y2=${H - B} stroke=#888 />`;
+  for (const f of [0, 0.5, 1]) {
+    const y = y0 + f * (y1 - y0), x = x0 + f * (x1 - x0);
+    svg += `<text x=${L - 4} y=${sy(y) + 4} text-anchor=end>${+y.toPrecision(3)}</text>`;
+    svg += `<text x=${sx(x)} y=${H - B + 14} text-anchor=middle>${+x.toPrecision(3)} s</text>`;
+  }
+  lines.forEach((r, i) => {
+    const [t, v] = r.series[metric];
+    const pts = t.map((x, j) => `${sx(x).toFixed(1)},${sy(v[j]).toFixed(1)}`).join(' ');
+    svg += `<polyline fill=none stroke=${colors[i % colors.length]} stroke-width=1.2 ` +
+           `points="${pts}"><title>${r.name}</title></polyline>`;
+  });
+  return `<div class=chart>${svg}</svg></div>`;
+}
+function show(cell, role) {
+  const reps = (data.cells[cell] || []).filter(r => r.role === role);
+  let out = `<h3>${cell} — ${role}</h3>`;
+  if (!reps.length) out += '<p>No outputs were recorded for this cell.</p>';
+  for (const metric of data.series_metrics) out += chart(metric, reps, metric);
+  out += '<ul class=links>';
+  reps.forEach((r, i) => {
+    const links = r.links.map(([n, p]) => `<a href="${encodeURI(p)}">${n}</a>`).join(' · ');
+    out += `<li><span style="color:${colors[i % colors.length]}">■</span> ${r.name}: ${links}` +
+           (r.error ? ` <b>${r.error}</b>` : '') + '</li>';
+  });
+  document.getElementById('detail').innerHTML = out + '</ul>';
+}
+for (const table of document.querySelectorAll('table.sortable')) {
+  const role = table.dataset.role;
+  table.querySelectorAll('tbody tr').forEach(tr => tr.addEventListener('click', () => {
+    document.querySelectorAll('tr.selected').forEach(s => s.classList.remove('selected'));
+    tr.classList.add('selected');
+    show(tr.dataset.cell, role);
+  }));
+  table.querySelectorAll('th').forEach((th, col) => th.addEventListener('click', () => {
+    const body = table.tBodies[0], rows = [...body.rows];
+    const asc = th.dataset.asc !== '1';
+    th.dataset.asc = asc ? '1' : '0';
+    const key = r => {
+      const c = r.cells[col];
+      const v = c.dataset.value !== undefined ? parseFloat(c.dataset.value) : NaN;
+      return isNaN(v) ? c.textContent : v;
+    };
+    rows.sort((a, b) => {
+      const x = key(a), y = key(b);
+      const cmp = typeof x === 'number' && typeof y === 'number' ? x - y
+                : String(x).localeCompare(String(y), undefined, {numeric: true});
+      return asc ? cmp : -cmp;
+    });
+    rows.forEach(r => body.appendChild(r));
+  }));
+}
+"""
+
+
+def render(sweep, rows, cells, metrics, series_metrics, sweep_dir, out_dir):
+    statuses = [r["status"] for r in rows if r["role"] == ROLES[0]]
+    done = sum(s == "ok" for s in statuses)
+    failed = sum(s.startswith("failed") for s in statuses)
+    options = sweep.get("options", {})
+    sweep_json = os.path.relpath(os.path.join(sweep_dir, SWEEP_FILE), out_dir)
+    # "</" would end the script element early
+    data = json.dumps({"cells": cells, "series_metrics": series_metrics},
+                      separators=(",", ":")).replace("</", "<\\/")
+    title = f"Sweep {sweep.get('sweep_id', os.path.basename(os.path.abspath(sweep_dir)))}"
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset=utf-8>",
+        f"<title>{html.escape(title)}</title><style>{STYLE}</style></head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>{len(statuses)} cells: {done} ok, {failed} failed, "
+        f"{len(statuses) - done - failed} pending. {options.get('repetitions', '?')} "
+        f"repetitions per cell after {options.get('warmup', 0)} warm-up (excluded). "
+        f"Means with {int(CONFIDENCE * 100)}% bootstrap confidence intervals; "
+        f"↓ lower is better. Click a row for its time series, manifests and profiles, "
+        f"a header to sort.</p>",
+        f"<p><small>sweep.py {html.escape(' '.join(sweep.get('argv', [])))} · "
+        f"<a href='{html.escape(sweep_json)}'>sweep.json</a> · generated "
+        f"{time.strftime('%Y-%m-%d %H:%M:%S')}</small></p>",
+    ]
+    for role in ROLES:
+        parts.append(f"<h2>{role.capitalize()}</h2>")
+        parts.append(_table(rows, role, metrics).replace(
+            "<table class=sortable>", f"<table class=sortable data-role={role}>", 1))
+    parts += ["<div id=detail><p>Select a cell above.</p></div>",
+              f"<script type=application/json id=data>{data}</script>",
+              f"<script>{SCRIPT}</script></body></html>"]
+    return "\n".join(parts)
+
+
+def build_report(sweep_dir, out=None, metrics=METRICS, series_metrics=SERIES_METRICS,
+                 points=POINTS, include_warmup=False):
+    """Write the HTML report of one sweep directory; returns its path."""
+    out = out or os.path.join(sweep_dir, REPORT_FILE)
+    out_dir = os.path.dirname(os.path.abspath(out))
+    sweep, entries = load_sweep(sweep_dir)
+    samples = collect_samples(sweep_dir, include_warmup=include_warmup)
+    if len(samples):
+        samples["cell"] = [os.path.relpath(p, sweep_dir).split(os.sep)[0]
+                           for p in samples["path"]]
+    rows = summary_rows(sweep, entries, samples, metrics)
+    cells = drilldown(samples, out_dir, series_metrics, points) if len(samples) else {}
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(render(sweep, rows, cells, metrics, series_metrics, sweep_dir, out_dir))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="One self-contained HTML page per sweep: summary tables with confidence "
+                    "intervals and a drill-down into every cell")
+    parser.add_argument("sweep_dirs", nargs="+", metavar="SWEEP_DIR")
+    parser.add_argument("--out", help=f"Report path (single sweep only; default "
+                                      f"SWEEP_DIR/{REPORT_FILE})")
+    parser.add_argument("--metrics", nargs="+", default=METRICS)
+    parser.add_argument("--series", nargs="+", default=SERIES_METRICS,
+                        help="Time series embedded for the drill-down")
+    parser.add_argument("--points", type=int, default=POINTS,
+                        help="Samples kept per embedded series (min-max decimation)")
+    parser.add_argument("--include-warmup", action="store_true")
+    args = parser.parse_args()
+    if args.out and len(args.sweep_dirs) > 1:
+        parser.error("--out needs a single sweep directory")
+
+    for sweep_dir in args.sweep_dirs:
+        started = time.perf_counter()
+        path = build_report(sweep_dir, args.out, args.metrics, args.series, args.points,
+                            args.include_warmup)
+        print(f"{path} ({os.path.getsize(path) / 1024:.0f} KB) in "
+              f"{time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import csv
+import os
+import random
+import socket
+import ssl
+import statistics
+import threading
+import time
+
+from run_manifest import REPO_DIR, new_run_id, write_manifest
+from sweep import parse_size
+
+SCRIPTS_DIR = os.path.join(REPO_DIR, "Updated8MBv2Scripts", "Scripts")
+TRACE_COLUMNS = ["Time (s)", "Connection", "Size (bytes)"]
+REPLAY_COLUMNS = ["Message", "Connection", "Size (bytes)", "Scheduled (s)", "Start (s)",
+                  "Handshake (ms)", "Latency (ms)", "Lag (ms)", "OK"]
+CHUNK_SIZE = 4096
+DEFAULT_MIX = "1KB=0.80,16KB=0.15,1MB=0.04,8MB=0.01"
+
+
+# ----------- Format ------------
+
+
+class TraceRecorder:
+    """Append (time, connection, size) rows to a trace CSV as messages happen.
+
+    Times are seconds since the first recorded message. Safe to call from
+    several threads; use it where the application sends its signed messages.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(TRACE_COLUMNS)
+        self._lock = threading.Lock()
+        self._t0 = None
+
+    def record(self, size, connection=0, at=None):
+        at = time.time() if at is None else at
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = at
+            self._csv.writerow([f"{at - self._t0:.6f}", connection, int(size)])
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_trace(path):
+    """Return the trace as a time-ordered list of (time_s, connection, size)."""
+    with open(path, newline="") as f:
+        rows = [(float(r["Time (s)"]), r["Connection"], int(r["Size (bytes)"]))
+                for r in csv.DictReader(f)]
+    return sorted(rows, key=lambda r: r[0])
+
+
+def synthesise(path, messages, rate, mix=DEFAULT_MIX, connections=1, seed=0):
+    """Poisson arrivals with sizes drawn from a "size=weight,..." mix."""
+    rng = random.Random(seed)
+    sizes, weights = zip(*((parse_size(size), float(weight)) for size, weight in
+                           (item.split("=") for item in mix.split(","))))
+    now = 0.0
+    with TraceRecorder(path) as recorder:
+        for _ in range(messages):
+            recorder.record(rng.choices(sizes, weights)[0], rng.randrange(connections), at=now)
+            now += rng.expovariate(rate)
+
+
+def describe(trace):
+    sizes = [size for _, _, size in trace]
+    duration = trace[-1][0] - trace[0][0] if len(trace) > 1 else 0.0
+    return {"messages": len(trace), "connections": len({c for _, c, _ in trace}),
+            "duration_s": duration, "bytes": sum(sizes),
+            "size_p50": statistics.median(sizes), "size_max": max(sizes),
+            "rate_msgs_s": len(trace) / duration if duration else None}
+
+
+# ----------- Recorder relay ------------
+
+
+async def record_relay(listen, target, path, group_by="address"):
+    """TCP passthrough that logs one trace row per client connection.
+
+    Sizes are the client->server bytes on the wire, so behind TLS they include
+    the handshake and record overhead (a few KB per connection).
+    """
+    recorder = TraceRecorder(path)
+
+    async def pipe(reader, writer, counter=None):
+        try:
+            while data := await reader.read(65536):
+                if counter is not None:
+                    counter[0] += len(data)
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        opened = time.time()
+        peer = client_writer.get_extra_info("peername")
+        upstream = [0]
+        server_reader, server_writer = await asyncio.open_connection(*target)
+        await asyncio.gather(pipe(client_reader, server_writer, upstream),
+                             pipe(server_reader, client_writer))
+        server_writer.close()
+        client_writer.close()
+        recorder.record(upstream[0], peer[0] if group_by == "address" else f"{peer[0]}:{peer[1]}",
+                        at=opened)
+
+    server = await asyncio.start_server(handle, *listen)
+    print(f"[TRACE] recording {listen[0]}:{server.sockets[0].getsockname()[1]} -> "
+          f"{target[0]}:{target[1]} into {path}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        recorder.close()
+
+
+# ----------- Replay ------------
+
+
+class Signer:
+    """Signs b"x" * size with the key files the scheme's client/server scripts use.
+
+    Also exposes the raw sign/verify pair and the public key bytes for
+    challenge-response handshakes.
+
+    Signatures are cached per size: the trace exercises the servers, and
+    client-side signing would otherwise set the replay pace.
+    """
+
+    def __init__(self, scheme, variant):
+        self.scheme = scheme
+        self.cache = {}
+        if scheme == "rsa":
+            from Crypto.Hash import SHA256
+            from Crypto.PublicKey import RSA
+            from Crypto.Signature import pkcs1_15
+            suffix = "" if variant == 2048 else f"_{variant}"
+            directory = os.path.join(SCRIPTS_DIR, "RSA")
+            private_path = os.path.join(directory, f"client_private{suffix}.pem")
+            if os.path.exists(private_path):
+                key = RSA.import_key(open(private_path, "rb").read())
+            else:  # as the client does on first run, so the server can load the public half
+                key = RSA.generate(variant)
+                open(private_path, "wb").write(key.export_key())
+                open(os.path.join(directory, f"client_public{suffix}.pem"), "wb").write(
+                    key.publickey().export_key())
+            self.public = key.publickey().export_key(format="DER")
+            self.sign = lambda data: pkcs1_15.new(key).sign(SHA256.new(data))
+
+            def verify(public, data, signature):
+                try:
+                    pkcs1_15.new(RSA.import_key(public)).verify(SHA256.new(data), signature)
+                    return True
+                except (ValueError, TypeError):
+                    return False
+            self.verify = verify
+        else:
+            from dilithium_py.ml_dsa import ML_DSA_44, ML_DSA_65, ML_DSA_87
+            ml_dsa = {44: ML_DSA_44, 65: ML_DSA_65, 87: ML_DSA_87}[variant]
+            prefix = "dilithium" if variant == 44 else f"dilithium{variant}"
+            directory = os.path.join(SCRIPTS_DIR, "ML-DSA", "client_keys")
+            private_path = os.path.join(directory, f"{prefix}_private.key")
+            public_path = os.path.join(directory, f"{prefix}_public.key")
+            if os.path.exists(private_path):
+                key = open(private_path, "rb").read()
+                public = open(public_path, "rb").read()
+            else:
+                public, key = ml_dsa.keygen()
+                os.makedirs(directory, exist_ok=True)
+                open(private_path, "wb").write(key)
+                open(public_path, "wb").write(public)
+            self.public = public
+            self.sign = lambda data: ml_dsa.sign(key, data)
+            self.verify = ml_dsa.verify
+
+    def message(self, size):
+        """Wire bytes for one message in the scheme's framing."""
+        if size not in self.cache:
+            data = b"x" * size
+            signature = self.sign(data)
+            if self.scheme == "rsa":
+                self.cache[size] = data + signature
+            else:
+                self.cache[size] = len(signature).to_bytes(4, "big") + signature + data
+        return self.cache[size]
+
+
+def _tls_context(scheme):
+    directory = os.path.join(SCRIPTS_DIR, "RSA" if scheme == "rsa" else "ML-DSA")
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.load_cert_chain(certfile=os.path.join(directory, "server.pem"),
+                            keyfile=os.path.join(directory, "server_key.pem"))
+    return context
+
+
+def send_tcp(host, port, context, payload, chunk_size=CHUNK_SIZE):
+    """One signed message per TLS connection; returns (handshake_s, total_s)."""
+    start = time.perf_counter()
+    with socket.create_connection((host, port)) as s:
+        with context.wrap_socket(s, server_hostname=host) as tls:
+            handshake = time.perf_counter() - start
+            view = memoryview(payload)
+            for offset in range(0, len(payload), chunk_size):
+                tls.sendall(view[offset:offset + chunk_size])
+            tls.shutdown(socket.SHUT_WR)
+            # Drain until the server closes (after verifying): closing with its
+            # session tickets unread would send a RST and drop data it has not read
+            try:
+                while tls.recv(65536):
+                    pass
+            except ConnectionError:
+                pass
+    return handshake, time.perf_counter() - start
+
+
+async def send_quic(host, port, payload, chunk_size=CHUNK_SIZE):
+    from aioquic.asyncio import connect
+    from aioquic.quic.configuration import QuicConfiguration
+    configuration = QuicConfiguration(is_client=True)
+    configuration.verify_mode = ssl.CERT_NONE
+    start = time.perf_counter()
+    async with connect(host, port, configuration=configuration) as connection:
+        handshake = time.perf_counter() - start
+        stream_id = connection._quic.get_next_available_stream_id()
+        for offset in range(0, len(payload), chunk_size):
+            connection._quic.send_stream_data(stream_id, payload[offset:offset + chunk_size])
+        connection._quic.send_stream_data(stream_id, b"", end_stream=True)
+        connection.transmit()
+        await connection.wait_closed()  # the server closes once it has verified
+    return handshake, time.perf_counter() - start
+
+
+async def replay(trace, signer, transport, host, port, speed=1.0, timeout=60.0):
+    """Replay each connection group in order, groups concurrently.
+
+    A message starts at its trace time divided by speed, or when the previous
+    message of its group finishes if that is later (speed 0 = back to back).
+    """
+    groups = {}
+    for index, (at, connection, size) in enumerate(trace):
+        groups.setdefault(connection, []).append((index, at - trace[0][0], size))
+    payloads = {size: signer.message(size) for _, _, size in trace}
+    context = _tls_context(signer.scheme) if transport == "tcp" else None
+    loop = asyncio.get_running_loop()
+    results = []
+    t0 = loop.time()
+
+    async def run_group(connection, messages):
+        for index, at, size in messages:
+            scheduled = at / speed if speed else 0.0
+            await asyncio.sleep(max(0.0, scheduled - (loop.time() - t0)))
+            started = loop.time() - t0
+            try:
+                if transport == "tcp":
+                    sent = asyncio.to_thread(send_tcp, host, port, context, payloads[size])
+                else:
+                    sent = send_quic(host, port, payloads[size])
+                handshake, total = await asyncio.wait_for(sent, timeout)
+                ok = True
+            except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+                print(f"[REPLAY] message {index} failed: {e!r}", flush=True)
+                handshake, total, ok = None, loop.time() - t0 - started, False
+            results.append([index, connection, size, scheduled, started,
+                            None if handshake is None else handshake * 1000, total * 1000,
+                            (started - scheduled) * 1000 if speed else 0.0, ok])
+
+    await asyncio.gather(*(run_group(c, m) for c, m in groups.items()))
+    return sorted(results), loop.time() - t0
+
+
+def summarise(results, wall_s):
+    ok = [r for r in results if r[-1]]
+    latencies = sorted(r[6] for r in ok)
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+    return {"messages": len(results), "ok": len(ok), "wall_s": wall_s,
+            "achieved_msgs_s": len(ok) / wall_s if wall_s else None,
+            "achieved_mb_s": sum(r[2] for r in ok) / (1024 * 1024) / wall_s if wall_s else None,
+            "latency_p50_ms": pct(0.50), "latency_p95_ms": pct(0.95), "latency_p99_ms": pct(0.99),
+            "lag_max_ms": max((r[7] for r in results), default=None)}
+
+
+def save_replay(directory, run_id, scheme_name, transport, results, summary, parameters,
+                endpoint):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"replay_{scheme_name}_{transport}_"
+                                   f"{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPLAY_COLUMNS)
+        writer.writerows(results)
+    write_manifest(path, run_id, "replay", scheme_name, transport, parameters, endpoint,
+                   summary=summary)
+    return path
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create, record and replay message-size traces against the servers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    syn = sub.add_parser("synth", help="Generate a trace from a size mix and arrival rate")
+    syn.add_argument("trace")
+    syn.add_argument("--messages", type=int, default=200)
+    syn.add_argument("--rate", type=float, default=10.0, help="Mean messages per second")
+    syn.add_argument("--mix", default=DEFAULT_MIX, help="size=weight pairs")
+    syn.add_argument("--connections", type=int, default=4, help="Connection groups")
+    syn.add_argument("--seed", type=int, default=0)
+    rec = sub.add_parser("record", help="Record client connections through a TCP relay")
+    rec.add_argument("trace")
+    rec.add_argument("--listen", type=_address, required=True)
+    rec.add_argument("--target", type=_address, required=True)
+    rec.add_argument("--group-by", choices=["address", "connection"], default="address")
+    show = sub.add_parser("show", help="Summarise a trace")
+    show.add_argument("trace")
+    rep = sub.add_parser("replay", help="Drive a server (started with --size 0) with a trace")
+    rep.add_argument("trace")
+    rep.add_argument("--scheme", choices=["rsa", "mldsa"], required=True)
+    rep.add_argument("--key-bits", type=int, choices=[2048, 3072, 4096], default=2048)
+    rep.add_argument("--level", type=int, choices=[44, 65, 87], default=44)
+    rep.add_argument("--protocol", choices=["tcp", "quic"], required=True)
+    rep.add_argument("--host", default="127.0.0.1")
+    rep.add_argument("--port", type=int, required=True)
+    rep.add_argument("--speed", type=float, default=1.0,
+                     help="Time scale: 2 = twice as fast, 0 = back to back")
+    rep.add_argument("--timeout", type=float, default=60.0, help="Seconds allowed per message")
+    rep.add_argument("--out", default=os.path.join(REPO_DIR, "runs"))
+    rep.add_argument("--run-id")
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        synthesise(args.trace, args.messages, args.rate, args.mix, args.connections, args.seed)
+        print(describe(load_trace(args.trace)))
+    elif args.command == "show":
+        print(describe(load_trace(args.trace)))
+    elif args.command == "record":
+        asyncio.run(record_relay(args.listen, args.target, args.trace, args.group_by))
+    else:
+        trace = load_trace(args.trace)
+        variant = args.key_bits if args.scheme == "rsa" else args.level
+        scheme_name = f"RSA-{variant}" if args.scheme == "rsa" else f"ML-DSA-{variant}"
+        run_id = args.run_id or new_run_id()
+        results, wall_s = asyncio.run(replay(trace, Signer(args.scheme, variant), args.protocol,
+                                             args.host, args.port, args.speed, args.timeout))
+        summary = {**summarise(results, wall_s), "trace": describe(trace)}
+        path = save_replay(os.path.join(args.out, run_id, "replay"), run_id, scheme_name,
+                           args.protocol, results, summary,
+                           {"trace": os.path.abspath(args.trace), "speed": args.speed,
+                            "data_size": 0, "chunk_size": CHUNK_SIZE},
+                           {"host": args.host, "port": args.port})
+        latency = (f"p50 {summary['latency_p50_ms']:.1f} ms  p99 {summary['latency_p99_ms']:.1f} ms"
+                   if summary["ok"] else "no successful messages")
+        print(f"{summary['ok']}/{summary['messages']} messages in {wall_s:.2f}s  "
+              f"{summary['achieved_msgs_s']:.2f} msg/s  {latency} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,58 @@
+import os
+import sys
 import matplotlib.pyplot as plt
+import pandas as pd
 
-# Data
-packet_loss = [5, 10, 20, 40]
-tcp_handshake = [8.4130, 35.8334, 109.7051, 400.2101]
-quic_handshake = [10.1398, 23.6088, 117.2675, 412.4862]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                                'BenchmarkTools'))
+from loss_curves import LOSS_COLUMN, derive  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+
+# Client runs of the loss experiments: Go logs filed under loss<N> directories
+# (e.g. Results/Metrics/Client/mldsa-logs/loss5/client/tcp/metrics-*.csv), or
+# runs recorded through impair.py (sweep.py --losses)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Results')
+# The published handshake means, used while none of those runs are in the tree;
+# also drawable with plots.py loss --table
+SEED_TABLE = os.path.join(RESULTS_DIR, 'plots-packet-loss', 'ml_dsa_handshake_loss.csv')
+STAT = 'mean'  # or p50, p90, p99 when derived
+METRIC = f'Handshake(ms) {STAT}'
+STYLES = {'ML-DSA tcp': dict(linestyle='-', color='blue', label='ML-DSA TCP'),
+          'ML-DSA quic': dict(linestyle='--', color='red', label='ML-DSA QUIC')}
 
-# Common settings
-x_ticks = list(range(0, 41, 10))  # 0 to 40 with step 10
-y_ticks = list(range(0, 420, 100))  # 0 to 400 with step 100
+# Data
+with ResultsStore() as store:
+    store.ingest([RESULTS_DIR])
+    table, files = derive(store, by=['family', 'transport'], role='client', family='ML-DSA')
+    # Runs flagged by outliers.py are left out of the curves
+    flagged = store.flagged(role='client', family='ML-DSA')
+if table.empty:
+    print(f'No loss-tagged ML-DSA client runs under {os.path.normpath(RESULTS_DIR)}; '
+          f'drawing {os.path.basename(SEED_TABLE)}')
+    table = pd.read_csv(SEED_TABLE)
+    if METRIC not in table.columns:
+        sys.exit(f'{os.path.basename(SEED_TABLE)} only has the published means; set STAT to mean')
+    print(table.to_string(index=False))
+else:
+    print(table[['Label', LOSS_COLUMN, 'Files', 'Connections', METRIC]].to_string(index=False))
+    for row in flagged[flagged['loss_pct'].notna()].itertuples():
+        print(f'Left out {row.path}: {row.reason}, {row.detail}')
 
 # Create a single plot
 plt.figure(figsize=(8, 6))
 
-# Plot ML-DSA TCP (solid blue line)
-plt.plot(packet_loss, tcp_handshake, marker='o',
-         linestyle='-', color='blue', label='ML-DSA TCP')
-
-# Plot ML-DSA QUIC (dashed red line)
-plt.plot(packet_loss, quic_handshake, marker='o',
-         linestyle='--', color='red', label='ML-DSA QUIC')
+# One line per transport, ML-DSA TCP solid blue and ML-DSA QUIC dashed red
+for label, style in STYLES.items():
+    rows = table[table['Label'] == label].sort_values(LOSS_COLUMN)
+    if len(rows):
+        plt.plot(rows[LOSS_COLUMN], rows[METRIC], marker='o', **style)
 
 # Add title and labels
 plt.title('ML-DSA Handshake Time Comparison')
 plt.xlabel('Packet Loss (%)')
-plt.ylabel('Handshake Time (ms)')
-plt.xticks(x_ticks)
-plt.yticks(y_ticks)
+plt.ylabel(f'Handshake Time (ms, {METRIC.split()[-1]})')
+plt.xlim(left=0)
+plt.ylim(bottom=0)
 
 # Add grid and legend
 plt.grid(True)
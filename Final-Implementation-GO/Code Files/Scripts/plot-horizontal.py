@@ -1,9 +1,13 @@
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from glob import glob
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                                'BenchmarkTools'))
+from csv_loader import format_errors, load_csvs  # noqa: E402
+from resample import average_runs  # noqa: E402
+
 # Configuration
 BASE_DIR = 'Benchmark'
 OUTPUT_DIR = 'plots'
@@ -18,19 +22,14 @@ LABEL_FONTSIZE = 18
 TICK_FONTSIZE = 16
 LEGEND_FONTSIZE = 16
 
-# Set global font settings
-plt.rcParams['font.family'] = FONT_FAMILY
-plt.rcParams['font.sans-serif'] = [FONT_NAME, 'DejaVu Sans', 'Liberation Sans']
-
-sns.set(style="whitegrid", font=FONT_FAMILY)
-
 # Color palette for consistency
 COLOR_PALETTE = {
     'RSA': '#1f77b4',     # Blue
     'ML-DSA': '#ff7f0e'   # Orange
 }
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Parse failures are collected here and reported once after loading
+LOAD_ERRORS = []
 
 
 def format_scheme_label(scheme):
@@ -44,37 +43,25 @@ def collect_csvs(role, scheme, protocol):
     return sorted(files)
 
 
-def load_server_metrics_avg_line(files, max_lines=200):
+def load_server_metrics_avg_line(files, max_lines=None):
     if not files:
         return pd.DataFrame()
-    dfs = []
-    for f in files:
-        try:
-            df = pd.read_csv(f).head(max_lines)
-            dfs.append(df)
-        except Exception as e:
-            print(f"Failed to read {f}: {e}")
+    frames, errors = load_csvs(files, schema='go-server', nrows=max_lines)
+    LOAD_ERRORS.extend(errors)
+    dfs = list(frames.values())
     if not dfs:
         return pd.DataFrame()
-    numeric_cols = dfs[0].select_dtypes(include='number').columns
-    avg_data = pd.DataFrame(index=range(max_lines))
-    for col in numeric_cols:
-        col_stack = pd.concat([df[col] for df in dfs], axis=1)
-        avg_data[col] = col_stack.mean(axis=1)
-    if 'Elapsed(ms)' not in avg_data.columns:
-        avg_data['Elapsed(ms)'] = avg_data.index
-    avg_data.dropna(how='all', inplace=True)
-    return avg_data.reset_index(drop=True)
+    # Resample every run onto one Elapsed(ms) grid before averaging: ticker
+    # jitter and different run lengths misalign the rows of different runs.
+    # Adds "<metric> p10"/"<metric> p90" bands and the contributing "Runs";
+    # the tail where fewer than a tenth of the runs are still going is left out.
+    return average_runs(dfs, 'Elapsed(ms)', min_runs=max(1, len(dfs) // 10))
 
 
 def load_client_metrics(files):
-    dfs = []
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-            dfs.append(df)
-        except Exception as e:
-            print(f"Failed to read {f}: {e}")
+    frames, errors = load_csvs(files, schema='go-client')
+    LOAD_ERRORS.extend(errors)
+    dfs = list(frames.values())
     return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
 
@@ -86,6 +73,16 @@ def convert_time_units(df, columns):
     return df
 
 
+def set_style():
+    # Imported here rather than at the top: the CSV loader's worker processes
+    # re-import this script when they are spawned, and never plot
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.rcParams['font.family'] = FONT_FAMILY
+    plt.rcParams['font.sans-serif'] = [FONT_NAME, 'DejaVu Sans', 'Liberation Sans']
+    sns.set(style="whitegrid", font=FONT_FAMILY)
+
+
 def style_axis(ax, xlabel, ylabel):
     ax.set_xlabel(xlabel, fontsize=LABEL_FONTSIZE)
     ax.set_ylabel(ylabel, fontsize=LABEL_FONTSIZE)
@@ -93,6 +90,7 @@ def style_axis(ax, xlabel, ylabel):
 
 
 def plot_time_series_server(data, protocol):
+    import matplotlib.pyplot as plt
     fig, axs = plt.subplots(1, 3, figsize=(16, 6))
     metrics = ['CPU(%)', 'Memory(MB)', 'Throughput(MB/s)']
 
@@ -110,8 +108,11 @@ def plot_time_series_server(data, protocol):
                         label=label,
                         linestyle=linestyle,
                         color=COLOR_PALETTE[label])
+                if f'{metric} p10' in df.columns:
+                    ax.fill_between(x_sec, df[f'{metric} p10'], df[f'{metric} p90'],
+                                    color=COLOR_PALETTE[label], alpha=0.15, linewidth=0)
         style_axis(ax, 'Elapsed Time (s)', metric)
-        ax.set_xticks(range(0, int(x_sec.max()) + 2, 2))
+        ax.set_xticks(range(0, int(x_sec.max()) + 2, 2 * max(1, int(x_sec.max()) // 20)))
         ax.legend(fontsize=LEGEND_FONTSIZE)
     plt.tight_layout()
     plt.savefig(os.path.join(OUTPUT_DIR, f'server_time_series_{protocol}.png'))
@@ -119,6 +120,8 @@ def plot_time_series_server(data, protocol):
 
 
 def plot_box_server(data, protocol):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     fig, axs = plt.subplots(1, 3, figsize=(16, 6))
     metrics = ['CPU(%)', 'Memory(MB)', 'Throughput(MB/s)']
     df_combined = []
@@ -146,6 +149,8 @@ def plot_box_server(data, protocol):
 
 
 def plot_box_client(data, protocol):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     fig, axs = plt.subplots(1, 4, figsize=(18, 6))
     metrics = ['Handshake(ms)', 'Latency(ms)', 'RTT(ms)', 'TTC(ms)']
     df_combined = []
@@ -171,6 +176,8 @@ def plot_box_client(data, protocol):
 
 
 def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    set_style()
     for protocol in PROTOCOLS:
         print(f'\n📊 Processing {protocol.upper()}')
 
@@ -179,13 +186,17 @@ def main():
 
         for scheme in SCHEMES:
             s_files = collect_csvs('Server', scheme, protocol)
-            server_df = load_server_metrics_avg_line(s_files, max_lines=200)
+            server_df = load_server_metrics_avg_line(s_files)
             server_df = convert_time_units(server_df, [])
             server_data[scheme] = server_df
 
             c_files = collect_csvs('Client', scheme, protocol)
             client_data[scheme] = load_client_metrics(c_files)
 
+        if LOAD_ERRORS:
+            print(format_errors(LOAD_ERRORS))
+            LOAD_ERRORS.clear()
+
         plot_time_series_server(server_data, protocol)
         plot_box_server(server_data, protocol)
         plot_box_client(client_data, protocol)
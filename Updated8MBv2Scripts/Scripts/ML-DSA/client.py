@@ -1,18 +1,30 @@
 import ssl
 import socket
-import asyncio
 import argparse
 import time
 import os
-import csv
+import sys
 import threading
 import psutil
-from dilithium_py.ml_dsa import ML_DSA_44
-from aioquic.asyncio import connect
-from aioquic.quic.configuration import QuicConfiguration
+from dilithium_py.ml_dsa import ML_DSA_44, ML_DSA_65, ML_DSA_87
+
+TOOLS_DIR = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "..", "..", "..", "BenchmarkTools")
+sys.path.insert(0, os.path.normpath(TOOLS_DIR))
+from bench_writer import FORMATS, BenchmarkWriter  # noqa: E402
+from run_manifest import new_run_id, write_manifest  # noqa: E402
+from noise_control import configure as configure_noise, pin_sampler  # noqa: E402
+from correlation import quic_client_handshake, tag_timings, tcp_client_handshake  # noqa: E402
 
 DATA_SIZE = 8 * 1024 * 1024
 CHUNK_SIZE = 4096
+ML_DSA_LEVELS = {44: ML_DSA_44, 65: ML_DSA_65, 87: ML_DSA_87}
+ML_DSA_LEVEL = 44
+ML_DSA = ML_DSA_LEVELS[ML_DSA_LEVEL]
+SCHEME = f"ML-DSA-{ML_DSA_LEVEL}"
+SERVER_HOST = "192.168.1.130"
+TCP_PORT = 4444
+QUIC_PORT = 4443
 TLS_CERT = "server.crt"
 PRIVATE_KEY_PATH = "client_keys/dilithium_private.key"
 PUBLIC_KEY_PATH = "client_keys/dilithium_public.key"
@@ -20,6 +32,9 @@ PUBLIC_KEY_PATH = "client_keys/dilithium_public.key"
 # BENCHMARKING
 BENCHMARK_DIR = "client_benchmarks"
 os.makedirs(BENCHMARK_DIR, exist_ok=True)
+BENCHMARK_FORMAT = "legacy"
+RUN_ID = None
+CORRELATE = False
 
 
 def log(msg, verbose=True):
@@ -28,7 +43,7 @@ def log(msg, verbose=True):
 
 
 def generate_and_save_keypair(verbose=False):
-    public_key, private_key = ML_DSA_44.keygen()
+    public_key, private_key = ML_DSA.keygen()
     os.makedirs("client_keys", exist_ok=True)
     with open(PRIVATE_KEY_PATH, "wb") as f:
         f.write(private_key)
@@ -49,45 +64,62 @@ def load_private_key():
 # BENCHMARKING: Resource monitoring function
 
 
-def monitor_resources(interval, running_flag, stats_list):
+def monitor_resources(interval, stop, stats_list):
+    pin_sampler()
     process = psutil.Process()
     start_time = time.time()
-
-    while running_flag["active"]:
-        cpu = process.cpu_percent(interval=None)
+    # CPU from the process clock: psutil's cpu_percent counts 10 ms ticks and its first
+    # reading is always 0.0, so a short transfer would read 0 %
+    last_wall, last_cpu = time.perf_counter(), time.process_time()
+
+    while True:
+        # Sampled at the end of each interval, and once more when stopped, so even a
+        # transfer shorter than one interval gets a reading that covers it
+        stopped = stop.wait(interval)
+        wall, cpu_time = time.perf_counter(), time.process_time()
+        cpu = round(100 * (cpu_time - last_cpu) / (wall - last_wall), 1)
+        last_wall, last_cpu = wall, cpu_time
         mem = process.memory_info().rss / (1024 * 1024)
         timestamp = time.time() - start_time
         stats_list.append((timestamp, cpu, mem))
-        time.sleep(interval)
+        if stopped:
+            break
 
 # BENCHMARKING: Save benchmark data to CSV
 
 
-def save_benchmark(protocol, connection_time, stats_list, signed_msg_size):
+def open_benchmark(protocol):
     timestamp = time.strftime("%Y%m%d-%H%M%S")
-    file_path = os.path.join(
-        BENCHMARK_DIR, f"{protocol}_dilithium_{timestamp}.csv")
-    throughput = signed_msg_size / (1024 * 1024) / connection_time
-
-    with open(file_path, mode='w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Time(s)", "CPU (%)", "Memory (MB)", "Connection Time(s)",
-                        "Signed Message Size (bytes)", "Throughput (MB/s)"])
-        for row in stats_list:
-            writer.writerow(
-                [*row, connection_time, signed_msg_size, throughput])
+    return BenchmarkWriter(BENCHMARK_DIR, f"{protocol}_dilithium_{timestamp}", BENCHMARK_FORMAT)
+
+
+def save_benchmark(protocol, connection_time, stats_list, signed_msg_size,
+                   correlation=None):
+    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
+    file_path = stats_list.close({
+        "Connection Time(s)": connection_time,
+        "Signed Message Size (bytes)": signed_msg_size,
+        "Throughput (MB/s)": throughput,
+    })
+    correlation = {"series_start_wall": stats_list.started_at, **(correlation or {})}
+    write_manifest(file_path, RUN_ID, "client", SCHEME, protocol,
+                   {"data_size": DATA_SIZE, "chunk_size": CHUNK_SIZE,
+                    "output_format": BENCHMARK_FORMAT},
+                   {"host": SERVER_HOST, "port": TCP_PORT if protocol == "tcp" else QUIC_PORT},
+                   correlation)
+    return file_path
 
 
 def start_tcp_client(verbose=False):
     generate_keys_if_missing(verbose)
     private_key = load_private_key()
     data = b"x" * DATA_SIZE
-    signature = ML_DSA_44.sign(private_key, data)
+    signature = ML_DSA.sign(private_key, data)
 
-    stats = []
-    running_flag = {"active": True}
+    stats = open_benchmark("tcp")
+    stop_sampling = threading.Event()
     monitor_thread = threading.Thread(
-        target=monitor_resources, args=(0.1, running_flag, stats))
+        target=monitor_resources, args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
     context = ssl.create_default_context()
@@ -99,9 +131,14 @@ def start_tcp_client(verbose=False):
 
     start_time = time.time()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect(("192.168.1.130", 4444))
-        with context.wrap_socket(s, server_hostname="192.168.1.130") as tls_sock:
+        s.connect((SERVER_HOST, TCP_PORT))
+        with context.wrap_socket(s, server_hostname=SERVER_HOST) as tls_sock:
+            handshake_end = time.time()
             log("Connected to TLS TCP server.", verbose)
+            correlation = tcp_client_handshake(
+                tls_sock, RUN_ID) if CORRELATE else None
+            correlation = tag_timings(correlation, "handshake", start_time, handshake_end)
+            send_start = time.time()
             tls_sock.send(len(signature).to_bytes(4, "big"))
             tls_sock.send(signature)
 
@@ -112,40 +149,51 @@ def start_tcp_client(verbose=False):
                 if sent == 0:
                     raise RuntimeError("Socket connection broken")
                 total_sent += sent
+            send_end = time.time()
 
             # Clean shutdown
             tls_sock.shutdown(socket.SHUT_WR)
             time.sleep(1)
 
     end_time = time.time()
-    running_flag["active"] = False
+    stop_sampling.set()
     monitor_thread.join()
 
     connection_time = end_time - start_time
-    save_benchmark("tcp", connection_time, stats, len(data) + len(signature))
+    save_benchmark("tcp", connection_time, stats, len(data) + len(signature),
+                   tag_timings(correlation, "client_send", send_start, send_end))
     log(f"✅ Sent {total_sent + len(signature)} bytes in {connection_time:.2f} seconds", verbose)
 
 
 async def start_quic_client(verbose=False):
+    from aioquic.asyncio import connect
+    from aioquic.quic.configuration import QuicConfiguration
     generate_keys_if_missing(verbose)
     private_key = load_private_key()
     data = b"x" * DATA_SIZE
-    signature = ML_DSA_44.sign(private_key, data)
+    signature = ML_DSA.sign(private_key, data)
 
     config = QuicConfiguration(is_client=True)
     config.load_cert_chain(certfile=TLS_CERT)
     config.verify_mode = ssl.CERT_NONE
 
-    stats = []
-    running_flag = {"active": True}
+    stats = open_benchmark("quic")
+    stop_sampling = threading.Event()
     monitor_thread = threading.Thread(
-        target=monitor_resources, args=(0.1, running_flag, stats))
+        target=monitor_resources, args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
     start_time = time.time()
     log("Connecting to QUIC server...", verbose)
-    async with connect("192.168.1.130", 4443, configuration=config) as conn:
-        stream_id = conn._quic.get_next_available_stream_id()
+    async with connect(SERVER_HOST, QUIC_PORT, configuration=config) as conn:
+        handshake_end = time.time()
+        if CORRELATE:
+            writer, correlation = await quic_client_handshake(conn, RUN_ID)
+            stream_id = writer.get_extra_info("stream_id")
+        else:
+            stream_id, correlation = conn._quic.get_next_available_stream_id(), None
+        correlation = tag_timings(correlation, "handshake", start_time, handshake_end)
+        send_start = time.time()
         conn._quic.send_stream_data(stream_id, len(signature).to_bytes(
             4, "big") + signature, end_stream=False)
 
@@ -156,15 +204,20 @@ async def start_quic_client(verbose=False):
                 stream_id, data[total_sent:end], end_stream=False)
             total_sent += end - total_sent
 
-        conn._quic.send_stream_data(stream_id, b"", end_stream=True)
+        if CORRELATE:
+            writer.write_eof()  # also stops the writer sending a second FIN when collected
+        else:
+            conn._quic.send_stream_data(stream_id, b"", end_stream=True)
+        send_end = time.time()
         await conn.wait_closed()
 
     end_time = time.time()
-    running_flag["active"] = False
+    stop_sampling.set()
     monitor_thread.join()
 
     connection_time = end_time - start_time
-    save_benchmark("quic", connection_time, stats, len(data) + len(signature))
+    save_benchmark("quic", connection_time, stats, len(data) + len(signature),
+                   tag_timings(correlation, "client_send", send_start, send_end))
     log(f"✅ Sent {total_sent + len(signature)} bytes in {connection_time:.2f} seconds", verbose)
 
 
@@ -172,6 +225,7 @@ def run_client(protocol='tcp', verbose=False):
     if protocol == 'tcp':
         start_tcp_client(verbose)
     elif protocol == 'quic':
+        import asyncio  # the QUIC stack loads only when QUIC is selected
         asyncio.run(start_quic_client(verbose))
 
 
@@ -179,5 +233,39 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--protocol", choices=["tcp", "quic"], required=True)
     parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--output-format", choices=FORMATS, default=BENCHMARK_FORMAT,
+                        help="legacy wide CSV, or streamed series + summary tables as csv/npz/parquet")
+    parser.add_argument("--run-id", help="Shared ID linking client and server outputs")
+    parser.add_argument("--host", default=SERVER_HOST, help="Server address")
+    parser.add_argument("--port", type=int,
+                        help=f"Port for the chosen protocol (default {TCP_PORT} tcp, {QUIC_PORT} quic)")
+    parser.add_argument("--output-dir", default=BENCHMARK_DIR,
+                        help="Directory for benchmark outputs")
+    parser.add_argument("--size", type=int, default=DATA_SIZE, help="Payload size in bytes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Bytes per send/recv call")
+    parser.add_argument("--level", type=int, choices=sorted(ML_DSA_LEVELS), default=ML_DSA_LEVEL,
+                        help="ML-DSA parameter set")
+    parser.add_argument("--correlate", action="store_true",
+                        help="Send the run ID and clocks to the server before the payload")
+    parser.add_argument("--cpus", help="Pin the process to these CPUs, e.g. 2 or 2-3")
+    parser.add_argument("--sampler-cpus", help="Pin the psutil sampler thread to these CPUs")
+    parser.add_argument("--nice", type=int, help="Process niceness (negative needs privileges)")
     args = parser.parse_args()
+    configure_noise(args.cpus, args.sampler_cpus, args.nice)
+    BENCHMARK_FORMAT = args.output_format
+    RUN_ID = args.run_id or new_run_id()
+    SERVER_HOST = args.host
+    if args.port:
+        TCP_PORT = QUIC_PORT = args.port
+    BENCHMARK_DIR = args.output_dir
+    DATA_SIZE = args.size
+    CHUNK_SIZE = args.chunk_size
+    if args.level != ML_DSA_LEVEL:
+        ML_DSA_LEVEL = args.level
+        ML_DSA = ML_DSA_LEVELS[ML_DSA_LEVEL]
+        SCHEME = f"ML-DSA-{ML_DSA_LEVEL}"
+        PRIVATE_KEY_PATH = f"client_keys/dilithium{ML_DSA_LEVEL}_private.key"
+        PUBLIC_KEY_PATH = f"client_keys/dilithium{ML_DSA_LEVEL}_public.key"
+    CORRELATE = args.correlate
     run_client(args.protocol, args.verbose)
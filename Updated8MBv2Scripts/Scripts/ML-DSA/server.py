@@ -1,20 +1,33 @@
 import ssl
 import socket
-import asyncio
 import argparse
 import time
 import os
-import csv
+import sys
 import threading
 import psutil  # Benchmarking
-from dilithium_py.ml_dsa import ML_DSA_44
-from aioquic.asyncio import serve
-from aioquic.asyncio.protocol import QuicConnectionProtocol
-from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import StreamDataReceived, HandshakeCompleted
+from dilithium_py.ml_dsa import ML_DSA_44, ML_DSA_65, ML_DSA_87
+
+TOOLS_DIR = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "..", "..", "..", "BenchmarkTools")
+sys.path.insert(0, os.path.normpath(TOOLS_DIR))
+from alloc_trace import AllocationTracer  # noqa: E402
+from cpu_account import CpuAccountant  # noqa: E402
+from bench_writer import FORMATS, BenchmarkWriter  # noqa: E402
+from run_manifest import new_run_id, write_manifest  # noqa: E402
+from noise_control import configure as configure_noise, pin_sampler  # noqa: E402
+from correlation import (  # noqa: E402
+    server_echo, server_received_clocks, split_message, tag_timings, tcp_server_handshake)
 
 DATA_SIZE = 8 * 1024 * 1024  # 5MB
 CHUNK_SIZE = 4096
+ML_DSA_LEVELS = {44: ML_DSA_44, 65: ML_DSA_65, 87: ML_DSA_87}
+ML_DSA_LEVEL = 44
+ML_DSA = ML_DSA_LEVELS[ML_DSA_LEVEL]
+SCHEME = f"ML-DSA-{ML_DSA_LEVEL}"
+BIND_HOST = "0.0.0.0"
+TCP_PORT = 4444
+QUIC_PORT = 4443
 TLS_CERT = "server.crt"
 TLS_KEY = "server.key"
 PUBLIC_KEY_PATH = "client_keys/dilithium_public.key"
@@ -22,6 +35,13 @@ PUBLIC_KEY_PATH = "client_keys/dilithium_public.key"
 # Benchmarking directory
 BENCHMARK_DIR = "server_benchmarks"
 os.makedirs(BENCHMARK_DIR, exist_ok=True)
+BENCHMARK_FORMAT = "legacy"
+RUN_ID = None
+VERIFY_POOL = None  # ThreadPoolExecutor when --verify-workers is set
+TCP_CONNECTIONS = 1  # connections served before the TCP server exits, 0 = until stopped
+LISTEN_BACKLOG = 128
+OPENED_STEMS = set()
+KEY_CACHE = {}  # path -> ((mtime, size), key bytes)
 
 
 def log(msg, verbose=True):
@@ -30,164 +50,350 @@ def log(msg, verbose=True):
 
 
 def load_public_key():
+    """Read again only when the file has changed, e.g. a level the client just generated."""
     if not os.path.exists(PUBLIC_KEY_PATH):
         raise FileNotFoundError("Missing client public key.")
-    with open(PUBLIC_KEY_PATH, "rb") as f:
-        return f.read()
-
-
-def monitor_resources(interval, running_flag, stats_list):
+    stat = os.stat(PUBLIC_KEY_PATH)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = KEY_CACHE.get(PUBLIC_KEY_PATH)
+    if cached is None or cached[0] != version:
+        with open(PUBLIC_KEY_PATH, "rb") as f:
+            cached = KEY_CACHE[PUBLIC_KEY_PATH] = (version, f.read())
+    return cached[1]
+
+
+def verify_signature(public_key, data, signature):
+    if not ML_DSA.verify(public_key, data, signature):
+        raise ValueError("signature does not match the data")
+
+
+def check_signature(cpu, tracer, public_key, data, signature, done):
+    """Verify inline, or on VERIFY_POOL so the next connection is not held up.
+
+    done(error) is called when the verification has finished, with None if it passed.
+    """
+    if VERIFY_POOL is not None:
+        future = cpu.submit_verify(VERIFY_POOL, verify_signature, public_key, data, signature)
+        future.add_done_callback(lambda f: done(f.exception()))
+        return
+    try:
+        with tracer.phase("verify"):
+            cpu.verify(verify_signature, public_key, data, signature)
+    except Exception as e:
+        done(e)
+    else:
+        done(None)
+
+
+def monitor_resources(interval, stop, stats_list):
+    pin_sampler()
     process = psutil.Process()
     start_time = time.time()
-    while running_flag["active"]:
-        cpu = process.cpu_percent(interval=None)
+    # CPU from the process clock: psutil's cpu_percent counts 10 ms ticks and its first
+    # reading is always 0.0, so a short transfer would read 0 %
+    last_wall, last_cpu = time.perf_counter(), time.process_time()
+    while True:
+        # Sampled at the end of each interval, and once more when stopped, so even a
+        # transfer shorter than one interval gets a reading that covers it
+        stopped = stop.wait(interval)
+        wall, cpu_time = time.perf_counter(), time.process_time()
+        cpu = round(100 * (cpu_time - last_cpu) / (wall - last_wall), 1)
+        last_wall, last_cpu = wall, cpu_time
         mem = process.memory_info().rss / (1024 * 1024)
         timestamp = time.time() - start_time
         stats_list.append((timestamp, cpu, mem))
-        time.sleep(interval)
-
-
-def save_benchmark(protocol, connection_time, stats_list, signed_msg_size):
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    file_path = os.path.join(BENCHMARK_DIR, f"{protocol}_{timestamp}.csv")
-    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
+        if stopped:
+            break
 
-    with open(file_path, mode='w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Time(s)", "CPU (%)", "Memory (MB)", "Connection Time(s)",
-                        "Signed Message Size (bytes)", "Throughput (MB/s)"])
-        for row in stats_list:
-            writer.writerow(
-                [*row, connection_time, signed_msg_size, throughput])
 
+def open_benchmark(protocol):
+    stem = base = f"{protocol}_{time.strftime('%Y%m%d-%H%M%S')}"
+    # Several connections can start within a second (--connections, QUIC); keep them apart
+    while stem in OPENED_STEMS:
+        stem = f"{base}_{len([s for s in OPENED_STEMS if s.startswith(base)]) + 1}"
+    OPENED_STEMS.add(stem)
+    return BenchmarkWriter(BENCHMARK_DIR, stem, BENCHMARK_FORMAT)
 
-def start_tcp_server(verbose=False):
-    public_key = load_public_key()
 
-    stats = []
-    running_flag = {"active": True}
+def save_benchmark(protocol, connection_time, stats_list, signed_msg_size, peer_host=None,
+                   correlation=None):
+    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
+    file_path = stats_list.close({
+        "Connection Time(s)": connection_time,
+        "Signed Message Size (bytes)": signed_msg_size,
+        "Throughput (MB/s)": throughput,
+    })
+    correlation = {"series_start_wall": stats_list.started_at, **(correlation or {})}
+    write_manifest(file_path, correlation.get("run_id", RUN_ID), "server", SCHEME, protocol,
+                   {"data_size": DATA_SIZE, "chunk_size": CHUNK_SIZE,
+                    "output_format": BENCHMARK_FORMAT},
+                   {"host": peer_host, "port": TCP_PORT if protocol == "tcp" else QUIC_PORT},
+                   correlation)
+    return file_path
+
+
+def serve_tcp_connection(s, context, verbose=False, trace_alloc=False):
+    tracer = AllocationTracer(trace_alloc)
+    cpu = CpuAccountant()
+
+    # Read while waiting for the client, so the connection's window only checks the file
+    if os.path.exists(PUBLIC_KEY_PATH):
+        with tracer.phase("key_load"), cpu.phase("key_load"):
+            load_public_key()
+    conn, addr = s.accept()
+    # Sampled from the accept, so the wait for the next client is not in the series
+    stats = open_benchmark("tcp")
+    stop_sampling = threading.Event()
     monitor_thread = threading.Thread(
-        target=monitor_resources, args=(0.1, running_flag, stats))
+        target=monitor_resources, args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
-    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    # context.load_cert_chain(certfile="server.pem", keyfile="server_key.pem")
-    context.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
-
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("0.0.0.0", 4444))
-        s.listen(1)
-        log("TCP TLS server listening on port 4444", verbose)
-        conn, addr = s.accept()
-        with context.wrap_socket(conn, server_side=True) as tls_conn:
-            log(f"Accepted TLS connection from {addr}", verbose)
-            sig_len = int.from_bytes(tls_conn.recv(4), "big")
+    with context.wrap_socket(conn, server_side=True) as tls_conn:
+        log(f"Accepted TLS connection from {addr}", verbose)
+        # Checked per connection, like the QUIC server, so a parameter set
+        # the client has just generated is picked up
+        with tracer.phase("key_load"), cpu.phase("key_load"):
+            public_key = load_public_key()
+        with cpu.phase("receive"):
+            correlation, pending = tcp_server_handshake(tls_conn)
+            sig_len = int.from_bytes(pending or tls_conn.recv(4), "big")
             signature = tls_conn.recv(sig_len)
 
-            received = b""
+            received = bytearray()
+            tracer.begin("receive")  # its snapshot is not in the timed window
             start_time = time.time()
-            while len(received) < DATA_SIZE:
+            while not DATA_SIZE or len(received) < DATA_SIZE:  # --size 0: read to EOF
                 chunk = tls_conn.recv(CHUNK_SIZE)
                 if not chunk:
                     break
                 received += chunk
-            end_time = time.time()
-            running_flag["active"] = False
-            monitor_thread.join()
-
-            connection_time = end_time - start_time
-            total_size = len(received) + len(signature) + 4
-            save_benchmark("tcp", connection_time, stats, total_size)
+            tracer.end("receive")
+        end_time = time.time()
+        stop_sampling.set()
+        monitor_thread.join()
+
+        connection_time = end_time - start_time
+        total_size = len(received) + len(signature) + 4
+        file_path = save_benchmark(
+            "tcp", connection_time, stats, total_size, addr[0],
+            tag_timings(correlation, "server_receive", start_time, end_time))
+
+        def verified(error):
+            if error is None:
+                log(f"✅ Signature verified. Received {len(received)} bytes "
+                    f"in {connection_time:.2f}s", verbose)
+            else:
+                cpu.reject()
+                log(f"❌ Signature verification failed: {error}", verbose)
+            tracer.save(file_path)
+            cpu.payload_bytes = total_size
+            cpu.save(file_path)
+
+        check_signature(cpu, tracer, public_key, received, signature, verified)
+
+
+def start_tcp_server(verbose=False, trace_alloc=False):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    # context.load_cert_chain(certfile="server.pem", keyfile="server_key.pem")
+    context.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
 
-            try:
-                ML_DSA_44.verify(public_key, signature, received)
-                log(
-                    f"✅ Signature verified. Received {len(received)} bytes in {connection_time:.2f}s", verbose)
-            except Exception as e:
-                log(f"❌ Signature verification failed: {e}", verbose)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((BIND_HOST, TCP_PORT))
+        s.listen(1 if TCP_CONNECTIONS == 1 else LISTEN_BACKLOG)
+        log(f"TCP TLS server listening on port {TCP_PORT}", verbose)
+        served = 0
+        while not TCP_CONNECTIONS or served < TCP_CONNECTIONS:
+            serve_tcp_connection(s, context, verbose, trace_alloc)
+            served += 1
 
 
 # ----------- QUIC ------------
 
 
-class MyQuicProtocol(QuicConnectionProtocol):
-    def __init__(self, *args, verbose=False, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.verbose = verbose
-        self.public_key = load_public_key()
-        self.sig_len = None
-        self.signature = b""
-        self.received = b""
-        self.start_time = None
-
-        # Benchmarking
-        self.stats = []
-        self.running_flag = {"active": True}
-        self.monitor_thread = threading.Thread(
-            target=monitor_resources, args=(0.1, self.running_flag, self.stats))
-        self.monitor_thread.start()
-        self.handshake_start_time = time.time()
-
-    def log(self, msg):
-        if self.verbose:
-            print(f"[SERVER-QUIC] {msg}")
-
-    def quic_event_received(self, event):
-        if isinstance(event, HandshakeCompleted):
-            self.log("✅ TLS handshake completed.")
-        elif isinstance(event, StreamDataReceived):
-            if self.start_time is None:
-                self.start_time = time.time()
-            self.received += event.data
-
-            if self.sig_len is None and len(self.received) >= 4:
-                self.sig_len = int.from_bytes(self.received[:4], "big")
-                self.received = self.received[4:]
-                self.log(f"Signature length: {self.sig_len} bytes")
-
-            if self.sig_len is not None and len(self.signature) < self.sig_len:
-                needed = self.sig_len - len(self.signature)
-                self.signature += self.received[:needed]
-                self.received = self.received[needed:]
-
-            if self.sig_len is not None and len(self.received) >= DATA_SIZE:
-                end_time = time.time()
-                self.running_flag["active"] = False
+def quic_protocol_class():
+    """Defined on first use, so the TCP path never imports aioquic."""
+    from aioquic.asyncio.protocol import QuicConnectionProtocol
+    from aioquic.quic.events import ConnectionTerminated, HandshakeCompleted, StreamDataReceived
+
+    class MyQuicProtocol(QuicConnectionProtocol):
+        def __init__(self, *args, verbose=False, trace_alloc=False, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.verbose = verbose
+            self.tracer = AllocationTracer(trace_alloc)
+            self.cpu = CpuAccountant()
+            with self.tracer.phase("key_load"), self.cpu.phase("key_load"):
+                self.public_key = load_public_key()
+            self.sig_len = None
+            self.signature = b""
+            self.received = bytearray()
+            self.start_time = None
+            self.header_checked = False
+            self.correlation = None
+
+            # Benchmarking
+            self.stats = open_benchmark("quic")
+            self.stop_sampling = threading.Event()
+            self.monitor_thread = threading.Thread(
+                target=monitor_resources, args=(0.1, self.stop_sampling, self.stats))
+            self.monitor_thread.start()
+            self.handshake_start_time = time.time()
+
+        def log(self, msg):
+            if self.verbose:
+                print(f"[SERVER-QUIC] {msg}")
+
+        def datagram_received(self, data, addr):
+            # Decryption, reassembly and our event handling for this connection only
+            with self.cpu.phase("receive"):
+                super().datagram_received(data, addr)
+
+        def peer_host(self):
+            paths = getattr(self._quic, "_network_paths", None)
+            return paths[0].addr[0] if paths else None
+
+        def quic_event_received(self, event):
+            if isinstance(event, HandshakeCompleted):
+                self.log("✅ TLS handshake completed.")
+            elif isinstance(event, StreamDataReceived):
+                if self.start_time is None:
+                    self.tracer.begin("receive")
+                    self.start_time = time.time()
+                self.received += event.data
+
+                if not self.header_checked:
+                    received_clocks = server_received_clocks()
+                    hello, rest = split_message(self.received)
+                    if rest is None:
+                        return
+                    self.header_checked = True
+                    self.received = rest
+                    if hello is not None:
+                        self.correlation, payload = server_echo(
+                            hello, received_clocks)
+                        self._quic.send_stream_data(event.stream_id, payload)
+                        self.transmit()
+
+                if self.sig_len is None and len(self.received) >= 4:
+                    self.sig_len = int.from_bytes(self.received[:4], "big")
+                    self.received = self.received[4:]
+                    self.log(f"Signature length: {self.sig_len} bytes")
+
+                if self.sig_len is not None and len(self.signature) < self.sig_len:
+                    needed = self.sig_len - len(self.signature)
+                    self.signature += self.received[:needed]
+                    self.received = self.received[needed:]
+
+                # --size 0 accepts any payload and ends at the stream FIN
+                complete = len(self.received) >= DATA_SIZE if DATA_SIZE else event.end_stream
+                if self.sig_len is not None and complete:
+                    self.tracer.end("receive")
+                    end_time = time.time()
+                    self.stop_sampling.set()
+                    self.monitor_thread.join()
+
+                    connection_time = end_time - self.handshake_start_time
+                    total_size = len(self.received) + len(self.signature) + 4
+                    file_path = save_benchmark(
+                        "quic", connection_time, self.stats, total_size, self.peer_host(),
+                        tag_timings(self.correlation, "server_receive", self.start_time, end_time))
+
+                    received = self.received
+
+                    def verified(error):
+                        if error is None:
+                            self.log(f"✅ QUIC: Signature verified. Received {len(received)} "
+                                     f"bytes in {connection_time:.2f}s")
+                        else:
+                            self.cpu.reject()
+                            self.log(f"❌ QUIC: Signature verification failed: {error}")
+                        self.tracer.save(file_path)
+                        self.cpu.payload_bytes = total_size
+                        self.cpu.save(file_path)
+
+                    check_signature(self.cpu, self.tracer, self.public_key, received,
+                                    self.signature, verified)
+                    self._quic.close()
+            elif isinstance(event, ConnectionTerminated) and not self.stop_sampling.is_set():
+                # Dropped before the message completed: without this the sampler
+                # thread of every abandoned connection runs for the life of the server
+                self.stop_sampling.set()
                 self.monitor_thread.join()
+                self.stats.discard()
+                self.log(f"Connection closed before the message completed "
+                         f"({len(self.received)} bytes received)")
 
-                connection_time = end_time - self.handshake_start_time
-                total_size = len(self.received) + len(self.signature) + 4
-                save_benchmark("quic", connection_time, self.stats, total_size)
-
-                try:
-                    ML_DSA_44.verify(
-                        self.public_key, self.signature, self.received)
-                    self.log(
-                        f"✅ QUIC: Signature verified. Received {len(self.received)} bytes in {connection_time:.2f}s")
-                except Exception as e:
-                    self.log(f"❌ QUIC: Signature verification failed: {e}")
-                self._quic.close()
+    return MyQuicProtocol
 
 
-async def start_quic_server(verbose=False):
+async def start_quic_server(verbose=False, trace_alloc=False):
+    import asyncio
+    from aioquic.asyncio import serve
+    from aioquic.quic.configuration import QuicConfiguration
+    protocol = quic_protocol_class()
     config = QuicConfiguration(is_client=False)
     config.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
     log("QUIC server starting with TLS...", verbose)
-    await serve("0.0.0.0", 4443, configuration=config,
-                create_protocol=lambda *args, **kwargs: MyQuicProtocol(*args, verbose=verbose, **kwargs))
+    await serve(BIND_HOST, QUIC_PORT, configuration=config,
+                create_protocol=lambda *args, **kwargs: protocol(*args, verbose=verbose, trace_alloc=trace_alloc, **kwargs))
     await asyncio.Event().wait()
 
 
-def run_server(protocol='tcp', verbose=False):
+def run_server(protocol='tcp', verbose=False, trace_alloc=False):
     if protocol == 'tcp':
-        start_tcp_server(verbose)
+        start_tcp_server(verbose, trace_alloc)
+        if VERIFY_POOL is not None:
+            VERIFY_POOL.shutdown()  # the last connections' sidecars are written on completion
     elif protocol == 'quic':
-        asyncio.run(start_quic_server(verbose))
+        import asyncio  # the QUIC stack loads only when QUIC is selected
+        asyncio.run(start_quic_server(verbose, trace_alloc))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--protocol", choices=["tcp", "quic"], required=True)
     parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="Write per-phase tracemalloc accounting next to the benchmark CSV")
+    parser.add_argument("--output-format", choices=FORMATS, default=BENCHMARK_FORMAT,
+                        help="legacy wide CSV, or streamed series + summary tables as csv/npz/parquet")
+    parser.add_argument("--run-id", help="Shared ID linking client and server outputs")
+    parser.add_argument("--host", default=BIND_HOST, help="Address to bind")
+    parser.add_argument("--port", type=int,
+                        help=f"Port for the chosen protocol (default {TCP_PORT} tcp, {QUIC_PORT} quic)")
+    parser.add_argument("--output-dir", default=BENCHMARK_DIR,
+                        help="Directory for benchmark outputs")
+    parser.add_argument("--size", type=int, default=DATA_SIZE,
+                        help="Payload size in bytes (0 = any size, read to end of stream)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Bytes per send/recv call")
+    parser.add_argument("--level", type=int, choices=sorted(ML_DSA_LEVELS), default=ML_DSA_LEVEL,
+                        help="ML-DSA parameter set")
+    parser.add_argument("--verify-workers", type=int, default=0,
+                        help="Verify signatures on a pool of this many threads while the "
+                             "next connection is served (0 = inline)")
+    parser.add_argument("--connections", type=int, default=TCP_CONNECTIONS,
+                        help="TCP connections to serve before exiting (0 = until stopped); "
+                             "the QUIC server always runs until stopped")
+    parser.add_argument("--cpus", help="Pin the process to these CPUs, e.g. 2 or 2-3")
+    parser.add_argument("--sampler-cpus", help="Pin the psutil sampler thread to these CPUs")
+    parser.add_argument("--nice", type=int, help="Process niceness (negative needs privileges)")
     args = parser.parse_args()
-    run_server(args.protocol, args.verbose)
+    configure_noise(args.cpus, args.sampler_cpus, args.nice)
+    if args.verify_workers > 0:
+        from concurrent.futures import ThreadPoolExecutor
+        VERIFY_POOL = ThreadPoolExecutor(args.verify_workers, thread_name_prefix="verify")
+    BENCHMARK_FORMAT = args.output_format
+    RUN_ID = args.run_id or new_run_id()
+    BIND_HOST = args.host
+    if args.port:
+        TCP_PORT = QUIC_PORT = args.port
+    BENCHMARK_DIR = args.output_dir
+    DATA_SIZE = args.size
+    TCP_CONNECTIONS = args.connections
+    CHUNK_SIZE = args.chunk_size
+    if args.level != ML_DSA_LEVEL:
+        ML_DSA_LEVEL = args.level
+        ML_DSA = ML_DSA_LEVELS[ML_DSA_LEVEL]
+        SCHEME = f"ML-DSA-{ML_DSA_LEVEL}"
+        PUBLIC_KEY_PATH = f"client_keys/dilithium{ML_DSA_LEVEL}_public.key"
+    run_server(args.protocol, args.verbose, args.trace_alloc)
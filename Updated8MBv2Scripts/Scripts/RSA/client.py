@@ -1,21 +1,31 @@
 import socket
-import asyncio
 import argparse
 import time
 from pathlib import Path
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
-from aioquic.asyncio import connect
-from aioquic.quic.configuration import QuicConfiguration
 import ssl
 import os
-import csv
+import sys
 import threading
 import psutil  # For benchmarking
 
+TOOLS_DIR = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "..", "..", "..", "BenchmarkTools")
+sys.path.insert(0, os.path.normpath(TOOLS_DIR))
+from bench_writer import FORMATS, BenchmarkWriter  # noqa: E402
+from run_manifest import new_run_id, write_manifest  # noqa: E402
+from noise_control import configure as configure_noise, pin_sampler  # noqa: E402
+from correlation import quic_client_handshake, tag_timings, tcp_client_handshake  # noqa: E402
+
 DATA_SIZE = 8 * 1024 * 1024
 CHUNK_SIZE = 4096
+KEY_BITS = 2048
+SCHEME = f"RSA-{KEY_BITS}"
+SERVER_HOST = "192.168.1.130"
+TCP_PORT = 4444
+QUIC_PORT = 4443
 TLS_CERT = "server.crt"
 TLS_CERT_PEM = "server.pem"
 PRIVATE_KEY_FILE = "client_private.pem"
@@ -24,6 +34,9 @@ PUBLIC_KEY_FILE = "client_public.pem"
 # BENCHMARKING
 BENCHMARK_DIR = "client_benchmarks"
 os.makedirs(BENCHMARK_DIR, exist_ok=True)
+BENCHMARK_FORMAT = "legacy"
+RUN_ID = None
+CORRELATE = False
 
 
 def log(msg, verbose=True):
@@ -38,7 +51,7 @@ def load_or_generate_keys():
         private_key = RSA.import_key(Path(PRIVATE_KEY_FILE).read_bytes())
         return private_key, private_key.publickey()
 
-    private_key = RSA.generate(2048)
+    private_key = RSA.generate(KEY_BITS)
     Path(PRIVATE_KEY_FILE).write_bytes(private_key.export_key())
     Path(PUBLIC_KEY_FILE).write_bytes(private_key.publickey().export_key())
     return private_key, private_key.publickey()
@@ -52,34 +65,53 @@ def sign_data(private_key, data):
 # BENCHMARKING: Resource monitoring function
 
 
-def monitor_resources(interval, running_flag, stats_list):
+def monitor_resources(interval, stop, stats_list):
     """Monitor CPU and memory usage during the benchmark."""
+    pin_sampler()
     process = psutil.Process()
     start_time = time.time()
-
-    while running_flag["active"]:
-        cpu = process.cpu_percent(interval=None)
+    # CPU from the process clock: psutil's cpu_percent counts 10 ms ticks and its first
+    # reading is always 0.0, so a short transfer would read 0 %
+    last_wall, last_cpu = time.perf_counter(), time.process_time()
+
+    while True:
+        # Sampled at the end of each interval, and once more when stopped, so even a
+        # transfer shorter than one interval gets a reading that covers it
+        stopped = stop.wait(interval)
+        wall, cpu_time = time.perf_counter(), time.process_time()
+        cpu = round(100 * (cpu_time - last_cpu) / (wall - last_wall), 1)
+        last_wall, last_cpu = wall, cpu_time
         mem = process.memory_info().rss / (1024 * 1024)  # in MB
         timestamp = time.time() - start_time
         stats_list.append((timestamp, cpu, mem))
-        time.sleep(interval)
+        if stopped:
+            break
 
 # BENCHMARKING: Save benchmark data to CSV
 
 
-def save_benchmark(protocol, connection_time, stats_list, signed_msg_size):
-    """Save the benchmarking results to a CSV file."""
+def open_benchmark(protocol):
+    """Open a streaming benchmark writer for this run."""
     timestamp = time.strftime("%Y%m%d-%H%M%S")
-    file_path = os.path.join(BENCHMARK_DIR, f"{protocol}_{timestamp}.csv")
-    throughput = signed_msg_size / (1024 * 1024) / connection_time  # in MB/s
-
-    with open(file_path, mode='w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Time(s)", "CPU (%)", "Memory (MB)", "Connection Time(s)",
-                        "Signed Message Size (bytes)", "Throughput (MB/s)"])
-        for row in stats_list:
-            writer.writerow(
-                [*row, connection_time, signed_msg_size, throughput])
+    return BenchmarkWriter(BENCHMARK_DIR, f"{protocol}_{timestamp}", BENCHMARK_FORMAT)
+
+
+def save_benchmark(protocol, connection_time, stats_list, signed_msg_size,
+                   correlation=None):
+    """Write the per-connection summary and close the benchmark writer."""
+    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
+    file_path = stats_list.close({
+        "Connection Time(s)": connection_time,
+        "Signed Message Size (bytes)": signed_msg_size,
+        "Throughput (MB/s)": throughput,
+    })
+    correlation = {"series_start_wall": stats_list.started_at, **(correlation or {})}
+    write_manifest(file_path, RUN_ID, "client", SCHEME, protocol,
+                   {"data_size": DATA_SIZE, "chunk_size": CHUNK_SIZE,
+                    "output_format": BENCHMARK_FORMAT},
+                   {"host": SERVER_HOST, "port": TCP_PORT if protocol == "tcp" else QUIC_PORT},
+                   correlation)
+    return file_path
 
 
 def start_tcp_client(verbose=False):
@@ -89,10 +121,10 @@ def start_tcp_client(verbose=False):
     signature = sign_data(private_key, data)
     full_data = data + signature
 
-    stats = []  # BENCHMARKING
-    running_flag = {"active": True}
+    stats = open_benchmark("tcp")  # BENCHMARKING
+    stop_sampling = threading.Event()
     monitor_thread = threading.Thread(
-        target=monitor_resources, args=(0.1, running_flag, stats))
+        target=monitor_resources, args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
     context = ssl.create_default_context()
@@ -103,12 +135,17 @@ def start_tcp_client(verbose=False):
 
     start_time = time.time()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect(("192.168.1.130", 4444))
-        with context.wrap_socket(s, server_hostname="192.168.1.130") as ssl_sock:
+        s.connect((SERVER_HOST, TCP_PORT))
+        with context.wrap_socket(s, server_hostname=SERVER_HOST) as ssl_sock:
+            handshake_end = time.time()
             log("Connected to TCP TLS server", verbose)
             log(
                 f"SSL handshake completed. Status: {ssl_sock.getpeercert()}", verbose)
+            correlation = tcp_client_handshake(
+                ssl_sock, RUN_ID) if CORRELATE else None
+            correlation = tag_timings(correlation, "handshake", start_time, handshake_end)
 
+            send_start = time.time()
             total_sent = 0
             while total_sent < len(full_data):
                 end = min(total_sent + CHUNK_SIZE, len(full_data))
@@ -116,6 +153,7 @@ def start_tcp_client(verbose=False):
                 if sent == 0:
                     raise RuntimeError("Socket connection broken")
                 total_sent += sent
+            send_end = time.time()
 
             ssl_sock.shutdown(socket.SHUT_WR)  # Properly signal no more data
             # Wait until server closes or acknowledges (optional but safer)
@@ -123,16 +161,19 @@ def start_tcp_client(verbose=False):
             time.sleep(1)     # Give a little time if needed
 
             end_time = time.time()
-            running_flag["active"] = False
+            stop_sampling.set()
             monitor_thread.join()
 
             connection_time = end_time - start_time
-            save_benchmark("tcp", connection_time, stats, len(full_data))
+            save_benchmark("tcp", connection_time, stats, len(full_data),
+                           tag_timings(correlation, "client_send", send_start, send_end))
             log(f"✅ Sent {total_sent} bytes in {connection_time:.2f} seconds", verbose)
 
 
 async def start_quic_client(verbose=False):
     """Start the QUIC client."""
+    from aioquic.asyncio import connect
+    from aioquic.quic.configuration import QuicConfiguration
     private_key, _ = load_or_generate_keys()
     data = b"x" * DATA_SIZE
     signature = sign_data(private_key, data)
@@ -145,15 +186,22 @@ async def start_quic_client(verbose=False):
     configuration.load_cert_chain(certfile=TLS_CERT)
     configuration.load_verify_locations(cafile=TLS_CERT)
 
-    stats = []  # BENCHMARKING
-    running_flag = {"active": True}
+    stats = open_benchmark("quic")  # BENCHMARKING
+    stop_sampling = threading.Event()
     monitor_thread = threading.Thread(
-        target=monitor_resources, args=(0.1, running_flag, stats))
+        target=monitor_resources, args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
     start_time = time.time()
-    async with connect("192.168.1.130", 4443, configuration=configuration) as connection:
-        stream_id = connection._quic.get_next_available_stream_id()
+    async with connect(SERVER_HOST, QUIC_PORT, configuration=configuration) as connection:
+        handshake_end = time.time()
+        if CORRELATE:
+            writer, correlation = await quic_client_handshake(connection, RUN_ID)
+            stream_id = writer.get_extra_info("stream_id")
+        else:
+            stream_id, correlation = connection._quic.get_next_available_stream_id(), None
+        correlation = tag_timings(correlation, "handshake", start_time, handshake_end)
+        send_start = time.time()
         total_sent = 0
 
         while total_sent < len(full_data):
@@ -162,15 +210,20 @@ async def start_quic_client(verbose=False):
                 stream_id, full_data[total_sent:end], end_stream=False)
             total_sent += end - total_sent
 
-        connection._quic.send_stream_data(stream_id, b"", end_stream=True)
+        if CORRELATE:
+            writer.write_eof()  # also stops the writer sending a second FIN when collected
+        else:
+            connection._quic.send_stream_data(stream_id, b"", end_stream=True)
+        send_end = time.time()
         await connection.wait_closed()
 
     end_time = time.time()
-    running_flag["active"] = False
+    stop_sampling.set()
     monitor_thread.join()
 
     connection_time = end_time - start_time
-    save_benchmark("quic", connection_time, stats, len(full_data))
+    save_benchmark("quic", connection_time, stats, len(full_data),
+                   tag_timings(correlation, "client_send", send_start, send_end))
     log(f"✅ Sent {total_sent} bytes in {connection_time:.2f} seconds", verbose)
 
 
@@ -179,6 +232,7 @@ def run_client(protocol='tcp', verbose=False):
     if protocol == 'tcp':
         start_tcp_client(verbose)
     elif protocol == 'quic':
+        import asyncio  # the QUIC stack loads only when QUIC is selected
         asyncio.run(start_quic_client(verbose))
 
 
@@ -187,5 +241,37 @@ if __name__ == "__main__":
     parser.add_argument("--protocol", choices=["tcp", "quic"], required=True)
     parser.add_argument("--verbose", action="store_true",
                         help="Enable verbose logging")
+    parser.add_argument("--output-format", choices=FORMATS, default=BENCHMARK_FORMAT,
+                        help="legacy wide CSV, or streamed series + summary tables as csv/npz/parquet")
+    parser.add_argument("--run-id", help="Shared ID linking client and server outputs")
+    parser.add_argument("--host", default=SERVER_HOST, help="Server address")
+    parser.add_argument("--port", type=int,
+                        help=f"Port for the chosen protocol (default {TCP_PORT} tcp, {QUIC_PORT} quic)")
+    parser.add_argument("--output-dir", default=BENCHMARK_DIR,
+                        help="Directory for benchmark outputs")
+    parser.add_argument("--size", type=int, default=DATA_SIZE, help="Payload size in bytes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Bytes per send/recv call")
+    parser.add_argument("--key-bits", type=int, choices=[2048, 3072, 4096], default=KEY_BITS)
+    parser.add_argument("--correlate", action="store_true",
+                        help="Send the run ID and clocks to the server before the payload")
+    parser.add_argument("--cpus", help="Pin the process to these CPUs, e.g. 2 or 2-3")
+    parser.add_argument("--sampler-cpus", help="Pin the psutil sampler thread to these CPUs")
+    parser.add_argument("--nice", type=int, help="Process niceness (negative needs privileges)")
     args = parser.parse_args()
+    configure_noise(args.cpus, args.sampler_cpus, args.nice)
+    BENCHMARK_FORMAT = args.output_format
+    RUN_ID = args.run_id or new_run_id()
+    SERVER_HOST = args.host
+    if args.port:
+        TCP_PORT = QUIC_PORT = args.port
+    BENCHMARK_DIR = args.output_dir
+    DATA_SIZE = args.size
+    CHUNK_SIZE = args.chunk_size
+    if args.key_bits != KEY_BITS:
+        KEY_BITS = args.key_bits
+        SCHEME = f"RSA-{KEY_BITS}"
+        PRIVATE_KEY_FILE = f"client_private_{KEY_BITS}.pem"
+        PUBLIC_KEY_FILE = f"client_public_{KEY_BITS}.pem"
+    CORRELATE = args.correlate
     run_client(protocol=args.protocol, verbose=args.verbose)
@@ -1,29 +1,49 @@
 import socket
-import asyncio
 import argparse
 import time
 from pathlib import Path
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
-from aioquic.asyncio import serve
-from aioquic.asyncio.protocol import QuicConnectionProtocol
-from aioquic.quic.configuration import QuicConfiguration
 import os
-import csv
+import sys
 import threading
 import psutil  # BENCHMARK
-from aioquic.quic.events import HandshakeCompleted, StreamDataReceived
 import ssl  # TLS support for TCP
 
+TOOLS_DIR = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "..", "..", "..", "BenchmarkTools")
+sys.path.insert(0, os.path.normpath(TOOLS_DIR))
+from alloc_trace import AllocationTracer  # noqa: E402
+from cpu_account import CpuAccountant  # noqa: E402
+from bench_writer import FORMATS, BenchmarkWriter  # noqa: E402
+from run_manifest import new_run_id, write_manifest  # noqa: E402
+from noise_control import configure as configure_noise, pin_sampler  # noqa: E402
+from correlation import (  # noqa: E402
+    server_echo, server_received_clocks, split_message, tag_timings, tcp_server_handshake)
+
 DATA_SIZE = 8 * 1024 * 1024
 TLS_CERT = "server.crt"
 TLS_KEY = "server.key"
 PUBLIC_KEY_FILE = "client_public.pem"
+CHUNK_SIZE = 4096
+KEY_BITS = 2048
+SCHEME = f"RSA-{KEY_BITS}"
+SIG_SIZE = KEY_BITS // 8  # PKCS#1 v1.5 signature length
+BIND_HOST = "0.0.0.0"
+TCP_PORT = 4444
+QUIC_PORT = 4443
 
 # BENCHMARK
 BENCHMARK_DIR = "server_benchmarks"
 os.makedirs(BENCHMARK_DIR, exist_ok=True)
+BENCHMARK_FORMAT = "legacy"
+RUN_ID = None
+VERIFY_POOL = None  # ThreadPoolExecutor when --verify-workers is set
+TCP_CONNECTIONS = 1  # connections served before the TCP server exits, 0 = until stopped
+LISTEN_BACKLOG = 128
+OPENED_STEMS = set()
+KEY_CACHE = {}  # path -> ((mtime, size), parsed key)
 
 
 def log(msg, verbose=True):
@@ -32,180 +52,361 @@ def log(msg, verbose=True):
 
 
 def load_client_public_key():
-    return RSA.import_key(Path(PUBLIC_KEY_FILE).read_bytes())
+    """Parsed again only when the file has changed, e.g. a key size the client just generated."""
+    stat = os.stat(PUBLIC_KEY_FILE)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = KEY_CACHE.get(PUBLIC_KEY_FILE)
+    if cached is None or cached[0] != version:
+        cached = KEY_CACHE[PUBLIC_KEY_FILE] = (
+            version, RSA.import_key(Path(PUBLIC_KEY_FILE).read_bytes()))
+    return cached[1]
 
 
 def verify_signature(public_key, data, signature):
     h = SHA256.new(data)
     pkcs1_15.new(public_key).verify(h, signature)
 
+
+def check_signature(cpu, tracer, public_key, data, signature, done):
+    """Verify inline, or on VERIFY_POOL so the next connection is not held up.
+
+    done(error) is called when the verification has finished, with None if it passed.
+    """
+    if VERIFY_POOL is not None:
+        future = cpu.submit_verify(VERIFY_POOL, verify_signature, public_key, data, signature)
+        future.add_done_callback(lambda f: done(f.exception()))
+        return
+    try:
+        with tracer.phase("verify"):
+            cpu.verify(verify_signature, public_key, data, signature)
+    except Exception as e:
+        done(e)
+    else:
+        done(None)
+
 # BENCHMARK
 
 
-def monitor_resources(interval, running_flag, stats_list):
+def monitor_resources(interval, stop, stats_list):
+    pin_sampler()
     process = psutil.Process()
     start_time = time.time()
-    while running_flag["active"]:
-        cpu = process.cpu_percent(interval=None)
+    # CPU from the process clock: psutil's cpu_percent counts 10 ms ticks and its first
+    # reading is always 0.0, so a short transfer would read 0 %
+    last_wall, last_cpu = time.perf_counter(), time.process_time()
+    while True:
+        # Sampled at the end of each interval, and once more when stopped, so even a
+        # transfer shorter than one interval gets a reading that covers it
+        stopped = stop.wait(interval)
+        wall, cpu_time = time.perf_counter(), time.process_time()
+        cpu = round(100 * (cpu_time - last_cpu) / (wall - last_wall), 1)
+        last_wall, last_cpu = wall, cpu_time
         mem = process.memory_info().rss / (1024 * 1024)
         timestamp = time.time() - start_time
         stats_list.append((timestamp, cpu, mem))
-        time.sleep(interval)
+        if stopped:
+            break
 
 # BENCHMARK
 
 
-def save_benchmark(protocol, connection_time, stats_list, signed_msg_size):
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    file_path = os.path.join(BENCHMARK_DIR, f"{protocol}_{timestamp}.csv")
-    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
-
-    with open(file_path, mode='w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Time(s)", "CPU (%)", "Memory (MB)", "Connection Time(s)",
-                        "Signed Message Size (bytes)", "Throughput (MB/s)"])
-        for row in stats_list:
-            writer.writerow(
-                [*row, connection_time, signed_msg_size, throughput])
-
-
-def start_tcp_server(verbose=False):
-    public_key = load_client_public_key()
+def open_benchmark(protocol):
+    stem = base = f"{protocol}_{time.strftime('%Y%m%d-%H%M%S')}"
+    # Several connections can start within a second (--connections, QUIC); keep them apart
+    while stem in OPENED_STEMS:
+        stem = f"{base}_{len([s for s in OPENED_STEMS if s.startswith(base)]) + 1}"
+    OPENED_STEMS.add(stem)
+    return BenchmarkWriter(BENCHMARK_DIR, stem, BENCHMARK_FORMAT)
 
-    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    context.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
 
-    stats = []  # BENCHMARK
-    running_flag = {"active": True}  # BENCHMARK
+def save_benchmark(protocol, connection_time, stats_list, signed_msg_size, peer_host=None,
+                   correlation=None):
+    throughput = signed_msg_size / (1024 * 1024) / connection_time  # MB/s
+    file_path = stats_list.close({
+        "Connection Time(s)": connection_time,
+        "Signed Message Size (bytes)": signed_msg_size,
+        "Throughput (MB/s)": throughput,
+    })
+    correlation = {"series_start_wall": stats_list.started_at, **(correlation or {})}
+    write_manifest(file_path, correlation.get("run_id", RUN_ID), "server", SCHEME, protocol,
+                   {"data_size": DATA_SIZE, "chunk_size": CHUNK_SIZE,
+                    "output_format": BENCHMARK_FORMAT},
+                   {"host": peer_host, "port": TCP_PORT if protocol == "tcp" else QUIC_PORT},
+                   correlation)
+    return file_path
+
+
+def serve_tcp_connection(s, context, verbose=False, trace_alloc=False):
+    tracer = AllocationTracer(trace_alloc)
+    cpu = CpuAccountant()
+
+    # Parsed while waiting for the client, so the connection's window only checks the file
+    if os.path.exists(PUBLIC_KEY_FILE):
+        with tracer.phase("key_load"), cpu.phase("key_load"):
+            load_client_public_key()
+    conn, addr = s.accept()
+    # Sampled from the accept, so the wait for the next client is not in the series
+    stats = open_benchmark("tcp")  # BENCHMARK
+    stop_sampling = threading.Event()  # BENCHMARK
     monitor_thread = threading.Thread(
         target=monitor_resources,
-        args=(0.1, running_flag, stats))
+        args=(0.1, stop_sampling, stats))
     monitor_thread.start()
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("0.0.0.0", 4444))
-        s.listen(1)
-        log("TCP server is listening on port 4444", verbose)
-
-        conn, addr = s.accept()
-        with context.wrap_socket(conn, server_side=True) as ssl_conn:
-            log(f"✅ TCP TLS connection accepted from {addr}", verbose)
-
-            start_time = time.time()
-
-            received = b""
-            while len(received) < DATA_SIZE + 256:  # Expecting data size + signature
-                chunk = ssl_conn.recv(4096)
+    with context.wrap_socket(conn, server_side=True) as ssl_conn:
+        log(f"✅ TCP TLS connection accepted from {addr}", verbose)
+        # Checked per connection, like the QUIC server, so a key size the
+        # client has just generated is picked up
+        with tracer.phase("key_load"), cpu.phase("key_load"):
+            public_key = load_client_public_key()
+
+        tracer.begin("receive")  # its snapshot is not in the timed window
+        start_time = time.time()
+
+        with cpu.phase("receive"):
+            correlation, pending = tcp_server_handshake(ssl_conn)
+            received = bytearray(pending)
+            # Expecting data size + signature; with --size 0, whatever arrives before EOF
+            while not DATA_SIZE or len(received) < DATA_SIZE + SIG_SIZE:
+                chunk = ssl_conn.recv(CHUNK_SIZE)
                 if not chunk:
-                    log(f"❌ Connection closed unexpectedly before receiving all data.", verbose)
+                    if DATA_SIZE:
+                        log(f"❌ Connection closed unexpectedly before receiving all data.", verbose)
                     break
                 received += chunk
+            tracer.end("receive")
 
-            end_time = time.time()
-            running_flag["active"] = False  # BENCHMARK
-            monitor_thread.join()  # BENCHMARK
+        end_time = time.time()
+        stop_sampling.set()  # BENCHMARK
+        monitor_thread.join()  # BENCHMARK
 
-            connection_time = end_time - start_time
+        connection_time = end_time - start_time
 
-            if len(received) == DATA_SIZE + 256:
-                data = received[:-256]
-                signature = received[-256:]
-                try:
-                    verify_signature(public_key, data, signature)
+        if len(received) == DATA_SIZE + SIG_SIZE or (not DATA_SIZE and len(received) > SIG_SIZE):
+            data = received[:-SIG_SIZE]
+            signature = received[-SIG_SIZE:]
+            file_path = save_benchmark("tcp", connection_time, stats,
+                                       len(data) + len(signature), addr[0],
+                                       tag_timings(correlation, "server_receive",
+                                                   start_time, end_time))  # BENCHMARK
+
+            def verified(error):
+                if error is None:
                     log(f"✅ Data verified. {len(data)} bytes")
-                except Exception as e:
-                    log(f"❌ Signature verification failed: {e}")
-
-                save_benchmark("tcp", connection_time, stats,
-                               len(data) + len(signature))  # BENCHMARK
-
-            else:
-                log(
-                    f"❌ Data received is incomplete. Expected {DATA_SIZE + 256} bytes but got {len(received)} bytes.", verbose)
-
-
-class MyQuicProtocol(QuicConnectionProtocol):
-    def __init__(self, *args, verbose=False, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.verbose = verbose
-        self.received = b""
-        self.start_time = None
-        self.public_key = load_client_public_key()
-
-        # BENCHMARK
-        self.stats = []
-        self.running_flag = {"active": True}
-        self.monitor_thread = threading.Thread(
-            target=monitor_resources,
-            args=(0.1, self.running_flag, self.stats))
-        self.monitor_thread.start()
-
-        #  Start handshake timing immediately on init
-        self.handshake_start_time = time.time()
-        self.handshake_end_time = None
-
-    def log(self, msg):
-        if self.verbose:
-            print(f"[SERVER-QUIC] {msg}")
-
-    def quic_event_received(self, event):
-        if isinstance(event, HandshakeCompleted):
-            self.handshake_end_time = time.time()
-            self.log(f"✅ TLS Handshake completed.")
-
-        elif isinstance(event, StreamDataReceived):
-            if self.start_time is None:
-                self.start_time = time.time()
-                self.log("Connection started. Receiving data...")
-
-            self.received += event.data
-
-            if event.end_stream:
-                connection_end_time = time.time()
-                data = self.received[:-256]
-                signature = self.received[-256:]
-
-                self.running_flag["active"] = False
-                self.monitor_thread.join()
+                else:
+                    cpu.reject()
+                    log(f"❌ Signature verification failed: {error}")
+                tracer.save(file_path)
+                cpu.payload_bytes = len(received)
+                cpu.save(file_path)
+
+            check_signature(cpu, tracer, public_key, data, signature, verified)
 
-                connection_time = connection_end_time - self.handshake_start_time
-                save_benchmark("quic", connection_time,
-                               self.stats, len(data) + len(signature))
+        else:
+            log(
+                f"❌ Data received is incomplete. Expected {DATA_SIZE + SIG_SIZE} bytes but got {len(received)} bytes.", verbose)
 
-                try:
-                    verify_signature(self.public_key, data, signature)
-                    self.log(
-                        f"✅ QUIC: Data verified. {len(data)} bytes in {connection_time:.2f}s")
-                except Exception as e:
-                    self.log(f"❌ Signature verification failed: {e}")
 
-                self._quic.close(error_code=0x0)
+def start_tcp_server(verbose=False, trace_alloc=False):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((BIND_HOST, TCP_PORT))
+        s.listen(1 if TCP_CONNECTIONS == 1 else LISTEN_BACKLOG)
+        log(f"TCP server is listening on port {TCP_PORT}", verbose)
+        served = 0
+        while not TCP_CONNECTIONS or served < TCP_CONNECTIONS:
+            serve_tcp_connection(s, context, verbose, trace_alloc)
+            served += 1
+
+
+def quic_protocol_class():
+    """Defined on first use, so the TCP path never imports aioquic."""
+    from aioquic.asyncio.protocol import QuicConnectionProtocol
+    from aioquic.quic.events import ConnectionTerminated, HandshakeCompleted, StreamDataReceived
+
+    class MyQuicProtocol(QuicConnectionProtocol):
+        def __init__(self, *args, verbose=False, trace_alloc=False, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.verbose = verbose
+            self.received = bytearray()
+            self.start_time = None
+            self.header_checked = False
+            self.correlation = None
+            self.tracer = AllocationTracer(trace_alloc)
+            self.cpu = CpuAccountant()
+            with self.tracer.phase("key_load"), self.cpu.phase("key_load"):
+                self.public_key = load_client_public_key()
+
+            # BENCHMARK
+            self.stats = open_benchmark("quic")
+            self.stop_sampling = threading.Event()
+            self.monitor_thread = threading.Thread(
+                target=monitor_resources,
+                args=(0.1, self.stop_sampling, self.stats))
+            self.monitor_thread.start()
+
+            #  Start handshake timing immediately on init
+            self.handshake_start_time = time.time()
+            self.handshake_end_time = None
+
+        def log(self, msg):
+            if self.verbose:
+                print(f"[SERVER-QUIC] {msg}")
+
+        def datagram_received(self, data, addr):
+            # Decryption, reassembly and our event handling for this connection only
+            with self.cpu.phase("receive"):
+                super().datagram_received(data, addr)
+
+        def peer_host(self):
+            paths = getattr(self._quic, "_network_paths", None)
+            return paths[0].addr[0] if paths else None
+
+        def quic_event_received(self, event):
+            if isinstance(event, HandshakeCompleted):
+                self.handshake_end_time = time.time()
+                self.log(f"✅ TLS Handshake completed.")
+
+            elif isinstance(event, StreamDataReceived):
+                if self.start_time is None:
+                    self.tracer.begin("receive")
+                    self.start_time = time.time()
+                    self.log("Connection started. Receiving data...")
+
+                self.received += event.data
+
+                if not self.header_checked:
+                    received_clocks = server_received_clocks()
+                    hello, rest = split_message(self.received)
+                    if rest is None:
+                        return
+                    self.header_checked = True
+                    self.received = rest
+                    if hello is not None:
+                        self.correlation, payload = server_echo(
+                            hello, received_clocks)
+                        self._quic.send_stream_data(event.stream_id, payload)
+                        self.transmit()
+
+                if event.end_stream:
+                    self.tracer.end("receive")
+                    connection_end_time = time.time()
+                    data = self.received[:-SIG_SIZE]
+                    signature = self.received[-SIG_SIZE:]
+
+                    self.stop_sampling.set()
+                    self.monitor_thread.join()
+
+                    connection_time = connection_end_time - self.handshake_start_time
+                    file_path = save_benchmark("quic", connection_time, self.stats,
+                                               len(data) + len(signature), self.peer_host(),
+                                               tag_timings(self.correlation, "server_receive",
+                                                           self.start_time, connection_end_time))
+                    payload_bytes = len(self.received)
+
+                    def verified(error):
+                        if error is None:
+                            self.log(f"✅ QUIC: Data verified. {len(data)} bytes "
+                                     f"in {connection_time:.2f}s")
+                        else:
+                            self.cpu.reject()
+                            self.log(f"❌ Signature verification failed: {error}")
+                        self.tracer.save(file_path)
+                        self.cpu.payload_bytes = payload_bytes
+                        self.cpu.save(file_path)
+
+                    check_signature(self.cpu, self.tracer, self.public_key, data, signature,
+                                    verified)
+                    self._quic.close(error_code=0x0)
+
+            elif isinstance(event, ConnectionTerminated) and not self.stop_sampling.is_set():
+                # Dropped before the message completed: without this the sampler
+                # thread of every abandoned connection runs for the life of the server
+                self.stop_sampling.set()
+                self.monitor_thread.join()
+                self.stats.discard()
+                self.log(f"Connection closed before the message completed "
+                         f"({len(self.received)} bytes received)")
+
+    return MyQuicProtocol
 
 
-async def start_quic_server(verbose=False):
+async def start_quic_server(verbose=False, trace_alloc=False):
+    import asyncio
+    from aioquic.asyncio import serve
+    from aioquic.quic.configuration import QuicConfiguration
+    protocol = quic_protocol_class()
     config = QuicConfiguration(
         is_client=False, certificate=TLS_CERT, private_key=TLS_KEY)
     config.load_cert_chain(certfile=TLS_CERT, keyfile=TLS_KEY)
 
     log("QUIC server starting with TLS...", verbose)
     await serve(
-        "0.0.0.0", 4443, configuration=config,
-        create_protocol=lambda *args, **kwargs: MyQuicProtocol(
-            *args, verbose=verbose, **kwargs)
+        BIND_HOST, QUIC_PORT, configuration=config,
+        create_protocol=lambda *args, **kwargs: protocol(
+            *args, verbose=verbose, trace_alloc=trace_alloc, **kwargs)
     )
     await asyncio.Event().wait()
 
 
-def run_server(protocol='tcp', verbose=False):
+def run_server(protocol='tcp', verbose=False, trace_alloc=False):
     if protocol == 'tcp':
-        start_tcp_server(verbose)
+        start_tcp_server(verbose, trace_alloc)
+        if VERIFY_POOL is not None:
+            VERIFY_POOL.shutdown()  # the last connections' sidecars are written on completion
     elif protocol == 'quic':
-        asyncio.run(start_quic_server(verbose))
+        import asyncio  # the QUIC stack loads only when QUIC is selected
+        asyncio.run(start_quic_server(verbose, trace_alloc))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run TCP/QUIC server")
     parser.add_argument("--protocol", choices=["tcp", "quic"], required=True)
     parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="Write per-phase tracemalloc accounting next to the benchmark CSV")
+    parser.add_argument("--output-format", choices=FORMATS, default=BENCHMARK_FORMAT,
+                        help="legacy wide CSV, or streamed series + summary tables as csv/npz/parquet")
+    parser.add_argument("--run-id", help="Shared ID linking client and server outputs")
+    parser.add_argument("--host", default=BIND_HOST, help="Address to bind")
+    parser.add_argument("--port", type=int,
+                        help=f"Port for the chosen protocol (default {TCP_PORT} tcp, {QUIC_PORT} quic)")
+    parser.add_argument("--output-dir", default=BENCHMARK_DIR,
+                        help="Directory for benchmark outputs")
+    parser.add_argument("--size", type=int, default=DATA_SIZE,
+                        help="Payload size in bytes (0 = any size, read to end of stream)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Bytes per send/recv call")
+    parser.add_argument("--key-bits", type=int, choices=[2048, 3072, 4096], default=KEY_BITS)
+    parser.add_argument("--verify-workers", type=int, default=0,
+                        help="Verify signatures on a pool of this many threads while the "
+                             "next connection is served (0 = inline)")
+    parser.add_argument("--connections", type=int, default=TCP_CONNECTIONS,
+                        help="TCP connections to serve before exiting (0 = until stopped); "
+                             "the QUIC server always runs until stopped")
+    parser.add_argument("--cpus", help="Pin the process to these CPUs, e.g. 2 or 2-3")
+    parser.add_argument("--sampler-cpus", help="Pin the psutil sampler thread to these CPUs")
+    parser.add_argument("--nice", type=int, help="Process niceness (negative needs privileges)")
     args = parser.parse_args()
-    run_server(protocol=args.protocol, verbose=args.verbose)
+    configure_noise(args.cpus, args.sampler_cpus, args.nice)
+    if args.verify_workers > 0:
+        from concurrent.futures import ThreadPoolExecutor
+        VERIFY_POOL = ThreadPoolExecutor(args.verify_workers, thread_name_prefix="verify")
+    BENCHMARK_FORMAT = args.output_format
+    RUN_ID = args.run_id or new_run_id()
+    BIND_HOST = args.host
+    if args.port:
+        TCP_PORT = QUIC_PORT = args.port
+    BENCHMARK_DIR = args.output_dir
+    DATA_SIZE = args.size
+    TCP_CONNECTIONS = args.connections
+    CHUNK_SIZE = args.chunk_size
+    if args.key_bits != KEY_BITS:
+        KEY_BITS = args.key_bits
+        SCHEME = f"RSA-{KEY_BITS}"
+        SIG_SIZE = KEY_BITS // 8
+        PUBLIC_KEY_FILE = f"client_public_{KEY_BITS}.pem"
+    run_server(protocol=args.protocol, verbose=args.verbose,
+               trace_alloc=args.trace_alloc)